@@ -28,6 +28,9 @@ CACHE_DEFAULT_ROOT = ".cache"
 CACHE_BOOKS_LOCATION = ".cache/books"
 CACHE_BOOK_COVER_DIR = ".cache/images/book/covers"
 CACHE_COVER_METADATA_FILE = ".cache/metadata/book/covers.json"
+CACHE_FSTREE_SNAPSHOT_FILE = ".cache/metadata/fstree.snapshot"
+CACHE_MIME_FILE = ".cache/metadata/mime.cache"
+CACHE_HASH_FILE = ".cache/metadata/hash.cache"
 
 CACHE_NPM_PACKAGES_DIR = ".cache/packages"
 CACHE_PJDFJS_PACKAGE_DIR = ".cache/packages/pdfjs"
@@ -46,11 +49,30 @@ class ServerSettings(BaseModel):
 
 
 class FSSettings(BaseModel):
-    user_data_location: str
+    user_data_location: str = ""
+    roots: dict[str, str] = {}  # named roots, used instead of user_data_location
     extend_data: bool = False  # force copy user data to static/books
     dfs_max_depth: int = 3
+    scan_workers: int = 1  # threads used to scan user data, 1 is serial scan
+    snapshot: bool = True  # restore unchanged directories from the last run
+    mime_cache_size: int = 500_000  # max entries of MIME cache, 0 disables it
+    watch: bool = True  # apply filesystem changes to the tree while running
+    watch_debounce: int = 1600  # ms to group filesystem changes into one batch
+    watch_backend: str = "auto"  # "events", "poll" or "auto" by filesystem type
+    poll_interval: float = 5.0  # initial seconds between checks of a directory
+    poll_max_interval: float = 300.0  # seconds, for directories that never change
+    poll_io_budget: int = 200  # max filesystem calls per second while polling
+    lazy_depth: int = 0  # levels scanned at startup, the rest later. 0 scans all
+    exclude: list[str] = []  # gitignore-style patterns of skipped paths
+    include: list[str] = []  # patterns of added files, all files if empty
+    max_file_size: int = 0  # bytes, larger files are skipped. 0 is no limit
+    duplicate_workers: int = 4  # threads hashing files to find duplicates
+    rescan_interval: float = 0  # seconds between full rescans, 0 is on request only
 
     def model_post_init(self, __context):
+        if not self.user_data_location and not self.roots:
+            raise ValueError("Either user_data_location or roots must be set")
+
         build_dir = os.path.relpath(CACHE_DEFAULT_ROOT)
         if not os.path.exists(build_dir):
             os.makedirs(build_dir)
@@ -58,6 +80,27 @@ class FSSettings(BaseModel):
         if self.dfs_max_depth < 1:
             self.dfs_max_depth = 1
 
+        if self.scan_workers < 1:
+            self.scan_workers = 1
+
+        if self.lazy_depth < 0:
+            self.lazy_depth = 0
+
+        if self.max_file_size < 0:
+            self.max_file_size = 0
+
+        if self.watch_backend not in ("auto", "events", "poll"):
+            self.watch_backend = "auto"
+
+        if self.poll_io_budget < 1:
+            self.poll_io_budget = 1
+
+        if self.duplicate_workers < 1:
+            self.duplicate_workers = 1
+
+        if self.rescan_interval < 0:
+            self.rescan_interval = 0
+
 
 @singleton
 class Settings(BaseSettings):
@@ -94,9 +137,17 @@ class UBooksConfigurator:
     ) -> None:
         self.settings = settings or Settings()
         self.data_dir = books_location or CACHE_BOOKS_LOCATION
-        self.user_location = self._normalize_user_location(
-            self.settings.filesystem.user_data_location
-        )
+        fs_settings = self.settings.filesystem
+        # named roots are placed into the data dir under their names
+        self.user_locations = {
+            name: self._normalize_user_location(path)
+            for name, path in fs_settings.roots.items()
+        }
+        self.user_location = ""
+        if not self.user_locations:
+            self.user_location = self._normalize_user_location(
+                fs_settings.user_data_location
+            )
         self.extend_data = self.settings.filesystem.extend_data
         self.__configured = False
 
@@ -110,6 +161,9 @@ class UBooksConfigurator:
         # fmt: on
 
     def configure(self, cache=True) -> None:
+        if self.user_locations:
+            self._configure_roots(cache)
+            return
 
         # clear existed data
         if os.path.exists(self.data_dir):
@@ -132,6 +186,28 @@ class UBooksConfigurator:
             # create symlink
             os.symlink(self.user_location, self.data_dir, True)
 
+    def _configure_roots(self, cache=True) -> None:
+        """data dir is a directory with an entry per named root"""
+        if os.path.islink(self.data_dir):
+            os.remove(self.data_dir)
+        elif os.path.exists(self.data_dir) and not cache:
+            shutil.rmtree(self.data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        # links are always recreated, roots may be changed since the last run
+        for entry in os.scandir(self.data_dir):
+            if entry.is_symlink():
+                os.remove(entry.path)
+        for name, location in self.user_locations.items():
+            dst = os.path.join(self.data_dir, name)
+            if self.extend_data:
+                if not os.path.exists(dst):
+                    shutil.copytree(src=location, dst=dst)
+            else:
+                if os.path.exists(dst):  # copied by a previous run
+                    shutil.rmtree(dst)
+                os.symlink(location, dst, True)
+
 
 class UBookStaticComponent(StaticComponent):
     def __init__(self, static_path: str) -> None:
@@ -143,6 +219,10 @@ class UBookStaticComponent(StaticComponent):
 
         app.mount(
             self.static_path,
-            StaticFiles(directory=configurator.data_dir),
+            StaticFiles(
+                directory=configurator.data_dir,
+                # files of named roots are outside of the data dir
+                follow_symlink=bool(configurator.user_locations),
+            ),
             self.static_path,
         )
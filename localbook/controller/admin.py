@@ -0,0 +1,35 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 23:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+
+from localbook.dependencies import get_rescanner
+from localbook.exceptions.exceptions import ConflictException
+from localbook.lib.filesystem.rescanner import FSTreeRescanner
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/rescan")
+async def rescan_status(
+    rescanner: Annotated[FSTreeRescanner, Depends(get_rescanner)],
+):
+    return rescanner.status()
+
+
+@router.post("/rescan", status_code=status.HTTP_202_ACCEPTED)
+async def rescan(
+    rescanner: Annotated[FSTreeRescanner, Depends(get_rescanner)],
+):
+    """start a rescan of the library in background"""
+    if not rescanner.request():
+        raise ConflictException("Error: rescan is in progress")
+    return rescanner.status()
@@ -7,11 +7,14 @@
 # ================================================================
 
 
-from typing import Annotated
+from datetime import date, datetime, time
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import HTMLResponse
 
+from localbook.lib.filesystem.columns import QueryOrder
+from localbook.lib.filesystem.sort import SortOrder
 from localbook.service.book import BookService, get_book_service
 from localbook.service.library import LibraryService, get_lib_service
 
@@ -23,16 +26,70 @@ async def serve_tree_view(
     service: Annotated[LibraryService, Depends(get_lib_service)],
     request: Request,
     path: str = "",
+    sort: SortOrder = "name",
 ):
-    return await service.serve_tree_view(request, path)
+    return await service.serve_tree_view(request, path, sort)
 
 
 @router.get("/list", response_class=HTMLResponse)
+@router.get("/list/{path:path}", response_class=HTMLResponse)
 async def serve_list_view(
     service: Annotated[LibraryService, Depends(get_lib_service)],
     request: Request,
+    path: str = "",
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+    sort: QueryOrder = "name",
+    min_size: Annotated[Optional[int], Query(ge=0)] = None,
+    max_size: Annotated[Optional[int], Query(ge=0)] = None,
+    after: Optional[date] = None,
+    before: Optional[date] = None,
+):
+    filters = {
+        "min_size": min_size,
+        "max_size": max_size,
+        # whole days in local time
+        "modified_after": after and datetime.combine(after, time.min).timestamp(),
+        "modified_before": before and datetime.combine(before, time.max).timestamp(),
+    }
+    return await service.serve_list_view(request, path, offset, limit, sort, filters)
+
+
+@router.get("/stats")
+@router.get("/stats/{path:path}")
+async def serve_stats(
+    service: Annotated[LibraryService, Depends(get_lib_service)],
+    path: str = "",
+):
+    return await service.serve_stats(path)
+
+
+@router.get("/duplicates")
+@router.get("/duplicates/{path:path}")
+async def serve_duplicates(
+    service: Annotated[LibraryService, Depends(get_lib_service)],
+    path: str = "",
+):
+    return await service.serve_duplicates(path)
+
+
+# must be registered before the path based route
+@router.get("/book/id/{nid}", response_class=HTMLResponse)
+async def serve_book_by_id(
+    service: Annotated[BookService, Depends(get_book_service)],
+    request: Request,
+    nid: str,
+):
+    return await service.serve_book_by_id(request, nid)
+
+
+@router.get("/archive/{path:path}")
+async def serve_archive_file(
+    service: Annotated[BookService, Depends(get_book_service)],
+    request: Request,
+    path: str,
 ):
-    return await service.serve_list_view(request)
+    return await service.serve_archive_file(request, path)
 
 
 @router.get("/book/{path:path}", response_class=HTMLResponse)
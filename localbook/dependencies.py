@@ -7,15 +7,33 @@
 # ================================================================
 
 
+import gc
 import logging
+import os
 import sys
+from typing import Optional
 from warnings import deprecated
 
 from fastapi.templating import Jinja2Templates
 
-from localbook.config import FSSettings, ServerSettings, Settings
+from localbook.config import (
+    CACHE_BOOKS_LOCATION,
+    CACHE_FSTREE_SNAPSHOT_FILE,
+    CACHE_HASH_FILE,
+    CACHE_MIME_FILE,
+    FSSettings,
+    ServerSettings,
+    Settings,
+)
 from localbook.lib.decorators import singleton
+from localbook.lib.filesystem.deepener import FSTreeDeepener
+from localbook.lib.filesystem.duplicates import DuplicateDetector, HashCache
+from localbook.lib.filesystem.filter import PathFilter
+from localbook.lib.filesystem.mime import MimeCache
+from localbook.lib.filesystem.poller import FSTreePoller, watch_backend
+from localbook.lib.filesystem.rescanner import FSTreeRescanner
 from localbook.lib.filesystem.tree import FSTree
+from localbook.lib.filesystem.watcher import FSTreeWatcher
 
 
 class _AppLogger:
@@ -76,11 +94,108 @@ class Deps:
         appLogger = _AppLogger(self.server_settings)
         appLogger.setup()
         self.__tmpl = Jinja2Templates(directory="templates")
+        fs_settings = self.__settings.filesystem
+        self.__mime_cache = None
+        if fs_settings.mime_cache_size > 0:
+            self.__mime_cache = MimeCache(CACHE_MIME_FILE, fs_settings.mime_cache_size)
+            self.__mime_cache.load()
         self.__fstree = FSTree(
-            root=self.__settings.filesystem.user_data_location,
-            max_depth=self.__settings.filesystem.dfs_max_depth,
+            root=fs_settings.roots
+            and os.path.abspath(CACHE_BOOKS_LOCATION)
+            or fs_settings.user_data_location,
+            max_depth=fs_settings.dfs_max_depth,
             follow_symlink=True,
             normalize=True,
+            workers=fs_settings.scan_workers,
+            snapshot_file=fs_settings.snapshot and CACHE_FSTREE_SNAPSHOT_FILE or None,
+            mime_cache=self.__mime_cache,
+            lazy_depth=fs_settings.lazy_depth or None,
+            path_filter=PathFilter(
+                exclude=fs_settings.exclude,
+                include=fs_settings.include,
+                max_file_size=fs_settings.max_file_size,
+            ),
+            roots=fs_settings.roots,
+        )
+        # the tree lives until shutdown, move it (and everything created
+        # before) to the permanent generation, so the cyclic GC doesn't
+        # traverse millions of nodes on every full collection
+        gc.collect()
+        gc.freeze()
+        self.__watch()
+        hash_cache = HashCache(CACHE_HASH_FILE)
+        hash_cache.load()
+        self.__duplicates = DuplicateDetector(
+            workers=fs_settings.duplicate_workers, cache=hash_cache
+        )
+        self.__deepener = FSTreeDeepener(self.__fstree)
+        if fs_settings.lazy_depth:
+            self.__deepener.start()
+        # the previous tree, its nodes are released on the next rescan, when
+        # no request can use them anymore
+        self.__retired: Optional[FSTree] = None
+        self.__rescanner = FSTreeRescanner(
+            self.__fstree,
+            publish=self.__publish,
+            interval=fs_settings.rescan_interval or None,
+            suspend=self.__suspend,
+        )
+        self.__rescanner.start()
+
+    def __suspend(self) -> None:
+        """stop scanning of the current tree, its watchers keep patching it
+        and record the changes for the new tree"""
+        self.__deepener.stop()
+        for watcher in self.__watchers:
+            watcher.record()
+
+    def __publish(self, fstree: FSTree) -> None:
+        """make `fstree` current by a single reference swap. Requests that
+        got the previous tree keep using it"""
+        previous = self.__fstree
+        self.__fstree = fstree
+        if fstree is not previous:
+            if self.__retired is not None:
+                self.__retired.release()
+            self.__retired = previous
+            gc.collect()
+            gc.freeze()
+        for watcher in self.__watchers:
+            watcher.replay(fstree)
+        self.__deepener = FSTreeDeepener(fstree)
+        if fstree.unexpanded:
+            self.__deepener.start()
+
+    def __watch(self) -> None:
+        """create watchers of the current tree and start them if enabled"""
+        # every root has its own watcher, a slow disk doesn't block others
+        locations = list(self.__fstree.roots.values()) or [None]
+        self.__watchers = [self.__create_watcher(path) for path in locations]
+        if self.fs_settings.watch:
+            for watcher in self.__watchers:
+                watcher.start()
+
+    def __create_watcher(self, path: Optional[str]) -> FSTreeWatcher | FSTreePoller:
+        """watcher of the tree or of one of its roots"""
+        fs_settings = self.fs_settings
+        backend = fs_settings.watch_backend
+        if backend == "auto":
+            backend = watch_backend(path or fs_settings.user_data_location)
+        logging.getLogger("localbook").info(
+            f"Deps: {backend} backend is used to watch {path or 'user data'}"
+        )
+        if backend == "poll":
+            return FSTreePoller(
+                self.__fstree,
+                interval=fs_settings.poll_interval,
+                max_interval=fs_settings.poll_max_interval,
+                io_budget=fs_settings.poll_io_budget,
+                path=path,
+            )
+        return FSTreeWatcher(
+            self.__fstree,
+            debounce=fs_settings.watch_debounce,
+            path=path,
         )
 
     @property
@@ -103,6 +218,26 @@ class Deps:
     def fstree(self) -> FSTree:
         return self.__fstree
 
+    @property
+    def mime_cache(self) -> MimeCache | None:
+        return self.__mime_cache
+
+    @property
+    def watchers(self) -> list[FSTreeWatcher | FSTreePoller]:
+        return self.__watchers
+
+    @property
+    def deepener(self) -> FSTreeDeepener:
+        return self.__deepener
+
+    @property
+    def rescanner(self) -> FSTreeRescanner:
+        return self.__rescanner
+
+    @property
+    def duplicates(self) -> DuplicateDetector:
+        return self.__duplicates
+
     @deprecated("get_settings is deprecated. Use `settings` instead")
     def get_settings(self) -> Settings:
         return self.settings
@@ -132,5 +267,13 @@ def get_fstree() -> FSTree:
     return Deps().fstree
 
 
+def get_rescanner() -> FSTreeRescanner:
+    return Deps().rescanner
+
+
+def get_duplicates() -> DuplicateDetector:
+    return Deps().duplicates
+
+
 def get_jinja2() -> Jinja2Templates:
     return Deps().jinja2
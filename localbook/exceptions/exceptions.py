@@ -6,6 +6,7 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
+from typing import Optional
 
 from fastapi import HTTPException, status
 
@@ -26,3 +27,18 @@ class BadRequestExpection(HTTPException):
     def __init__(self, detail: str = "") -> None:
         self.status_code = status.HTTP_400_BAD_REQUEST
         self.detail = detail or "Bad Request"
+
+
+class ConflictException(HTTPException):
+    def __init__(self, detail: str = "") -> None:
+        self.status_code = status.HTTP_409_CONFLICT
+        self.detail = detail or "Conflict"
+
+
+class RangeNotSatisfiableException(HTTPException):
+    def __init__(self, detail: str = "", size: Optional[int] = None) -> None:
+        self.status_code = status.HTTP_416_RANGE_NOT_SATISFIABLE
+        self.detail = detail or "Range Not Satisfiable"
+        self.headers = (
+            {"Content-Range": f"bytes */{size}"} if size is not None else None
+        )
@@ -0,0 +1,212 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 19.10.2026 00:10
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import mimetypes
+import os
+import struct
+import time
+import zipfile
+from typing import Callable, Iterator, Optional, TypeGuard
+
+from .dir import FSDir
+from .file import FSFile
+from .node import FSNode
+from .pdf import PDFFile
+
+ARCHIVE_MIME = "application/zip"
+
+# directories of resource forks added by macOS archivers
+_SKIPPED_DIRS = frozenset({"__MACOSX"})
+
+
+def _member_mtime(info: zipfile.ZipInfo, default: float) -> float:
+    """timestamp of member, zip stores local time without timezone"""
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return default
+
+
+class ZipArchive(FSDir):
+    """Zip archive presented as a directory of its members.
+
+    Members are read from the central directory only, nothing is extracted:
+    MIME types are guessed by names, sizes are uncompressed sizes, mtimes
+    are timestamps of entries. Members have virtual paths inside the path
+    of archive, `archive_of` returns the archive and the member of a node.
+    """
+
+    __slots__ = ()
+
+    def load(
+        self,
+        ignore_hidden: bool = True,
+        accepts: Optional[Callable[[str, bool], bool]] = None,
+    ) -> int:
+        """create nodes of members. Directories without files are dropped.
+
+        Args:
+            ignore_hidden (bool): skip members with a dotfile in the path
+            accepts (Callable): filter of relpaths, like `PathFilter.accepts`
+
+        Returns:
+            number of files in archive
+        """
+        with zipfile.ZipFile(self._path) as zf:
+            infos = zf.infolist()
+
+        relpath = self.relpath
+        # member path of directory -> (node, its path, children)
+        dirs: dict[str, Optional[tuple[FSDir, str, list[FSNode]]]] = {
+            "": (self, self._path, [])
+        }
+
+        def get_dir(name: str) -> Optional[tuple[FSDir, str, list[FSNode]]]:
+            if name in dirs:
+                return dirs[name]
+            head, _, tail = name.rpartition("/")
+            parent = get_dir(head)
+            found = None
+            if parent is not None and (
+                accepts is None or accepts(os.path.join(relpath, name), True)
+            ):
+                path = os.path.join(parent[1], tail)
+                fsdir = FSDir(path, parent[0], size=0, mtime=self.mtime)
+                found = (fsdir, path, [])
+            dirs[name] = found
+            return found
+
+        files = 0
+        seen: set[str] = set()
+        for info in infos:
+            name = info.filename.rstrip("/")
+            parts = name.split("/")
+            if not name or any(p in ("", ".", "..") for p in parts):
+                continue  # absolute or escaping paths
+            if parts[0] in _SKIPPED_DIRS:
+                continue
+            if ignore_hidden and any(p.startswith(".") for p in parts):
+                continue
+            if info.is_dir():
+                get_dir(name)
+                continue
+            if name in seen or name in dirs:
+                continue  # duplicated entry
+            parent = get_dir("/".join(parts[:-1]))
+            if parent is None:
+                continue
+            if accepts is not None and not accepts(os.path.join(relpath, name), False):
+                continue
+            seen.add(name)
+            mime = mimetypes.guess_type(parts[-1])[0] or "unknown"
+            cls = PDFFile if mime == "application/pdf" else FSFile
+            node = cls(
+                os.path.join(parent[1], parts[-1]),
+                parent[0],
+                mime,
+                size=info.file_size,
+                mtime=_member_mtime(info, self.mtime),
+            )
+            parent[2].append(node)
+            files += 1
+
+        # deeper directories first, empty ones are not attached
+        for name in sorted((n for n in dirs if dirs[n]), key=len, reverse=True):
+            fsdir, _, children = dirs[name]  # type: ignore
+            if not children:
+                continue
+            fsdir.add_children(children)
+            if name:
+                parent = dirs[name.rpartition("/")[0]]
+                assert parent is not None
+                parent[2].append(fsdir)
+        return files
+
+
+def is_archive(node: FSNode | None) -> TypeGuard[ZipArchive]:
+    return isinstance(node, ZipArchive)
+
+
+def archive_of(node: FSNode) -> Optional[tuple[ZipArchive, str]]:
+    """archive containing `node` and the name of its member, `None` for
+    nodes which are not members of archive"""
+    names: list[str] = []
+    current: Optional[FSNode] = node
+    while current is not None:
+        if isinstance(current, ZipArchive):
+            return (current, "/".join(reversed(names))) if names else None
+        names.append(current.name)
+        current = current.parent
+    return None
+
+
+class ArchiveMember:
+    """File inside zip archive, read without extraction.
+
+    Stored (not compressed) members are read right from the archive file,
+    so any range of their bytes is available. Compressed members are
+    decompressed as a stream from the start.
+    """
+
+    def __init__(self, archive_path: str, name: str) -> None:
+        """
+        Raises:
+            KeyError: archive has no such member
+        """
+        with zipfile.ZipFile(archive_path) as zf:
+            self.info = zf.getinfo(name)
+        self.archive_path = archive_path
+        self.name = name
+        self.size = self.info.file_size
+
+    @property
+    def seekable(self) -> bool:
+        """bytes of member can be read from any offset"""
+        info = self.info
+        return info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+
+    def _data_offset(self, f) -> int:
+        """offset of member data in archive, after the local file header"""
+        f.seek(self.info.header_offset)
+        header = f.read(zipfile.sizeFileHeader)
+        if header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"bad local header of member: {self.name}")
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        return self.info.header_offset + len(header) + name_length + extra_length
+
+    def iter_bytes(
+        self,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> Iterator[bytes]:
+        """bytes of member in range [start, end). Only seekable members can
+        be read from a non-zero `start`"""
+        end = self.size if end is None else min(end, self.size)
+        if self.seekable:
+            with open(self.archive_path, "rb") as f:
+                f.seek(self._data_offset(f) + start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+            return
+
+        if start:
+            raise ValueError(f"compressed member is read from the start: {self.name}")
+        with zipfile.ZipFile(self.archive_path) as zf, zf.open(self.info) as f:
+            remaining = end
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
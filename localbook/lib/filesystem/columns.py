@@ -0,0 +1,201 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 21:15
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import threading
+from typing import Container, Literal, Optional
+
+import numpy as np
+
+from .dir import FSDir, is_fsdir
+from .node import FSNode
+from .sort import natural_key
+
+# kinds of nodes, a query for files matches PDFs too
+KIND_DIR, KIND_FILE, KIND_PDF = 0, 1, 2
+NodeKind = Literal["dir", "file", "pdf"]
+
+# orders of query results: mtime is recently modified first, size is
+# largest first, like orders of directory listings
+QueryOrder = Literal["name", "mtime", "size"]
+
+
+class NodeColumns:
+    """Columnar copy of node metadata for vectorized queries.
+
+    Nodes are numbered in pre-order, so a subtree of directory is a
+    contiguous range of rows `[row, end)`, where `end` is kept for every
+    row. Other columns are size, mtime, kind, code of MIME type and row of
+    parent. Filters are evaluated as NumPy masks over the range of
+    subtree, orders as (partial) argsorts.
+
+    Columns describe the tree at the moment of creation and have to be
+    rebuilt after a change of the structure, a rewritten file is patched
+    in place by `replace`. Nodes in `skip` (aliases) are left out.
+    """
+
+    def __init__(self, root: FSDir, skip: Container[FSNode] = ()) -> None:
+        nodes: list[FSNode] = []
+        sizes: list[int] = []
+        mtimes: list[float] = []
+        kinds: list[int] = []
+        mimes: list[int] = []
+        parents: list[int] = []
+        ends: list[int] = []
+        self.mime_codes: dict[str, int] = {}
+
+        # (node, row of parent), `None` marks the end of directory
+        stack: list[tuple[Optional[FSNode], int]] = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            if node is None:
+                ends[parent] = len(nodes)
+                continue
+            row = len(nodes)
+            nodes.append(node)
+            sizes.append(node.size)
+            mtimes.append(node.mtime)
+            parents.append(parent)
+            ends.append(row + 1)
+            if is_fsdir(node):
+                kinds.append(KIND_DIR)
+                mimes.append(-1)
+                stack.append((None, row))
+                stack.extend((c, row) for c in reversed(node.children) if c not in skip)
+            else:
+                mime = getattr(node, "mime", "")
+                kinds.append(KIND_PDF if mime == "application/pdf" else KIND_FILE)
+                mimes.append(self.mime_codes.setdefault(mime, len(self.mime_codes)))
+
+        self.nodes = nodes
+        self.rows: dict[int, int] = {id(n): i for i, n in enumerate(nodes)}
+        self.size = np.array(sizes, dtype=np.int64)
+        self.mtime = np.array(mtimes, dtype=np.float64)
+        self.kind = np.array(kinds, dtype=np.uint8)
+        self.mime = np.array(mimes, dtype=np.int32)
+        self.parent = np.array(parents, dtype=np.int32)
+        self.end = np.array(ends, dtype=np.int32)
+        self.__name_rank: Optional[np.ndarray] = None
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def replace(self, old: FSNode, new: FSNode) -> bool:
+        """put file `new` into the row of `old`, e.g. after it was rewritten.
+
+        Returns:
+            False if the rows can't be patched and have to be rebuilt
+        """
+        row = self.rows.get(id(old))
+        if row is None or is_fsdir(old) or is_fsdir(new) or old.name != new.name:
+            return False
+        mime = getattr(new, "mime", "")
+        self.nodes[row] = new
+        del self.rows[id(old)]
+        self.rows[id(new)] = row
+        self.size[row] = new.size
+        self.mtime[row] = new.mtime
+        self.kind[row] = KIND_PDF if mime == "application/pdf" else KIND_FILE
+        self.mime[row] = self.mime_codes.setdefault(mime, len(self.mime_codes))
+        return True
+
+    @property
+    def name_rank(self) -> np.ndarray:
+        """position of every row in natural order of names, computed on
+        first request"""
+        rank = self.__name_rank
+        if rank is None:
+            with self.__lock:
+                rank = self.__name_rank
+                if rank is None:
+                    nodes = self.nodes
+                    order = sorted(
+                        range(len(nodes)), key=lambda i: natural_key(nodes[i].name)
+                    )
+                    rank = np.empty(len(nodes), dtype=np.int64)
+                    rank[np.array(order, dtype=np.int64)] = np.arange(len(nodes))
+                    self.__name_rank = rank
+        return rank
+
+    def query(
+        self,
+        fsdir: FSDir,
+        kind: Optional[NodeKind] = None,
+        mime: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        modified_after: Optional[float] = None,
+        modified_before: Optional[float] = None,
+        recursive: bool = True,
+        order: QueryOrder = "name",
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> tuple[int, list[FSNode]]:
+        """nodes under directory matching all filters.
+
+        Args:
+            kind (str): "dir", "file" (PDFs included) or "pdf"
+            mime (str): MIME type of files
+            min_size, max_size (int): bounds of size in bytes, inclusive
+            modified_after, modified_before (float): bounds of mtime
+            recursive (bool): the whole subtree or children only
+            order (str): "name", "mtime" (recent first) or "size" (largest
+                first)
+
+        Returns:
+            number of matching nodes and a page of them in `order`
+        """
+        row = self.rows.get(id(fsdir))
+        if row is None:
+            return 0, []
+        lo, hi = row + 1, int(self.end[row])
+
+        mask = np.ones(hi - lo, dtype=bool)
+        if kind == "dir":
+            mask &= self.kind[lo:hi] == KIND_DIR
+        elif kind == "file":
+            mask &= self.kind[lo:hi] != KIND_DIR
+        elif kind == "pdf":
+            mask &= self.kind[lo:hi] == KIND_PDF
+        if mime is not None:
+            code = self.mime_codes.get(mime)
+            if code is None:
+                return 0, []
+            mask &= self.mime[lo:hi] == code
+        if min_size is not None:
+            mask &= self.size[lo:hi] >= min_size
+        if max_size is not None:
+            mask &= self.size[lo:hi] <= max_size
+        if modified_after is not None:
+            mask &= self.mtime[lo:hi] >= modified_after
+        if modified_before is not None:
+            mask &= self.mtime[lo:hi] <= modified_before
+        if not recursive:
+            mask &= self.parent[lo:hi] == row
+
+        rows = np.flatnonzero(mask) + lo
+        total = len(rows)
+        if order == "name":
+            key = self.name_rank[rows]
+        elif order == "mtime":
+            key = -self.mtime[rows]
+        elif order == "size":
+            key = -self.size[rows]
+        else:
+            raise ValueError(f"unknown order: {order}")
+
+        end = total if limit is None else min(total, offset + limit)
+        if offset >= end:
+            return total, []
+        if end < total:
+            # only the first `end` rows are needed
+            top = np.argpartition(key, end - 1)[:end]
+            top = top[np.argsort(key[top], kind="stable")]
+        else:
+            top = np.argsort(key, kind="stable")
+        return total, [self.nodes[i] for i in rows[top[offset:end]]]
@@ -0,0 +1,85 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 17:10
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from .tree import FSTree
+
+logger = logging.getLogger("localbook")
+
+
+class FSTreeDeepener:
+    """Scans the rest of `FSTree` built in lazy mode in background.
+
+    Unexpanded directories are scanned one by one in BFS order, with a pause
+    between them, so requests that expand directories on demand are not
+    blocked for long. The thread runs with the lowest scheduling priority
+    where the platform allows it.
+    """
+
+    def __init__(self, fstree: FSTree, pause: float = 0.005) -> None:
+        """
+        Args:
+            fstree (FSTree): tree built with `lazy_depth`
+            pause (float): time in seconds to sleep between directories
+        """
+        self.fstree = fstree
+        self.pause = pause
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self._run,
+            name="fstree-deepener",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def _lower_priority(self) -> None:
+        # on Linux the nice value of a single thread can be changed by its id
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self) -> None:
+        self._lower_priority()
+        start = time.perf_counter()
+        expanded = 0
+        while not self.__stop.is_set():
+            fsdir = self.fstree.next_unexpanded()
+            if fsdir is None:
+                logger.info(
+                    f"FSTreeDeepener: {expanded} directories scanned "
+                    f"in {time.perf_counter() - start:.2f}s"
+                )
+                return
+            try:
+                self.fstree.expand(fsdir)
+            except Exception:
+                logger.exception(f"FSTreeDeepener: failed to scan {fsdir._path}")
+            expanded += 1
+            self.__stop.wait(self.pause)
@@ -6,12 +6,100 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
-from typing import Iterable, Optional, TypeGuard
+import bisect
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Container, Iterable, Optional, TypeGuard
+
+from hurry.filesize import alternative, size
 
 from .node import FSNode
+from .sort import SortOrder, natural_key
+
+
+def _name_key(node: FSNode) -> tuple:
+    return natural_key(node.name)
+
+
+def _entry_hash(node: FSNode) -> int:
+    """hash of directory entry: name, size, mtime and type of node.
+
+    Entry of subdirectory includes the digest of its subtree.
+    """
+    if is_fsdir(node):
+        kind = f"d{node.digest:032x}"
+    else:
+        kind = f"f{getattr(node, 'mime', '')}"
+    data = os.fsencode(f"{node.name}\0{node.size}\0{node.mtime!r}\0{kind}")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest())
+
+
+class DirStats:
+    """Aggregates of directory subtree: total bytes and number of files,
+    number of PDF files and mtime of the newest file"""
+
+    __slots__ = ("size", "files", "pdfs", "newest")
+
+    def __init__(
+        self,
+        size: int = 0,
+        files: int = 0,
+        pdfs: int = 0,
+        newest: float = 0.0,
+    ) -> None:
+        self.size = size
+        self.files = files
+        self.pdfs = pdfs
+        self.newest = newest
+
+    def add(self, other: "DirStats", sign: int = 1) -> None:
+        """add (or subtract) counters of `other`, `newest` is not changed"""
+        self.size += sign * other.size
+        self.files += sign * other.files
+        self.pdfs += sign * other.pdfs
+
+    def strsize(self) -> str:
+        """pretty total size"""
+        return size(self.size, system=alternative)
+
+    def strnewest(self, format: str) -> str:
+        """format mtime of the newest file"""
+        return datetime.fromtimestamp(self.newest).strftime(format)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "files": self.files,
+            "pdfs": self.pdfs,
+            "newest": self.newest,
+        }
+
+
+def _entry_stats(node: FSNode) -> DirStats:
+    """aggregates of directory entry, a file counts itself"""
+    if is_fsdir(node):
+        return node.stats
+    pdf = getattr(node, "mime", None) == "application/pdf"
+    return DirStats(node.size, 1, int(pdf), node.mtime)
+
+
+def _sum_stats(nodes: Iterable[FSNode]) -> DirStats:
+    total = DirStats()
+    for node in nodes:
+        stats = _entry_stats(node)
+        total.add(stats)
+        total.newest = max(total.newest, stats.newest)
+    return total
 
 
 class FSDir(FSNode):
+    # children are always sorted by `natural_key` of their names,
+    # other orders are computed on request and cached until they change.
+    # `__digest` is the Merkle digest of subtree and `__stats` are its
+    # aggregates, both are `None` until requested
+    __slots__ = ("__children", "__orders", "__digest", "__stats")
+
     def __init__(
         self,
         path: str,
@@ -19,8 +107,135 @@ class FSDir(FSNode):
         children: Optional[list[FSNode]] = None,
         **kwargs,
     ) -> None:
-        super().__init__(path, parent, **kwargs, typo="d")
-        self.children: list[FSNode] = children or []
+        super().__init__(path, parent, **kwargs)
+        self.__orders: Optional[dict[str, list[FSNode]]] = None
+        self.__digest: Optional[int] = None
+        self.__stats: Optional[DirStats] = None
+        self.__children = sorted(children or [], key=_name_key)
+
+    @property
+    def children(self) -> list[FSNode]:
+        return self.__children
+
+    @children.setter
+    def children(self, nodes: list[FSNode]) -> None:
+        old = self.__children
+        self.__children = sorted(nodes, key=_name_key)
+        self.__orders = None
+        self.__changed(self.__children, old)
+
+    def __post_order(self, computed) -> list["FSDir"]:
+        """directories of subtree without computed value, subdirectories
+        go before their parent"""
+        order: list[FSDir] = []
+        stack = [self]
+        while stack:
+            fsdir = stack.pop()
+            order.append(fsdir)
+            for child in fsdir.__children:
+                if is_fsdir(child) and not computed(child):
+                    stack.append(child)
+        order.reverse()
+        return order
+
+    @property
+    def digest(self) -> int:
+        """Merkle digest of subtree, XOR of hashes of children entries.
+
+        Computed on first request, afterwards every change of children
+        updates the digests of directory and its ancestors in place.
+        """
+        if self.__digest is None:
+            for fsdir in self.__post_order(lambda d: d.__digest is not None):
+                digest = 0
+                for child in fsdir.__children:
+                    digest ^= _entry_hash(child)
+                fsdir.__digest = digest
+        return self.__digest  # type: ignore
+
+    @property
+    def stats(self) -> DirStats:
+        """aggregates of subtree.
+
+        Computed in one post-order pass on first request, afterwards every
+        change of children updates the aggregates of directory and its
+        ancestors.
+        """
+        if self.__stats is None:
+            for fsdir in self.__post_order(lambda d: d.__stats is not None):
+                fsdir.__stats = _sum_stats(fsdir.__children)
+        return self.__stats  # type: ignore
+
+    def __changed(self, added: Iterable[FSNode], removed: Iterable[FSNode]) -> None:
+        """update digest and aggregates after children were changed"""
+        self.__update(self.__hashes(added) ^ self.__hashes(removed))
+        if self.__stats is not None:
+            self.__update_stats(_sum_stats(added), _sum_stats(removed))
+
+    def __update_stats(self, added: DirStats, removed: DirStats) -> None:
+        """apply aggregates of added and removed entries to directory and
+        its ancestors"""
+        fsdir = self
+        while fsdir.__stats is not None:
+            stats = fsdir.__stats
+            newest = stats.newest
+            stats.add(added)
+            stats.add(removed, -1)
+            if added.newest > stats.newest:
+                stats.newest = added.newest
+            elif removed.newest >= stats.newest > added.newest:
+                # the newest file is removed, look for the next one
+                stats.newest = max(
+                    (_entry_stats(c).newest for c in fsdir.__children), default=0.0
+                )
+            parent = fsdir.parent
+            if not is_fsdir(parent):
+                return
+            # for the parent this directory is replaced by itself with new
+            # aggregates, only the change of `newest` has to be tracked
+            added = DirStats(added.size, added.files, added.pdfs, stats.newest)
+            removed = DirStats(removed.size, removed.files, removed.pdfs, newest)
+            fsdir = parent
+
+    def __hashes(self, nodes: Iterable[FSNode]) -> int:
+        """XOR of entry hashes of `nodes`, only if digest is computed"""
+        acc = 0
+        if self.__digest is not None:
+            for node in nodes:
+                acc ^= _entry_hash(node)
+        return acc
+
+    def __update(self, delta: int) -> None:
+        """apply `delta` of children hashes to the digest and propagate
+        the change of entry hash to ancestors"""
+        fsdir = self
+        while delta and fsdir.__digest is not None:
+            old = _entry_hash(fsdir)
+            fsdir.__digest ^= delta
+            parent = fsdir.parent
+            if not is_fsdir(parent):
+                return
+            delta = old ^ _entry_hash(fsdir)
+            fsdir = parent
+
+    def _restat(self, size: int, mtime: float) -> None:
+        """update size and mtime of directory, the digests of ancestors
+        follow the change of its entry hash"""
+        parent = self.parent
+        if is_fsdir(parent) and parent.__digest is not None:
+            old = _entry_hash(self)
+            self.size, self.mtime = size, mtime
+            parent.__update(old ^ _entry_hash(self))
+        else:
+            self.size, self.mtime = size, mtime
+
+    def _clear(self) -> None:
+        """drop children of directory removed from the tree, the digests
+        of its former ancestors are not changed"""
+        self.__children = []
+        self.__orders = None
+        self.__digest = None
+        self.__stats = None
 
     def isdir(self) -> bool:
         return True
@@ -29,6 +244,66 @@ class FSDir(FSNode):
         for child in self.children:
             yield child
 
+    def add_child(self, node: FSNode) -> None:
+        bisect.insort(self.__children, node, key=_name_key)
+        self.__orders = None
+        self.__changed([node], ())
+
+    def add_children(self, nodes: Iterable[FSNode]) -> None:
+        nodes = list(nodes)
+        self.__children.extend(nodes)
+        self.__children.sort(key=_name_key)
+        self.__orders = None
+        self.__changed(nodes, ())
+
+    def remove_child(self, node: FSNode) -> None:
+        self.__children.remove(node)
+        self.__orders = None
+        self.__changed((), [node])
+
+    def drop_children(self, nodes: Container[FSNode]) -> None:
+        """remove all children contained in `nodes`"""
+        dropped = [n for n in self.__children if n in nodes]
+        self.__children = [n for n in self.__children if n not in nodes]
+        self.__orders = None
+        self.__changed((), dropped)
+
+    def replace_child(self, node: FSNode, new_node: FSNode) -> None:
+        if node.name == new_node.name:
+            self.__children[self.__children.index(node)] = new_node
+            self.__orders = None
+            self.__changed([new_node], [node])
+        else:
+            self.remove_child(node)
+            self.add_child(new_node)
+
+    def sorted_children(self, order: SortOrder = "name") -> list[FSNode]:
+        """children in `order`:
+        - name: natural order of names
+        - dirs: directories first, then files, both by names
+        - mtime: recently modified first
+        - size: largest first
+        """
+        if order == "name":
+            return self.__children
+        orders = self.__orders
+        if orders is None:
+            orders = self.__orders = {}
+        nodes = orders.get(order)
+        if nodes is None:
+            children = self.__children
+            if order == "dirs":
+                nodes = [n for n in children if n.isdir()]
+                nodes += [n for n in children if not n.isdir()]
+            elif order == "mtime":
+                nodes = sorted(children, key=lambda n: n.mtime, reverse=True)
+            elif order == "size":
+                nodes = sorted(children, key=lambda n: n.size, reverse=True)
+            else:
+                raise ValueError(f"unknown order: {order}")
+            orders[order] = nodes
+        return nodes
+
 
 def is_fsdir(node: FSNode | None) -> TypeGuard[FSDir]:
     return isinstance(node, FSDir)
@@ -0,0 +1,239 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 19.10.2026 01:05
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from .archive import archive_of
+from .pdf import PDFFile
+
+logger = logging.getLogger("localbook")
+
+HASH_CACHE_MAGIC = b"LBHASH"
+HASH_CACHE_VERSION = 1
+_HEADER = struct.Struct(f"<{len(HASH_CACHE_MAGIC)}sI")
+
+# bytes hashed at the start and at the end of file by the second stage
+EDGE_SIZE = 64 * 1024
+
+
+def edge_hash(path: str, size: int, edge: int = EDGE_SIZE) -> bytes:
+    """hash of the first and the last `edge` bytes of file. Files not
+    larger than two edges are hashed as a whole"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 2 * edge:
+            h.update(f.read())
+        else:
+            h.update(f.read(edge))
+            f.seek(-edge, os.SEEK_END)
+            h.update(f.read(edge))
+    return h.digest()
+
+
+def full_hash(path: str, chunk_size: int = 1024 * 1024) -> bytes:
+    """hash of the whole content of file"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.digest()
+
+
+class HashCache:
+    """Persistent cache of content hashes of files.
+
+    Entries are stored by (st_dev, st_ino) and are valid only while the size
+    and mtime (ns) of the file are the same, like entries of `MimeCache`.
+    Every entry keeps the edge hash and, once computed, the full hash.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        Args:
+            path (str): cache file, the cache lives in memory only if not set
+        """
+        self.path = path
+        # (st_dev, st_ino) -> (size, mtime_ns, edge hash, full hash)
+        self.__entries: dict[
+            tuple[int, int], tuple[int, int, Optional[bytes], Optional[bytes]]
+        ] = {}
+        self.__lock = threading.Lock()
+        self.__dirty = False
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, st: os.stat_result) -> tuple[Optional[bytes], Optional[bytes]]:
+        """returns cached (edge hash, full hash) of the file with stat `st`"""
+        key = (st.st_dev, st.st_ino)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None, None
+            if entry[:2] != (st.st_size, st.st_mtime_ns):
+                # file is changed, entry is stale
+                del self.__entries[key]
+                self.__dirty = True
+                return None, None
+            return entry[2], entry[3]
+
+    def put(
+        self,
+        st: os.stat_result,
+        edge: Optional[bytes] = None,
+        full: Optional[bytes] = None,
+    ) -> None:
+        """store hashes of file, the ones not passed are kept"""
+        key = (st.st_dev, st.st_ino)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[:2] == (st.st_size, st.st_mtime_ns):
+                edge = edge or entry[2]
+                full = full or entry[3]
+            self.__entries[key] = (st.st_size, st.st_mtime_ns, edge, full)
+            self.__dirty = True
+
+    def load(self) -> bool:
+        """read the cache file. returns `False` if it can't be used"""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                magic, version = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != HASH_CACHE_MAGIC or version != HASH_CACHE_VERSION:
+                    logger.warning(f"HashCache: unsupported cache {self.path}")
+                    return False
+                entries = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"HashCache: corrupted cache {self.path}: {e}")
+            return False
+
+        with self.__lock:
+            self.__entries = dict(entries)
+            self.__dirty = False
+        return True
+
+    def save(self) -> None:
+        """write the cache file if entries were changed"""
+        if self.path is None or not self.__dirty:
+            return
+        with self.__lock:
+            entries = list(self.__entries.items())
+            self.__dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(HASH_CACHE_MAGIC, HASH_CACHE_VERSION))
+            pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+
+class DuplicateDetector:
+    """Finds byte-identical PDF files.
+
+    Files are narrowed down in stages, every stage only looks at the files
+    that still collide: size (known from the tree, no I/O), hash of the
+    first and the last 64 KiB, hash of the whole content. Hashes are
+    computed on a pool of workers and cached by inode while the size and
+    mtime of file are the same.
+
+    Hardlinks and symlinks are aliases in the tree and are not listed, so
+    they are never reported. Files inside archives are left out.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        cache: Optional[HashCache] = None,
+        edge: int = EDGE_SIZE,
+    ) -> None:
+        """
+        Args:
+            workers (int): number of threads hashing files
+            cache (HashCache): cache of hashes, in memory by default
+            edge (int): bytes hashed at both ends of file by the second stage
+        """
+        self.workers = max(1, workers)
+        self.cache = cache if cache is not None else HashCache()
+        self.edge = edge
+        self.__lock = threading.Lock()
+
+    def _hash(self, pdf: PDFFile, full: bool) -> Optional[bytes]:
+        """edge or full hash of file, `None` if it can't be read"""
+        path = pdf._path
+        try:
+            st = os.stat(path)
+            cached = self.cache.get(st)[full]
+            if cached is not None:
+                return cached
+            if full:
+                digest = full_hash(path)
+                self.cache.put(st, full=digest)
+            else:
+                digest = edge_hash(path, st.st_size, self.edge)
+                self.cache.put(st, edge=digest)
+            return digest
+        except OSError as e:
+            logger.debug(f"DuplicateDetector: {path} is not hashed: {e}")
+            return None
+
+    def _split(
+        self,
+        groups: Iterable[list[PDFFile]],
+        key: Callable[[PDFFile], Optional[bytes]],
+        pool: ThreadPoolExecutor,
+    ) -> list[list[PDFFile]]:
+        """split every group by `key` computed on the pool, groups of a
+        single file are dropped"""
+        groups = list(groups)
+        files = [pdf for group in groups for pdf in group]
+        keys = dict(zip(files, pool.map(key, files)))
+        result: list[list[PDFFile]] = []
+        for group in groups:
+            by_key: dict[bytes, list[PDFFile]] = collections.defaultdict(list)
+            for pdf in group:
+                if keys[pdf] is not None:
+                    by_key[keys[pdf]].append(pdf)
+            result.extend(g for g in by_key.values() if len(g) > 1)
+        return result
+
+    def find(self, pdfs: Iterable[PDFFile]) -> list[list[PDFFile]]:
+        """groups of byte-identical files, largest files first. Files of
+        every group are sorted by relpath"""
+        by_size: dict[int, list[PDFFile]] = collections.defaultdict(list)
+        for pdf in pdfs:
+            if archive_of(pdf) is None:
+                by_size[pdf.size].append(pdf)
+        groups = [g for g in by_size.values() if len(g) > 1]
+        if not groups:
+            return []
+
+        # the cache is shared, concurrent searches would hash the same files
+        with self.__lock, ThreadPoolExecutor(self.workers, "duplicates") as pool:
+            groups = self._split(groups, lambda p: self._hash(p, False), pool)
+            # small files are hashed as a whole already
+            small = [g for g in groups if g[0].size <= 2 * self.edge]
+            large = [g for g in groups if g[0].size > 2 * self.edge]
+            groups = small + self._split(large, lambda p: self._hash(p, True), pool)
+        try:
+            self.cache.save()
+        except OSError as e:
+            logger.warning(f"DuplicateDetector: hash cache is not saved: {e}")
+
+        for group in groups:
+            group.sort(key=lambda p: p.relpath)
+        groups.sort(key=lambda g: (-g[0].size, g[0].relpath))
+        return groups
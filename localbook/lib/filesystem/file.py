@@ -6,6 +6,7 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
+import sys
 from typing import Optional, TypeGuard
 
 from .dir import FSDir
@@ -14,6 +15,8 @@ from .utils import _read_mime
 
 
 class FSFile(FSNode):
+    __slots__ = ("mime",)
+
     def __init__(
         self,
         path: str,
@@ -21,8 +24,8 @@ class FSFile(FSNode):
         mime: Optional[str] = None,
         **kwargs,
     ) -> None:
-        super().__init__(path, parent, **kwargs, typo="f")
-        self.mime = mime or _read_mime(self._path)
+        super().__init__(path, parent, **kwargs)
+        self.mime = sys.intern(mime or _read_mime(path))
 
     def isfile(self) -> bool:
         return True
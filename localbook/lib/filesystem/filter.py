@@ -0,0 +1,139 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 19:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import re
+from typing import Iterable, Optional
+
+
+def _translate(pattern: str) -> str:
+    """regex of gitignore-style glob matched against relpath of entry.
+
+    `*` and `?` don't match `/`, `**` matches any number of directories.
+    Pattern without `/` matches the name at any depth, otherwise it's
+    anchored to the root of the tree.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1 : end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex += "[" + chars.replace("\\", "\\\\") + "]"
+            i = end
+        else:
+            regex += re.escape(c)
+        i += 1
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex + r"\Z"
+
+
+class _PatternList:
+    """gitignore-style list of patterns, the last matching pattern wins.
+
+    Consecutive patterns of the same kind (negated or not, for directories
+    only or not) are compiled into a single regex, so a path is checked
+    against a few regexes whatever the number of patterns is.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = tuple(p for p in (x.strip() for x in patterns) if p)
+        # (matched value, dirs only, compiled alternation of patterns)
+        groups: list[tuple[bool, bool, list[str]]] = []
+        for pattern in self.patterns:
+            if pattern.startswith("#"):
+                continue
+            value = not pattern.startswith("!")
+            pattern = pattern.lstrip("!")
+            dirs_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            if not pattern:
+                continue
+            if groups and groups[-1][:2] == (value, dirs_only):
+                groups[-1][2].append(_translate(pattern))
+            else:
+                groups.append((value, dirs_only, [_translate(pattern)]))
+        self.__groups = [
+            (value, dirs_only, re.compile("|".join(f"(?:{r})" for r in regexes)))
+            for value, dirs_only, regexes in reversed(groups)
+        ]
+
+    def __bool__(self) -> bool:
+        return bool(self.__groups)
+
+    def match(self, relpath: str, isdir: bool) -> Optional[bool]:
+        """returns value of the last matching pattern, `None` if no pattern
+        matches"""
+        for value, dirs_only, regex in self.__groups:
+            if dirs_only and not isdir:
+                continue
+            if regex.match(relpath):
+                return value
+        return None
+
+
+class PathFilter:
+    """Include/exclude rules of entries applied during the scan.
+
+    Patterns use gitignore syntax and are matched against the relpath of
+    entry (`/` separated). An excluded directory is never listed, `!pattern`
+    brings back paths excluded by the previous patterns. If include patterns
+    are set, only files matching them are added, directories are scanned
+    unless they are excluded. Files larger than `max_file_size` are skipped.
+    """
+
+    def __init__(
+        self,
+        exclude: Iterable[str] = (),
+        include: Iterable[str] = (),
+        max_file_size: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            exclude (list[str]): patterns of skipped files and directories
+            include (list[str]): patterns of added files, all files by default
+            max_file_size (int): max size of file in bytes, no limit if not set
+        """
+        self.__exclude = _PatternList(exclude)
+        self.__include = _PatternList(include)
+        self.max_file_size = max_file_size or None
+
+    def __bool__(self) -> bool:
+        return bool(self.__exclude or self.__include or self.max_file_size)
+
+    def options(self) -> tuple:
+        """value that identifies the rules, e.g. for snapshots"""
+        return (self.__exclude.patterns, self.__include.patterns, self.max_file_size)
+
+    def accepts(self, relpath: str, isdir: bool) -> bool:
+        """entry can be a part of tree by its relpath, checked before stat"""
+        if self.__exclude.match(relpath, isdir):
+            return False
+        if isdir or not self.__include:
+            return True
+        return bool(self.__include.match(relpath, isdir))
+
+    def accepts_size(self, size: int) -> bool:
+        return self.max_file_size is None or size <= self.max_file_size
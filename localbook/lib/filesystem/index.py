@@ -0,0 +1,205 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 16:05
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import threading
+from typing import Container, Generic, Iterator, KeysView, Optional, TypeVar
+
+from .dir import FSDir, is_fsdir
+from .node import FSNode
+from .pdf import PDFFile
+from .sort import natural_key
+
+N = TypeVar("N", bound=FSNode)
+
+# physical identity of file: (st_dev, st_ino)
+Identity = tuple[int, int]
+
+
+class NodeSet(Generic[N]):
+    """Insertion ordered set of nodes with cached natural order of names.
+
+    The sorted order is computed on the first request after a change.
+    """
+
+    __slots__ = ("__nodes", "__sorted")
+
+    def __init__(self) -> None:
+        self.__nodes: dict[N, None] = {}
+        self.__sorted: Optional[list[N]] = None
+
+    def __len__(self) -> int:
+        return len(self.__nodes)
+
+    def __iter__(self) -> Iterator[N]:
+        return iter(self.__nodes)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self.__nodes
+
+    def add(self, node: N) -> None:
+        self.__nodes[node] = None
+        self.__sorted = None
+
+    def discard(self, node: N) -> None:
+        if self.__nodes.pop(node, False) is None:
+            self.__sorted = None
+
+    def sorted(self) -> list[N]:
+        """nodes in natural order of names. The list must not be modified"""
+        nodes = self.__sorted
+        if nodes is None:
+            nodes = sorted(self.__nodes, key=lambda x: natural_key(x.name))
+            self.__sorted = nodes
+        return nodes
+
+
+class IdentityIndex:
+    """Physical identities of nodes, i.e. (st_dev, st_ino) of their files.
+
+    Every directory claims its identity, so a directory reachable by several
+    paths (symlinks, loops) is scanned only once. Files claim identities only
+    if they can have other paths: hardlinks and symlinks. The first node of
+    a file is canonical, the other ones are its aliases.
+
+    Aliases share nid with the canonical node and are not indexed as books.
+    A symlink to a file of the tree itself is an alias without identity,
+    its nid is computed from the real path and equals the nid of target.
+    """
+
+    def __init__(self) -> None:
+        self.__nodes: dict[Identity, FSNode] = {}
+        self.__keys: dict[FSNode, Identity] = {}
+        self.__aliases: dict[FSNode, None] = {}
+        self.__lock = threading.Lock()
+
+    def claim(self, node: FSNode, key: Identity) -> Optional[FSNode]:
+        """claim `key` for `node`. Returns the node which claimed it before,
+        in this case `node` is left unregistered"""
+        with self.__lock:
+            first = self.__nodes.setdefault(key, node)
+            if first is not node:
+                return first
+            self.__keys[node] = key
+            return None
+
+    def add_alias(self, node: FSNode, key: Optional[Identity] = None) -> None:
+        with self.__lock:
+            self.__aliases[node] = None
+            if key is not None:
+                self.__keys[node] = key
+
+    def forget(self, node: FSNode) -> Optional[FSNode]:
+        """drop identity of node. If the node was canonical, its first alias
+        becomes canonical and is returned"""
+        with self.__lock:
+            self.__aliases.pop(node, None)
+            key = self.__keys.pop(node, None)
+            if key is None or self.__nodes.get(key) is not node:
+                return None
+            del self.__nodes[key]
+            for alias in self.__aliases:
+                if self.__keys.get(alias) == key:
+                    del self.__aliases[alias]
+                    self.__nodes[key] = alias
+                    return alias
+            return None
+
+    def key(self, node: FSNode) -> Optional[Identity]:
+        return self.__keys.get(node)
+
+    def is_alias(self, node: FSNode) -> bool:
+        return node in self.__aliases
+
+    @property
+    def aliases(self) -> KeysView[FSNode]:
+        return self.__aliases.keys()
+
+    def aliases_of(self, node: FSNode) -> list[FSNode]:
+        """aliases of canonical node"""
+        key = self.__keys.get(node)
+        if key is None or self.__nodes.get(key) is not node:
+            return []
+        with self.__lock:
+            return [a for a in self.__aliases if self.__keys.get(a) == key]
+
+
+class SubtreeIndex:
+    """PDF files of directory subtrees.
+
+    PDFs of a directory (in the order of traversal and in natural order of
+    names) are computed on first request and memoized per directory. The
+    memo is kept while the tree changes: a change drops only the entries of
+    the changed node and its ancestors, a subtree query after it walks only
+    the subtrees that are not memoized. PDF files in `skip` (aliases) are
+    not indexed.
+    """
+
+    def __init__(self, skip: Container[FSNode] = ()) -> None:
+        self.__skip = skip
+        # directory -> PDFs of its subtree in the order of traversal
+        self.__pdfs: dict[FSDir, list[PDFFile]] = {}
+        # directory -> PDFs of its subtree in natural order of names
+        self.__sorted: dict[FSDir, list[PDFFile]] = {}
+
+    def __contains__(self, fsdir: object) -> bool:
+        """PDFs of directory are memoized"""
+        return fsdir in self.__pdfs
+
+    def invalidate(self, node: FSNode) -> None:
+        """drop the entries of `node` and its ancestors"""
+        n: Optional[FSNode] = node
+        while n is not None:
+            if is_fsdir(n):
+                self.discard(n)
+            n = n.parent
+
+    def discard(self, fsdir: FSDir) -> None:
+        """drop the entries of removed directory"""
+        self.__pdfs.pop(fsdir, None)
+        self.__sorted.pop(fsdir, None)
+
+    def count(self, fsdir: FSDir) -> int:
+        """number of PDF files under directory"""
+        return len(self.__collect(fsdir))
+
+    def pdfs(self, fsdir: FSDir) -> list[PDFFile]:
+        """PDF files under directory in the order of traversal"""
+        return list(self.__collect(fsdir))
+
+    def __collect(self, fsdir: FSDir) -> list[PDFFile]:
+        pdfs = self.__pdfs.get(fsdir)
+        if pdfs is not None:
+            return pdfs
+        pdfs = []
+        stack: list[FSNode] = [fsdir]
+        while stack:
+            node = stack.pop()
+            if is_fsdir(node):
+                memo = self.__pdfs.get(node) if node is not fsdir else None
+                if memo is not None:
+                    pdfs.extend(memo)
+                else:
+                    stack.extend(reversed(node.children))
+            elif isinstance(node, PDFFile) and node not in self.__skip:
+                pdfs.append(node)
+        self.__pdfs[fsdir] = pdfs
+        return pdfs
+
+    def sorted_pdfs(
+        self,
+        fsdir: FSDir,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> list[PDFFile]:
+        """page of PDF files under directory in natural order of names"""
+        pdfs = self.__sorted.get(fsdir)
+        if pdfs is None:
+            pdfs = sorted(self.__collect(fsdir), key=lambda x: natural_key(x.name))
+            self.__sorted[fsdir] = pdfs
+        end = None if limit is None else offset + limit
+        return pdfs[offset:end]
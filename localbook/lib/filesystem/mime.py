@@ -0,0 +1,189 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 14:02
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import collections
+import logging
+import os
+import pickle
+import struct
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("localbook")
+
+MIME_CACHE_MAGIC = b"LBMIME"
+MIME_CACHE_VERSION = 1
+_HEADER = struct.Struct(f"<{len(MIME_CACHE_MAGIC)}sI")
+
+
+# test of signature: (first bytes of file, file name) -> matched
+SignatureTest = Callable[[bytes, str], bool]
+
+
+class MimeClassifier:
+    """Tiered MIME classifier.
+
+    Cheap signatures are checked against the first `head_size` bytes of file
+    and its name. Only when none of them matches the file is ambiguous and
+    should be passed to libmagic.
+
+    Other formats can be registered with `register` or `register_magic`,
+    signatures are checked in order of registration.
+    """
+
+    def __init__(self, head_size: int = 1024) -> None:
+        self.head_size = head_size
+        self.__signatures: list[tuple[str, SignatureTest]] = []
+
+    def register(self, mime: str, test: SignatureTest) -> None:
+        """register signature test of `mime` type"""
+        self.__signatures.append((mime, test))
+
+    def register_magic(self, mime: str, magic: bytes, offset: int = 0) -> None:
+        """register `mime` type of files with `magic` bytes at `offset`"""
+        end = offset + len(magic)
+        self.register(mime, lambda head, _: head[offset:end] == magic)
+
+    def match(self, head: bytes, name: str = "") -> Optional[str]:
+        """returns MIME type if the file is recognized by its signature"""
+        for mime, test in self.__signatures:
+            if test(head, name):
+                return mime
+        return None
+
+
+def _pdf_signature(head: bytes, name: str) -> bool:
+    """PDF header `%PDF-` is at the start of file. The specification allows
+    it anywhere in the first 1024 bytes, which is trusted only for `.pdf`
+    files."""
+    pos = head.find(b"%PDF-", 0, 1024)
+    if pos == 0:
+        return True
+    return pos > 0 and name.lower().endswith(".pdf")
+
+
+def _djvu_signature(head: bytes, _: str) -> bool:
+    return head[:8] == b"AT&TFORM" and head[12:16] in (b"DJVU", b"DJVM")
+
+
+def _epub_signature(head: bytes, _: str) -> bool:
+    return head[:4] == b"PK\x03\x04" and head[30:58] == b"mimetypeapplication/epub+zip"
+
+
+default_classifier = MimeClassifier()
+default_classifier.register("application/pdf", _pdf_signature)
+default_classifier.register("application/epub+zip", _epub_signature)
+default_classifier.register("image/vnd.djvu", _djvu_signature)
+default_classifier.register_magic("image/png", b"\x89PNG\r\n\x1a\n")
+default_classifier.register_magic("image/jpeg", b"\xff\xd8\xff")
+default_classifier.register_magic("image/gif", b"GIF87a")
+default_classifier.register_magic("image/gif", b"GIF89a")
+
+
+def register_signature(mime: str, test: SignatureTest) -> None:
+    """register signature of `mime` type in the default classifier"""
+    default_classifier.register(mime, test)
+
+
+class MimeCache:
+    """Persistent cache of MIME types of files.
+
+    Entries are stored by (st_dev, st_ino) and are valid only while the size
+    and mtime (ns) of the file are the same, so a hit never needs to read
+    the content of file. Stale entries are dropped on lookup, the least
+    recently used ones are evicted when the cache is full.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 500_000) -> None:
+        """
+        Args:
+            path (str): cache file, the cache lives in memory only if not set
+            max_entries (int): max number of entries
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.__entries: collections.OrderedDict[
+            tuple[int, int], tuple[int, int, str]
+        ] = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, st: os.stat_result) -> Optional[str]:
+        """returns cached MIME type of the file with stat `st`"""
+        key = (st.st_dev, st.st_ino)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                size, mtime_ns, mime = entry
+                if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return mime
+                # file is changed, entry is stale
+                del self.__entries[key]
+                self.__dirty = True
+            self.misses += 1
+            return None
+
+    def put(self, st: os.stat_result, mime: str) -> None:
+        key = (st.st_dev, st.st_ino)
+        with self.__lock:
+            self.__entries[key] = (st.st_size, st.st_mtime_ns, mime)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+            self.__dirty = True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self.__entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def load(self) -> bool:
+        """read the cache file. returns `False` if it can't be used"""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                magic, version = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != MIME_CACHE_MAGIC or version != MIME_CACHE_VERSION:
+                    logger.warning(f"MimeCache: unsupported cache {self.path}")
+                    return False
+                entries = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"MimeCache: corrupted cache {self.path}: {e}")
+            return False
+
+        with self.__lock:
+            self.__entries = collections.OrderedDict(entries)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+            self.__dirty = False
+        return True
+
+    def save(self) -> None:
+        """write the cache file if entries were changed"""
+        if self.path is None or not self.__dirty:
+            return
+        with self.__lock:
+            entries = list(self.__entries.items())
+            self.__dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MIME_CACHE_MAGIC, MIME_CACHE_VERSION))
+            pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
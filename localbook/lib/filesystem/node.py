@@ -6,18 +6,34 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
+import base64
 import hashlib
 import os
+import sys
 from datetime import datetime
 from typing import Optional
 
 from hurry.filesize import alternative, size
 
 
+# id scheme of new NIDs: "blake2b" (16 chars) or legacy "sha256" (64 chars)
+NID_SCHEME = "blake2b"
+
+
+def _digest(path: str, scheme: str) -> str:
+    if scheme == "blake2b":
+        # 80-bit digest is 16 chars in base32 without padding
+        digest = hashlib.blake2b(path.encode(), digest_size=10).digest()
+        return base64.b32encode(digest).decode().lower()
+    if scheme == "sha256":
+        return hashlib.sha256(path.encode()).hexdigest()
+    raise ValueError(f"unknown NID scheme: {scheme}")
+
+
 class NID(str):
-    def __new__(cls, path: str, hash: bool = True):
+    def __new__(cls, path: str, hash: bool = True, scheme: Optional[str] = None):
         if hash:
-            value = hashlib.sha256(path.encode()).hexdigest()
+            value = _digest(path, scheme or NID_SCHEME)
         else:
             value = path
         return super().__new__(cls, value)
@@ -27,21 +43,49 @@ class NID(str):
 
 
 class FSNode:
+    # Nodes don't have `__dict__`, a tree can have millions of them.
+    # Only the name of node is stored, its paths are built from the parent
+    # chain. `__real` holds the absolute path of root and of nodes which are
+    # not located in the directory of parent (e.g. followed symlinks).
+    __slots__ = ("name", "parent", "size", "mtime", "__nid", "__real")
+
     def __init__(
         self,
         path: str,
         parent: Optional["FSNode"] = None,
         **kwargs,
     ) -> None:
-        self._path = path
         self.parent = parent
-        # type of node: file or directory: "f" | "d"
-        self.__typo = kwargs.get("typo", "f")
-        self.__nid: str = kwargs.get("_nid") or NID(path)
-        self.size: int = kwargs.get("size") or os.stat(path).st_size
-        self.mtime = kwargs.get("mtime") or os.path.getmtime(path)
-        self.name = os.path.basename(path)
+        # followed symlink keeps its own name, `path` is the real one
+        self.name = sys.intern(kwargs.get("name") or os.path.basename(path))
+        self.__real: Optional[str] = None
+        if parent is None or os.path.join(parent._path, self.name) != path:
+            self.__real = path
+        # nid is computed on first access, most of nodes never need it
+        self.__nid: Optional[str] = kwargs.get("_nid")
+        size, mtime = kwargs.get("size"), kwargs.get("mtime")
+        if size is None or mtime is None:
+            st = os.stat(path)
+            size = st.st_size if size is None else size
+            mtime = st.st_mtime if mtime is None else mtime
+        self.size: int = size
+        self.mtime: float = mtime
+
+    @property
+    def _path(self) -> str:
+        """absolute path of node"""
+        names: list[str] = []
+        node = self
+        while node.__real is None:
+            assert node.parent is not None
+            names.append(node.name)
+            node = node.parent
+        if not names:
+            return node.__real
+        return os.path.join(node.__real, *reversed(names))
 
+    @property
+    def relpath(self) -> str:
         # `relpath` is a trimmed absolute path to prevent the client
         # from seeing real system paths.
         # Users can access files and directories only via this relative path.
@@ -50,12 +94,37 @@ class FSNode:
         # All nodes in the filesystem tree (FSTree) are stored relative to this root.
         # For instance, if a file has an absolute path `/home/user/books/a/b/c/file.txt`,
         # it can only be accessed via `relpath = "a/b/c/file.txt"`.
-        self.relpath = ""
-        if self.parent is not None:
-            self.relpath = os.path.join(self.parent.relpath, self.name)
+        if self.parent is None:
+            return ""
+        names = [self.name]
+        node = self.parent
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return os.path.join(*reversed(names))
+
+    def _relocate(
+        self,
+        path: str,
+        parent: Optional["FSNode"],
+        name: Optional[str] = None,
+    ) -> None:
+        """move node to `path` inside `parent` (children are not affected)"""
+        self.parent = parent
+        self.name = sys.intern(name or os.path.basename(path))
+        self.__real = None
+        if parent is None or os.path.join(parent._path, self.name) != path:
+            self.__real = path
+        self.__nid = None
+
+    def _alias(self, node: "FSNode") -> None:
+        """share identity (nid) of `node`, another path of the same file"""
+        self.__nid = node.nid
 
     @property
     def nid(self) -> str:
+        if self.__nid is None:
+            self.__nid = str(NID(self._path))
         return str(self.__nid)
 
     def isfile(self) -> bool:
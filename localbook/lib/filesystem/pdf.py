@@ -15,6 +15,8 @@ from .utils import _read_mime
 
 
 class PDFFile(FSFile):
+    __slots__ = ()
+
     def __init__(
         self,
         path: str,
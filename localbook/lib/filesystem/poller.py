@@ -0,0 +1,345 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 20:30
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import collections
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from watchfiles import Change
+
+from .archive import is_archive
+from .dir import FSDir, is_fsdir
+from .node import FSNode
+from .tree import FSTree
+from .watcher import FSTreeWatcher
+
+logger = logging.getLogger("localbook")
+
+# filesystems without inotify events for changes made by other hosts
+NETWORK_FS = frozenset(
+    {
+        "nfs",
+        "nfs4",
+        "cifs",
+        "smb3",
+        "smbfs",
+        "9p",
+        "afs",
+        "ceph",
+        "glusterfs",
+        "lustre",
+        "fuse.sshfs",
+        "fuse.rclone",
+        "fuse.s3fs",
+        "davfs",
+    }
+)
+
+
+def _unescape_mount(field: str) -> str:
+    """spaces and tabs are escaped in /proc/mounts as octal numbers"""
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def fs_type(path: str, mounts: str = "/proc/mounts") -> Optional[str]:
+    """type of filesystem `path` is mounted on, `None` if it's unknown"""
+    path = os.path.realpath(path)
+    found: Optional[tuple[str, str]] = None
+    try:
+        with open(mounts, "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = _unescape_mount(fields[1])
+                prefix = mount_point.rstrip("/") + "/"
+                if path != mount_point and not path.startswith(prefix):
+                    continue
+                # the longest mount point is the one the path is on
+                if found is None or len(mount_point) >= len(found[0]):
+                    found = (mount_point, fields[2])
+    except OSError:
+        return None
+    return found and found[1]
+
+
+def watch_backend(path: str, mounts: str = "/proc/mounts") -> str:
+    """`poll` for network filesystems, `events` otherwise"""
+    if fs_type(path, mounts) in NETWORK_FS:
+        return "poll"
+    return "events"
+
+
+def _is_listed_dir(node: FSNode) -> bool:
+    """node is a directory on disk"""
+    return is_fsdir(node) and not is_archive(node)
+
+
+class _DirState:
+    __slots__ = ("mtime", "interval", "due")
+
+    def __init__(self, mtime: Optional[float], interval: float, due: float) -> None:
+        self.mtime = mtime
+        self.interval = interval
+        self.due = due
+
+
+class FSTreePoller:
+    """Keeps `FSTree` up to date by polling, for filesystems without events.
+
+    Every directory is checked by `stat` on its own schedule. Only
+    directories whose mtime changed are listed again and compared with the
+    tree, the differences are applied as a batch of changes by
+    `FSTreeWatcher`, so moves between directories are detected as well.
+
+    The interval of directory is halved when it changes and grows while it
+    doesn't, within `min_interval` and `max_interval`. The number of
+    filesystem calls (stat and listing) per second is limited by
+    `io_budget`, due directories are deferred when it's spent.
+
+    A file rewritten in place doesn't change the mtime of its directory,
+    such changes are noticed on the next listing of the directory.
+
+    Like `FSTreeWatcher` it keeps polling while the tree is rebuilt, see
+    `record` and `replay`.
+    """
+
+    def __init__(
+        self,
+        fstree: FSTree,
+        interval: float = 5.0,
+        min_interval: float = 1.0,
+        max_interval: float = 300.0,
+        io_budget: int = 200,
+        step: float = 0.5,
+        path: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            fstree (FSTree): tree to patch
+            interval (float): initial interval in seconds between checks
+            min_interval (float): interval of often changed directories
+            max_interval (float): interval of directories that never change
+            io_budget (int): max filesystem calls per second
+            step (float): time in seconds between polls
+            path (str): directory to poll, e.g. one of named roots of tree.
+                The root of tree by default
+        """
+        self.fstree = fstree
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.io_budget = io_budget
+        self.step = step
+        self.path = path
+        self.__watcher = FSTreeWatcher(fstree)
+        self.__states: dict[str, _DirState] = {}
+        self.__queue: list[tuple[float, str]] = []
+        self.__tokens = float(io_budget)
+        self.__refilled: Optional[float] = None
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        # directories scanned by `FSTree.expand` since the last poll
+        self.__expanded: collections.deque[FSDir] = collections.deque()
+        fstree.on_expand(self.__expanded.append)
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.fstree.off_expand(self.__expanded.append)
+        self.fstree.on_expand(self.__expanded.append)
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self._run,
+            name="fstree-poller",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.fstree.off_expand(self.__expanded.append)
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def record(self) -> None:
+        """keep changes applied from now on, until `replay`"""
+        self.__watcher.record()
+
+    def replay(self, fstree: FSTree) -> None:
+        """poll directories of `fstree` from now on and apply to it the
+        changes kept since `record`"""
+        if fstree is not self.fstree:
+            # the rebuilt tree has the listeners of expansions already
+            self.fstree.off_expand(self.__expanded.append)
+            fstree.off_expand(self.__expanded.append)
+            fstree.on_expand(self.__expanded.append)
+            self.fstree = fstree
+        self.__watcher.replay(fstree)
+
+    def _run(self) -> None:
+        while not self.__stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("FSTreePoller: failed to poll")
+            self.__stop.wait(self.step)
+
+    def interval_of(self, path: str) -> Optional[float]:
+        """current polling interval of directory"""
+        state = self.__states.get(path)
+        return state and state.interval
+
+    def _schedule(self, path: str, state: _DirState, due: float) -> None:
+        state.due = due
+        self.__states[path] = state
+        heapq.heappush(self.__queue, (due, path))
+
+    def _track(self, fsdir: FSDir, now: float) -> None:
+        """start polling of directory and its subdirectories, the first
+        checks are spread over the interval. Tracked directories are kept
+        on their schedule"""
+        dirs: list[FSDir] = []
+        stack = [fsdir]
+        while stack:
+            node = stack.pop()
+            if node._path not in self.__states:
+                dirs.append(node)
+            # archives are checked as files by listings of their parents
+            stack.extend(c for c in node.children if _is_listed_dir(c))
+        for i, node in enumerate(dirs):
+            due = now + self.interval * (i + 1) / len(dirs)
+            self._schedule(node._path, _DirState(node.mtime, self.interval, 0), due)
+
+    def _dir_node(self, path: str) -> Optional[FSDir]:
+        relpath = self.fstree.root_relative(path)
+        if relpath == os.curdir:
+            return self.fstree.get_root_node()
+        node = self.fstree.get_node(relpath, expand=False)
+        return node if is_fsdir(node) else None
+
+    def _in_scope(self, fsdir: FSDir) -> bool:
+        """directory is polled by this poller"""
+        if self.path is None:
+            return True
+        relpath = os.path.relpath(fsdir._path, self.path)
+        return not relpath.startswith(os.pardir)
+
+    def _accepts_dir(self, path: str) -> bool:
+        """directory can be a part of tree, i.e. is worth polling while
+        it's not in the tree (empty directories are pruned)"""
+        fstree = self.fstree
+        if fstree.builder_args["ignore_hidden"] and os.path.basename(path)[0] == ".":
+            return False
+        return fstree.accepts(path, True)
+
+    def _diff(self, path: str) -> set[tuple[Change, str]]:
+        """changes of directory entries compared with the tree"""
+        fsdir = self._dir_node(path)
+        if fsdir is not None and not self.fstree.is_expanded(fsdir):
+            # will be scanned as a whole
+            return set()
+        children = {c.name: c for c in fsdir.children} if fsdir else {}
+        changes: set[tuple[Change, str]] = set()
+        self.__tokens -= 1
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return changes
+        for entry in entries:
+            child = children.pop(entry.name, None)
+            try:
+                isdir = entry.is_dir()
+            except OSError:
+                continue
+            if child is None:
+                changes.add((Change.added, entry.path))
+            elif _is_listed_dir(child) != isdir:
+                changes.add((Change.deleted, entry.path))
+                changes.add((Change.added, entry.path))
+            elif not isdir:
+                self.__tokens -= 1
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if (st.st_size, st.st_mtime) != (child.size, child.mtime):
+                    changes.add((Change.modified, entry.path))
+        for name in children:
+            changes.add((Change.deleted, os.path.join(path, name)))
+        return changes
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """check due directories within the I/O budget and apply found
+        changes to the tree. Returns number of changed directories"""
+        now = time.monotonic() if now is None else now
+        if self.__refilled is not None:
+            elapsed = now - self.__refilled
+            self.__tokens = min(
+                self.io_budget, self.__tokens + elapsed * self.io_budget
+            )
+        self.__refilled = now
+        if not self.__states:
+            root = self.fstree.get_root_node()
+            if self.path is not None:
+                root = self._dir_node(self.path)
+            if root is not None:
+                self._track(root, now)
+        # subdirectories found by scans of lazy mode
+        while self.__expanded:
+            fsdir = self.__expanded.popleft()
+            if self._in_scope(fsdir) and self._dir_node(fsdir._path) is fsdir:
+                self._track(fsdir, now)
+
+        changed = 0
+        changes: set[tuple[Change, str]] = set()
+        queue = self.__queue
+        while queue and queue[0][0] <= now and self.__tokens >= 1:
+            due, path = heapq.heappop(queue)
+            state = self.__states.get(path)
+            if state is None or state.due != due:  # rescheduled
+                continue
+            self.__tokens -= 1
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                # removal is found by listing of the parent
+                del self.__states[path]
+                continue
+            if mtime == state.mtime:
+                state.interval = min(self.max_interval, state.interval * 1.5)
+            else:
+                changed += 1
+                state.mtime = mtime
+                state.interval = max(self.min_interval, state.interval / 2)
+                changes |= self._diff(path)
+            self._schedule(path, state, now + state.interval)
+
+        if changes:
+            logger.debug(f"FSTreePoller: {len(changes)} changes in {changed} dirs")
+            self.__watcher.apply(changes)
+            for change, path in changes:
+                if change != Change.added or not os.path.isdir(path):
+                    continue
+                fsdir = self._dir_node(path)
+                if fsdir is not None:
+                    self._track(fsdir, now)
+                elif path not in self.__states and self._accepts_dir(path):
+                    # not in the tree while empty, listed on the first check
+                    self._schedule(path, _DirState(None, self.interval, 0), now)
+        return changed
@@ -0,0 +1,144 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 23:20
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from .tree import FSTree
+
+logger = logging.getLogger("localbook")
+
+
+class FSTreeRescanner:
+    """Rebuilds `FSTree` in background, periodically or on request.
+
+    The new tree is built by `FSTree.rebuild` while the current one keeps
+    serving requests, then it's handed to `publish`, which replaces the
+    reference to the tree at once. Every published tree gets the next
+    generation number.
+
+    Changes found by the watchers during the rescan may be missed by it:
+    `suspend` is called before the rescan to make the watchers keep them,
+    `publish` replays them onto the new tree (or drops them if the rescan
+    failed and the current tree is published again).
+    """
+
+    def __init__(
+        self,
+        fstree: FSTree,
+        publish: Callable[[FSTree], None],
+        interval: Optional[float] = None,
+        suspend: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Args:
+            fstree (FSTree): current tree
+            publish (Callable): makes the new tree current
+            interval (float): seconds between rescans, only on request if
+                not set
+            suspend (Callable): prepares the watchers for the swap
+        """
+        self.fstree = fstree
+        self.publish = publish
+        self.interval = interval
+        self.suspend = suspend
+        self.generation = 0
+        # duration in seconds and changed directories of the last rescan
+        self.last_duration: Optional[float] = None
+        self.last_changed: Optional[int] = None
+        self.last_finished: Optional[float] = None
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    @property
+    def busy(self) -> bool:
+        """rescan is in progress"""
+        return self.__lock.locked()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self._run,
+            name="fstree-rescanner",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def request(self) -> bool:
+        """rescan as soon as possible. Returns `False` if a rescan is in
+        progress already"""
+        if self.busy:
+            return False
+        self.__wakeup.set()
+        return True
+
+    def _run(self) -> None:
+        while not self.__stop.is_set():
+            self.__wakeup.wait(self.interval)
+            self.__wakeup.clear()
+            if self.__stop.is_set():
+                return
+            try:
+                self.rescan()
+            except Exception:
+                logger.exception("FSTreeRescanner: failed to rescan")
+
+    def rescan(self) -> FSTree:
+        """build and publish the new tree, returns it"""
+        with self.__lock:
+            start = time.perf_counter()
+            if self.suspend is not None:
+                self.suspend()
+            try:
+                fstree = self.fstree.rebuild()
+            except Exception:
+                self.publish(self.fstree)
+                raise
+            # directories of the new tree that are new or modified
+            mtimes = {d._path: d.mtime for d in self.fstree.dir_list()}
+            changed = sum(
+                1 for d in fstree.dir_list() if mtimes.get(d._path) != d.mtime
+            )
+            self.publish(fstree)
+            self.fstree = fstree
+            self.generation += 1
+            self.last_duration = time.perf_counter() - start
+            self.last_changed = changed
+            self.last_finished = time.time()
+        logger.info(
+            f"FSTreeRescanner: generation {self.generation}, {changed} changed "
+            f"directories in {self.last_duration:.2f}s"
+        )
+        return fstree
+
+    def status(self) -> dict:
+        return {
+            "generation": self.generation,
+            "busy": self.busy,
+            "last_duration": self.last_duration,
+            "last_changed": self.last_changed,
+            "last_finished": self.last_finished,
+            "interval": self.interval,
+        }
@@ -0,0 +1,129 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 11:05
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import logging
+import os
+import pickle
+import struct
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger("localbook")
+
+SNAPSHOT_MAGIC = b"LBFSTREE"
+SNAPSHOT_VERSION = 4
+_HEADER = struct.Struct(f"<{len(SNAPSHOT_MAGIC)}sI")
+
+# Entry of directory listing:
+#   (name, kind, link, size, mtime, mime, identity)
+# `kind` is "d", "f" or "a" (zip archive, its members are read again),
+# `link` is the real path of a followed symlink or None,
+# `size`, `mtime` and `mime` are None for directories, they are stated anyway.
+# `identity` is (st_dev, st_ino) of files that can have other paths or None.
+SnapshotRecord = tuple[
+    str,
+    str,
+    Optional[str],
+    Optional[int],
+    Optional[float],
+    Optional[str],
+    Optional[tuple[int, int]],
+]
+
+
+class FSTreeSnapshot:
+    """Persistent snapshot of the directory listings of `FSTree`.
+
+    Every scanned directory is stored with its mtime and its entries
+    (name, type, mime, size and mtime). A listing is reused on the next
+    build only while the mtime of the directory is the same, otherwise the
+    directory is scanned again. Files changed in place (without touching the
+    directory) are not noticed until the directory itself changes.
+
+    The snapshot is dropped when it is corrupted, written by another
+    `SNAPSHOT_VERSION` or built with other tree options. Without a file
+    it only holds listings given to `restore`, e.g. by a rebuild.
+    """
+
+    def __init__(
+        self, path: Optional[str], options: Optional[dict[str, Any]] = None
+    ) -> None:
+        """
+        Args:
+            path (str): snapshot file, `None` keeps listings in memory only
+            options (dict): builder options, the snapshot is valid only
+                for the same options
+        """
+        self.path = path
+        self.options = options or {}
+        self.__old: dict[str, tuple[float, list[SnapshotRecord]]] = {}
+        self.__new: dict[str, tuple[float, list[SnapshotRecord]]] = {}
+        self.__lock = threading.Lock()
+        self.reused = 0
+        self.scanned = 0
+
+    def load(self) -> bool:
+        """read the snapshot file. returns `False` if it can't be used"""
+        self.__old = {}
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                magic, version = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    logger.warning(f"FSTreeSnapshot: unsupported snapshot {self.path}")
+                    return False
+                options, listings = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"FSTreeSnapshot: corrupted snapshot {self.path}: {e}")
+            return False
+
+        if options != self.options:
+            return False
+        self.__old = listings
+        return True
+
+    def restore(self, listings: dict[str, tuple[float, list[SnapshotRecord]]]) -> None:
+        """use `listings` instead of the file, e.g. listings of the tree
+        that is rebuilt"""
+        self.__old = listings
+
+    def save(self) -> None:
+        """write listings collected by `put` to the snapshot file"""
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION))
+            pickle.dump((self.options, self.__new), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def get(self, path: str, mtime: float) -> Optional[list[SnapshotRecord]]:
+        """returns stored listing of directory if it was not modified"""
+        listing = self.__old.get(path)
+        with self.__lock:
+            if listing is None or listing[0] != mtime:
+                self.scanned += 1
+                return None
+            self.reused += 1
+        return listing[1]
+
+    def get_stale(self, path: str) -> dict[str, SnapshotRecord]:
+        """returns stored entries of modified directory by their names"""
+        listing = self.__old.get(path)
+        if listing is None:
+            return {}
+        return {record[0]: record for record in listing[1]}
+
+    def put(self, path: str, mtime: float, records: list[SnapshotRecord]) -> None:
+        self.__new[path] = (mtime, records)
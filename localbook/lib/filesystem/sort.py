@@ -0,0 +1,31 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 17:45
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import re
+from typing import Literal
+
+# orders of directory listings
+SortOrder = Literal["name", "dirs", "mtime", "size"]
+ORDERS: tuple[SortOrder, ...] = ("name", "dirs", "mtime", "size")
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def natural_key(name: str) -> tuple:
+    """case-insensitive sort key which compares numbers by value,
+    so "Vol 2" goes before "Vol 10".
+
+    Text and numbers alternate in the first item, so its items always
+    have the same types at the same positions. The name itself, the
+    second item, breaks ties.
+    """
+    parts = _DIGITS.split(name.casefold())
+    key: list[str | int] = [
+        int(part) if i % 2 else part for i, part in enumerate(parts)
+    ]
+    return (tuple(key), name)
@@ -8,20 +8,55 @@
 
 
 import collections
+import contextlib
 import logging
 import os
+import stat
 import sys
-from typing import Iterable, Optional
+import threading
+import zipfile
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
 
-from .dir import FSDir, is_fsdir
-from .file import FSFile, is_fsfile
+from .archive import ARCHIVE_MIME, ZipArchive, is_archive
+from .columns import NodeColumns
+from .dir import DirStats, FSDir, is_fsdir
+from .filter import PathFilter
+from .file import FSFile
+from .index import Identity, IdentityIndex, NodeSet, SubtreeIndex
+from .mime import MimeCache
 from .node import FSNode
-from .pdf import PDFFile, is_pdf
+from .pdf import PDFFile
+from .snapshot import FSTreeSnapshot, SnapshotRecord
+from .utils import _read_mime
 
 logger = logging.getLogger("localbook")
 
 
+def _drop_empty_dirs(dirs: list[FSDir]) -> set[FSDir]:
+    """post-order finish step: remove empty directories in place.
+
+    `dirs` must contain every directory after its parent (e.g. in BFS or
+    pre-order), so walking it backwards visits children before parents
+    without recursion. Returns dropped directories, the first directory
+    of `dirs` is never detached, it's dropped only if it's empty.
+    """
+    dropped: set[FSDir] = set()
+    for fsdir in reversed(dirs):
+        children = fsdir.children
+        if dropped and any(n in dropped for n in children if n.isdir()):
+            fsdir.drop_children(dropped)
+        if not fsdir.children:
+            dropped.add(fsdir)
+    return dropped
+
+
 class _FSTreeNormalizer:
+    """Normalizes an already built tree (depth limit and empty directories).
+
+    Trees scanned by `_FSTreeBuilder` are normalized during the scan.
+    """
+
     def __init__(
         self,
         root: FSDir,
@@ -48,15 +83,18 @@ class _FSTreeNormalizer:
 
     def _prune(self, root: FSDir, max_depth: int, _current_depth=1) -> None:
         """Prune the tree to a specific depth."""
-        if _current_depth >= max_depth:
-            root.children = []
-            return
-        for n in root.iter_children():
-            if is_fsdir(n):
-                self._prune(n, max_depth, _current_depth + 1)
+        stack = [(root, _current_depth)]
+        while stack:
+            fsdir, depth = stack.pop()
+            if depth >= max_depth:
+                fsdir.children = []
+                continue
+            for n in fsdir.iter_children():
+                if is_fsdir(n):
+                    stack.append((n, depth + 1))
 
     def _drop_empty(self, root: FSDir) -> bool:
-        """Remove empty FSDir nodes recursively in place.
+        """Remove empty FSDir nodes in place.
 
         Empty directories are removed from the tree
 
@@ -65,19 +103,15 @@ class _FSTreeNormalizer:
         Returns:
             bool: FSDir.children is empty or not
         """
-        nodes = list(root.iter_children())
-        if not nodes:
-            return True
-        normalized_nodes: list[FSNode] = []
-        for node in nodes:
-            if is_fsdir(node):
-                is_empty = self._drop_empty(node)
-                if not is_empty:
-                    normalized_nodes.append(node)
-            else:
-                normalized_nodes.append(node)
-        root.children = normalized_nodes
-        return not normalized_nodes
+        dirs: list[FSDir] = []
+        stack = [root]
+        while stack:
+            fsdir = stack.pop()
+            dirs.append(fsdir)
+            for n in fsdir.iter_children():
+                if is_fsdir(n):
+                    stack.append(n)
+        return root in _drop_empty_dirs(dirs)
 
     def exec(self) -> None:
         if self.check_depth:
@@ -88,6 +122,39 @@ class _FSTreeNormalizer:
             self._drop_empty(self.__root)
 
 
+class _PathEntry:
+    """`os.DirEntry` alike view of a single path.
+
+    Lets `_FSTreeBuilder` create nodes for paths that don't come from
+    `os.scandir`, e.g. paths reported by a watcher.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = os.path.basename(path)
+        self.__stat: Optional[os.stat_result] = None
+
+    def is_symlink(self) -> bool:
+        return os.path.islink(self.path)
+
+    def stat(self) -> os.stat_result:
+        if self.__stat is None:
+            self.__stat = os.stat(self.path)
+        return self.__stat
+
+    def is_file(self) -> bool:
+        try:
+            return stat.S_ISREG(self.stat().st_mode)
+        except OSError:
+            return False
+
+    def is_dir(self) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat().st_mode)
+        except OSError:
+            return False
+
+
 class _FSTreeBuilder:
     def __init__(
         self,
@@ -96,6 +163,15 @@ class _FSTreeBuilder:
         follow_symlink=False,
         ignore_hidden=True,
         normalize=True,
+        workers=1,
+        snapshot_file: Optional[str] = None,
+        mime_cache: Optional[MimeCache] = None,
+        lazy_depth: Optional[int] = None,
+        identities: Optional[IdentityIndex] = None,
+        path_filter: Optional[PathFilter] = None,
+        parent: Optional[FSDir] = None,
+        name: Optional[str] = None,
+        listings: Optional[dict[str, tuple[float, list[SnapshotRecord]]]] = None,
     ) -> None:
         """
         Args:
@@ -104,83 +180,556 @@ class _FSTreeBuilder:
             follow_symlink (bool): follow symlinks
             ignore_hidden (bool): ignore dotfiles
             normalize (bool): ignore empty directories
+            workers (int): number of scanning threads. `1` scans serially,
+                otherwise directories are listed on one thread pool and
+                MIME sniffing of files runs on another one
+            snapshot_file (str): file of `FSTreeSnapshot`. Listings of
+                unchanged directories are restored from it instead of scanning
+            mime_cache (MimeCache): cache consulted before sniffing files
+            lazy_depth (int): scan only this number of levels, directories
+                of the last level are left unscanned in `frontier`
+            identities (IdentityIndex): physical identities of nodes, shared
+                by builders of the same tree
+            path_filter (PathFilter): include/exclude rules of entries
+            parent (FSDir): directory the scanned root belongs to, e.g. the
+                namespace of several roots. Relpaths of nodes start from it
+            name (str): name of the scanned root in `parent`
+            listings (dict): listings of directories like in `FSTreeSnapshot`,
+                used instead of `snapshot_file`, e.g. those of the tree that
+                is rebuilt. The snapshot file is still written
         """
+        self.__parent = parent
+        self.__name = name
         if isinstance(root, FSDir):
             self.__fsdir: None | FSDir = root
             self.__rpath = None
+            self.__real_root = os.path.realpath(root._path)
+            # relpath of the scanned root, e.g. its name among several roots
+            self.__base = root.relpath
         else:
             self.__fsdir = None
             self.__rpath: None | str = root
+            self.__real_root = os.path.realpath(root)
+            self.__base = parent and os.path.join(parent.relpath, name or "") or ""
         self.max_depth = max_depth
         self.follow_symlink = follow_symlink
         self.ignore_hidden = ignore_hidden
         self.normalize = normalize
+        self.workers = max(1, workers)
+        self.mime_cache = mime_cache
+        self.lazy_depth = lazy_depth
+        self.identities = identities if identities is not None else IdentityIndex()
+        self.path_filter = path_filter or PathFilter()
+        self.frontier: list[FSDir] = []
+        # directories that lost empty subdirectories on the scan, their
+        # nodes don't tell the whole listing
+        self.pruned: set[str] = set()
+        # identities claimed by scan threads of the parallel scan, they are
+        # registered in the order of the serial scan by `_settle`
+        self.__deferred: Optional[dict[FSNode, tuple[Optional[Identity], bool]]] = None
+        self.__deferred_lock = threading.Lock()
+        self.snapshot: Optional[FSTreeSnapshot] = None
+        self.__listings = listings
+        if (snapshot_file or listings is not None) and self.__rpath is not None:
+            options = {
+                "root": os.path.abspath(self.__rpath),
+                "max_depth": max_depth,
+                "follow_symlink": follow_symlink,
+                "ignore_hidden": ignore_hidden,
+                "path_filter": self.path_filter.options(),
+            }
+            self.snapshot = FSTreeSnapshot(snapshot_file, options)
+
+    def _create_node(
+        self,
+        entry: os.DirEntry,
+        parent: FSDir,
+        path: Optional[str] = None,
+        known: Optional[SnapshotRecord] = None,
+    ) -> FSNode | None:
+        """create an instance based on the proposed directory entry.
 
-    def _create_node(self, x: str, parent: FSDir) -> FSNode | None:
-        """create an instance based on the proposed path of entry.
+        Only files and directory are processed, zip archives become
+        directories of their members. The type of entry and its `stat` are
+        taken from `os.DirEntry`, so at most one stat call is made.
 
-        Only files and directory are processed.
+        Args:
+            entry (os.DirEntry): entry of parent directory
+            parent (FSDir): parent node
+            path (str): path of the node, `entry.path` by default
+            known (SnapshotRecord): previous record of the entry, its mime
+                is reused if the size and mtime of file are the same
         """
-        if os.path.isfile(x):
-            if is_pdf(x):
-                return PDFFile(x, parent)
-            return FSFile(x, parent)
-        elif os.path.isdir(x):
-            return FSDir(x, parent)
-        else:  # ignore other type of files
+        path = path or entry.path
+        linked = path != entry.path
+        try:
+            if entry.is_file():
+                st = entry.stat()
+                if not self.path_filter.accepts_size(st.st_size):
+                    return None
+                if known and known[3:5] == (st.st_size, st.st_mtime):
+                    mime = known[5]
+                else:
+                    mime = self._sniff(path, st)
+                if mime == ARCHIVE_MIME:
+                    return self._create_archive(path, parent, entry.name, st)
+                cls = PDFFile if mime == "application/pdf" else FSFile
+                node = cls(
+                    path,
+                    parent,
+                    mime,
+                    name=entry.name,
+                    size=st.st_size,
+                    mtime=st.st_mtime,
+                )
+                key = None
+                if st.st_nlink > 1 or (linked and not self._in_tree(path, False)):
+                    key = (st.st_dev, st.st_ino)
+                self._identify(node, key, linked)
+                return node
+            elif entry.is_dir():
+                if linked and self._in_tree(path, isdir=True):
+                    return None  # the target is scanned by its own path
+                st = entry.stat()
+                node = FSDir(
+                    path, parent, name=entry.name, size=st.st_size, mtime=st.st_mtime
+                )
+                if not self._claim_dir(node, (st.st_dev, st.st_ino)):
+                    logger.debug(f"_FSTreeBuilder: {entry.path} is already scanned")
+                    return None
+                return node
+        except FileNotFoundError:  # removed during the scan
             return None
+        # ignore other type of files
+        return None
+
+    def _create_archive(
+        self,
+        path: str,
+        parent: FSDir,
+        name: str,
+        st: os.stat_result,
+    ) -> ZipArchive | None:
+        """directory of zip archive members, `None` if the archive can't be
+        read, has no files or is already a part of the tree"""
+        archive = ZipArchive(
+            path, parent, name=name, size=st.st_size, mtime=st.st_mtime
+        )
+        accepts = self._accepts if self.path_filter else None
+        try:
+            if not archive.load(self.ignore_hidden, accepts):
+                return None
+        except (OSError, zipfile.BadZipFile) as e:
+            logger.warning(f"_FSTreeBuilder: archive {path} is not read: {e}")
+            return None
+        if not self._claim_dir(archive, (st.st_dev, st.st_ino)):
+            return None
+        return archive
+
+    def _in_tree(self, path: str, isdir: bool) -> bool:
+        """real `path` is a part of the tree by its own path"""
+        relpath = os.path.relpath(path, self.__real_root)
+        if relpath == os.curdir:
+            return True
+        if relpath.startswith(os.pardir):
+            return False
+        names = relpath.split(os.sep)
+        if self.ignore_hidden and any(n.startswith(".") for n in names):
+            return False
+        depth = len(names)
+        return depth < self.max_depth if isdir else depth <= self.max_depth
+
+    def _identify(self, node: FSFile, key: Optional[Identity], linked: bool) -> None:
+        """register identity of file, the node becomes an alias if the same
+        file was found by another path.
+
+        `key` is set for files which can be found by several paths (hardlinks,
+        symlinks out of the tree). Other symlinks lead to a file of the tree
+        with the same nid, they are aliases without identity.
+        """
+        if self.__deferred is not None:
+            if key is not None or linked:
+                self._defer(node, key, linked)
+            return
+        self._claim_file(node, key, linked)
+
+    def _claim_file(self, node: FSNode, key: Optional[Identity], linked: bool) -> None:
+        if key is not None:
+            first = self.identities.claim(node, key)
+            if first is not None:
+                node._alias(first)
+                self.identities.add_alias(node, key)
+        elif linked:
+            self.identities.add_alias(node)
+
+    def _claim_dir(self, node: FSDir, key: Identity) -> bool:
+        """claim identity of directory. Returns `False` if it's scanned by
+        another path already"""
+        if self.__deferred is not None:
+            self._defer(node, key, False)
+            return True
+        return self.identities.claim(node, key) is None
+
+    def _defer(self, node: FSNode, key: Optional[Identity], linked: bool) -> None:
+        with self.__deferred_lock:
+            assert self.__deferred is not None
+            self.__deferred[node] = (key, linked)
+
+    def _key(self, node: FSNode) -> Optional[Identity]:
+        """identity of node, including the deferred one"""
+        if self.__deferred is not None:
+            with self.__deferred_lock:
+                deferred = self.__deferred.get(node)
+            if deferred is not None:
+                return deferred[0]
+        return self.identities.key(node)
+
+    def _settle(self, nodes: list[FSNode]) -> list[FSNode]:
+        """claim deferred identities of scanned nodes. Nodes are settled in
+        the order of the serial scan, so the same node becomes canonical
+        whatever thread scanned it first. Returns nodes left in the tree"""
+        assert self.__deferred is not None
+        result: list[FSNode] = []
+        for node in nodes:
+            with self.__deferred_lock:
+                deferred = self.__deferred.pop(node, None)
+            if deferred is not None:
+                key, linked = deferred
+                if is_fsdir(node):
+                    assert key is not None
+                    if self.identities.claim(node, key) is not None:
+                        continue
+                else:
+                    self._claim_file(node, key, linked)
+            result.append(node)
+        return result
+
+    def _sniff(self, path: str, st: os.stat_result) -> str:
+        """returns MIME type of file, the content is read on cache miss only"""
+        if self.mime_cache is None:
+            return _read_mime(path)
+        mime = self.mime_cache.get(st)
+        if mime is None:
+            mime = _read_mime(path)
+            if mime != "unknown":
+                self.mime_cache.put(st, mime)
+        return mime
 
-    def _filter_hidden(self, entries: Iterable[str]) -> list[str]:
+    def _accepts(self, relpath: str, isdir: bool) -> bool:
+        """`path_filter` matches relpaths from the scanned root, so the name
+        of root in a tree of several roots is left out"""
+        if self.__base:
+            if relpath == self.__base:
+                return True
+            relpath = relpath[len(self.__base) + 1 :]
+        return self.path_filter.accepts(relpath, isdir)
+
+    def _filter_hidden(self, entries: Iterable[os.DirEntry]) -> list[os.DirEntry]:
         """return new list without dotfiles"""
-        return [x for x in entries if not os.path.basename(x).startswith(".")]
+        return [x for x in entries if not x.name.startswith(".")]
+
+    def _filter_paths(
+        self, entries: Iterable[os.DirEntry], relpath: str
+    ) -> list[os.DirEntry]:
+        """return new list of entries accepted by `path_filter`.
+
+        Args:
+            entries (Iterable[os.DirEntry]): entries of directory
+            relpath (str): relpath of directory
+        """
+        accepts = self._accepts
+        return [
+            x for x in entries if accepts(os.path.join(relpath, x.name), x.is_dir())
+        ]
+
+    def _list_dir(self, path: str, relpath: str = "") -> list[tuple[os.DirEntry, str]]:
+        """return entries of directory that should become nodes
+        with paths of these nodes"""
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except PermissionError:
+            return []
+
+        if self.ignore_hidden:
+            entries = self._filter_hidden(entries)
+        if self.path_filter:
+            entries = self._filter_paths(entries, relpath)
+        # the first path of a file found by several paths is canonical,
+        # the order of listing doesn't depend on the filesystem then
+        entries.sort(key=lambda x: x.name)
+
+        result: list[tuple[os.DirEntry, str]] = []
+        for entry in entries:
+            if entry.is_symlink():
+                if not self.follow_symlink:
+                    continue
+                result.append((entry, os.path.realpath(entry.path)))
+            else:
+                result.append((entry, entry.path))
+        return result
+
+    def _scan_dir(
+        self,
+        parent_node: FSDir,
+        depth: int,
+        mime_pool: Optional[Executor] = None,
+    ) -> list[FSNode]:
+        """create child nodes of `parent_node` located at `depth`.
+
+        If `mime_pool` is passed, files are created (and sniffed) on it while
+        the directories are created in place. The order of entries is kept.
+        """
+        known: dict[str, SnapshotRecord] = {}
+        if self.snapshot is not None:
+            records = self.snapshot.get(parent_node._path, parent_node.mtime)
+            if records is not None:
+                result = self._restore_dir(parent_node, depth, records)
+                self.snapshot.put(parent_node._path, parent_node.mtime, records)
+                return result
+            known = self.snapshot.get_stale(parent_node._path)
+
+        nodes: list[FSNode | None | Future[FSNode | None]] = []
+        relpath = parent_node.relpath if self.path_filter else ""
+        for entry, path in self._list_dir(parent_node._path, relpath):
+            try:
+                isdir = entry.is_dir()
+            except OSError:
+                continue
+            if not isdir:
+                args = (entry, parent_node, path, known.get(os.path.basename(path)))
+                if mime_pool is not None:
+                    nodes.append(mime_pool.submit(self._create_node, *args))
+                else:
+                    nodes.append(self._create_node(*args))
+            elif depth < self.max_depth:
+                nodes.append(self._create_node(entry, parent_node, path))
+
+        result: list[FSNode] = []
+        for node in nodes:
+            if isinstance(node, Future):
+                node = node.result()
+            if node is not None:
+                result.append(node)
+
+        if self.snapshot is not None:
+            records = [self._record(parent_node, n) for n in result]
+            self.snapshot.put(parent_node._path, parent_node.mtime, records)
+        return result
+
+    def _record(self, parent_node: FSDir, node: FSNode) -> SnapshotRecord:
+        """snapshot record of the node"""
+        link = None
+        if os.path.join(parent_node._path, node.name) != node._path:
+            link = node._path
+        if is_archive(node):
+            return (node.name, "a", link, node.size, node.mtime, ARCHIVE_MIME, None)
+        if isinstance(node, FSFile):
+            key = self._key(node)
+            return (node.name, "f", link, node.size, node.mtime, node.mime, key)
+        return (node.name, "d", link, None, None, None, None)
+
+    def _restore_dir(
+        self,
+        parent_node: FSDir,
+        depth: int,
+        records: list[SnapshotRecord],
+    ) -> list[FSNode]:
+        """create child nodes of `parent_node` from the snapshot records.
+
+        Files are restored without any syscall, directories are stated to
+        find out whether their own listings are still valid.
+        """
+        result: list[FSNode] = []
+        for name, kind, link, size, mtime, mime, key in records:
+            path = link or os.path.join(parent_node._path, name)
+            if kind == "d":
+                if depth >= self.max_depth:
+                    continue
+                if link and self._in_tree(link, isdir=True):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                fsdir = FSDir(
+                    path, parent_node, name=name, size=st.st_size, mtime=st.st_mtime
+                )
+                if self._claim_dir(fsdir, (st.st_dev, st.st_ino)):
+                    result.append(fsdir)
+            elif kind == "a":
+                # members are read again, the central directory is small
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                archive = self._create_archive(path, parent_node, name, st)
+                if archive is not None:
+                    result.append(archive)
+            else:
+                cls = PDFFile if mime == "application/pdf" else FSFile
+                node = cls(path, parent_node, mime, name=name, size=size, mtime=mtime)
+                self._identify(node, key, link is not None)
+                result.append(node)
+        return result
+
+    def _create_root(self, path: str) -> FSDir:
+        st = os.stat(path)
+        root = FSDir(
+            path, self.__parent, name=self.__name, size=st.st_size, mtime=st.st_mtime
+        )
+        self.identities.claim(root, (st.st_dev, st.st_ino))
+        return root
 
     def _build_tree(self) -> FSDir:
         # no  need to build if `root` is already FSDir
         if self.__rpath is None:
             raise ValueError("Missing __rpath argument.")
 
-        self.root_node = FSDir(self.__rpath, None)
-        queue = collections.deque([(self.root_node, self.__rpath, 1)])
-        visited: set[str] = set()  # visited absolute paths if reads symlink
+        if self.workers > 1:
+            return self._build_tree_parallel()
+
+        self.root_node = self._create_root(self.__rpath)
+        self._finish(self._expand(self.root_node, 1))
+        return self.root_node
+
+    def _expand(self, fsdir: FSDir, depth: int) -> list[FSDir]:
+        """scan all levels of `fsdir` (BFS). `depth` is depth of its children.
+
+        Returns scanned directories in BFS order.
+        """
+        scanned: list[FSDir] = []
+        queue = collections.deque([(fsdir, depth)])
         while queue:
-            parent_node, current_path, depth = queue.popleft()
-            try:
-                entries = [entry.path for entry in os.scandir(current_path)]
-            except PermissionError:
-                continue
+            parent_node, depth = queue.popleft()
+            scanned.append(parent_node)
+            nodes = self._scan_dir(parent_node, depth)
+            parent_node.add_children(nodes)
+            for node in nodes:
+                if is_fsdir(node) and not is_archive(node):
+                    if self._is_frontier(depth):
+                        self.frontier.append(node)
+                    else:
+                        queue.append((node, depth + 1))
+        return scanned
 
-            if self.ignore_hidden:
-                entries = self._filter_hidden(entries)
+    def _finish(self, scanned: list[FSDir]) -> bool:
+        """drop empty directories of the scanned tree.
 
-            for entry in entries:
-                if os.path.islink(entry):
-                    if not self.follow_symlink:
-                        continue
-                    real_entry = os.path.realpath(entry)
-                    if real_entry in visited:
-                        continue
-                    entry = real_entry
+        Depth is limited during the scan already, so the tree is normalized
+        in a single pass over `scanned` (children before parents). Frontier
+        directories are not scanned and are never dropped.
 
-                node = self._create_node(entry, parent_node)
-                if not node:
-                    continue
+        Returns:
+            bool: the first scanned directory is empty
+        """
+        if not self.normalize:
+            return False
+        dropped = _drop_empty_dirs(scanned)
+        for fsdir in dropped:
+            self.identities.forget(fsdir)
+            if fsdir.parent is not None:
+                self.pruned.add(fsdir.parent._path)
+        return scanned[0] in dropped
+
+    def _is_frontier(self, depth: int) -> bool:
+        """directories at `depth` are not scanned in lazy mode"""
+        return self.lazy_depth is not None and depth >= self.lazy_depth
 
-                if is_fsfile(node) and depth <= self.max_depth:
-                    parent_node.children.append(node)
-                elif is_fsdir(node) and depth < self.max_depth:
-                    queue.append((node, node._path, depth + 1))
-                    parent_node.children.append(node)
+    def _node_from_path(self, path: str, parent: FSDir, depth: int) -> FSNode | None:
+        """create a single node for `path` located at `depth`.
+
+        The same rules as for the scan are applied (dotfiles, symlinks, depth).
+        """
+        entry = _PathEntry(path)
+        if self.ignore_hidden and entry.name.startswith("."):
+            return None
+        if self.path_filter and not self._accepts(
+            os.path.join(parent.relpath, entry.name), entry.is_dir()
+        ):
+            return None
+        if entry.is_symlink():
+            if not self.follow_symlink:
+                return None
+            path = os.path.realpath(path)
+        if entry.is_dir() and depth >= self.max_depth:
+            return None
+        return self._create_node(entry, parent, path)  # type: ignore
+
+    def build_subtree(self, path: str, parent: FSDir, depth: int) -> FSNode | None:
+        """create node for `path` with all its children.
+
+        Empty directories are dropped. Returns `None` if nothing is left.
+        """
+        node = self._node_from_path(path, parent, depth)
+        if not is_fsdir(node) or is_archive(node):
+            return node
+        if self._finish(self._expand(node, depth + 1)):
+            return None
+        return node
+
+    def _build_tree_parallel(self) -> FSDir:
+        """same as `_build_tree` but every directory is scanned by a pool.
+
+        Directories are consumed in the same BFS order as in the serial path,
+        so the resulting tree is exactly the same.
+        """
+        assert self.__rpath is not None
+        self.root_node = self._create_root(self.__rpath)
+        self.__deferred = {}
+        try:
+            scanned = self._scan_parallel()
+        finally:
+            self.__deferred = None
+        self._finish(scanned)
         return self.root_node
 
+    def _scan_parallel(self) -> list[FSDir]:
+        """scan levels of the root on the pools, returns scanned directories
+        in BFS order"""
+        with (
+            ThreadPoolExecutor(self.workers, "fstree-scan") as scan_pool,
+            ThreadPoolExecutor(self.workers, "fstree-mime") as mime_pool,
+        ):
+
+            def submit(node: FSDir, depth: int):
+                future = scan_pool.submit(self._scan_dir, node, depth, mime_pool)
+                return (node, future, depth)
+
+            scanned: list[FSDir] = []
+            queue = collections.deque([submit(self.root_node, 1)])
+            while queue:
+                parent_node, future, depth = queue.popleft()
+                scanned.append(parent_node)
+                nodes = self._settle(future.result())
+                parent_node.add_children(nodes)
+                for node in nodes:
+                    if is_fsdir(node) and not is_archive(node):
+                        if self._is_frontier(depth):
+                            self.frontier.append(node)
+                        else:
+                            queue.append(submit(node, depth + 1))
+        return scanned
+
     def build(self) -> FSDir:
         try:
+            if self.snapshot is not None and self.__listings is not None:
+                self.snapshot.restore(self.__listings)
+            elif self.snapshot is not None:
+                self.snapshot.load()
             fsdir = self.__fsdir or self._build_tree()
-            normalizer = _FSTreeNormalizer(
-                fsdir,
-                max_depth=self.__fsdir and self.max_depth or None,
-                remove_empty_dirs=True,
-            )
-            normalizer.exec()
+            if self.snapshot is not None:
+                self._save_snapshot(self.snapshot)
+            if self.mime_cache is not None:
+                self._save_mime_cache(self.mime_cache)
+            if self.__fsdir is not None:
+                # prebuilt tree, scanned trees are normalized during the scan
+                normalizer = _FSTreeNormalizer(
+                    fsdir,
+                    max_depth=self.max_depth,
+                    remove_empty_dirs=self.normalize,
+                )
+                normalizer.exec()
             return fsdir
 
         except (FileNotFoundError, PermissionError, ValueError) as e:
@@ -190,6 +739,23 @@ class _FSTreeBuilder:
             logger.exception("Unexpected error is _FSTreeBuilder")
             raise
 
+    def _save_mime_cache(self, mime_cache: MimeCache) -> None:
+        logger.info(f"FSTree mime cache: {mime_cache.stats()}")
+        try:
+            mime_cache.save()
+        except OSError as e:
+            logger.warning(f"FSTree mime cache is not saved: {e}")
+
+    def _save_snapshot(self, snapshot: FSTreeSnapshot) -> None:
+        logger.info(
+            f"FSTree snapshot: {snapshot.reused} directories restored, "
+            f"{snapshot.scanned} scanned"
+        )
+        try:
+            snapshot.save()
+        except OSError as e:
+            logger.warning(f"FSTree snapshot is not saved: {e}")
+
 
 class FSTree:
     """Class for filesystem presentation in tree view
@@ -209,60 +775,761 @@ class FSTree:
         ignore_hidden=True,
         follow_symlink=True,
         normalize=True,
+        workers=1,
+        snapshot_file: Optional[str] = None,
+        mime_cache: Optional[MimeCache] = None,
+        lazy_depth: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        roots: Optional[dict[str, str]] = None,
+        listings: Optional[dict[str, tuple[float, list[SnapshotRecord]]]] = None,
     ) -> None:
         """
         Args:
             root (str|FSDir): main entry of filesystem tree, can be str(path)
-                or `FSDir`
+                or `FSDir`. With `roots` it's the path of their namespace
             max_depth (int): max depth of recursive diving. counter
                 starts from 1
+            workers (int): number of threads used to scan the filesystem
+            snapshot_file (str): snapshot of the tree used for warm restarts
+            mime_cache (MimeCache): persistent cache of MIME types of files
+            lazy_depth (int): lazy mode, only this number of levels is
+                scanned on build. Deeper directories are scanned when they
+                are accessed by `get_node` or by `expand`
+            path_filter (PathFilter): include/exclude rules applied while
+                scanning, excluded directories are never listed
+            roots (dict[str, str]): named roots merged under `root`, each one
+                becomes a top-level directory. Roots are scanned concurrently,
+                one thread per device, every root has its own snapshot
+            listings (dict): listings of directories by their paths, see
+                `listings`. Unchanged directories are restored from them
+                instead of the snapshot file
         """
         self.max_depth = max_depth
+        self.path_filter = path_filter or PathFilter()
         self.builder_args = {
             "max_depth": max_depth,
             "ignore_hidden": ignore_hidden,
             "follow_symlink": follow_symlink,
             "normalize": normalize,
+            "workers": workers,
+            "snapshot_file": snapshot_file,
+            "lazy_depth": lazy_depth,
         }
-        tree_builder = _FSTreeBuilder(root, **self.builder_args)
-        self.root_node = tree_builder.build()
-        if self.root_node is None:
-            logger.exception("FSTree build error")
-            return
+        self.mime_cache = mime_cache
+        # name -> absolute path of root, empty for a tree of a single root
+        self.roots: dict[str, str] = {}
+        for name, path in (roots or {}).items():
+            if not name or name.startswith(".") or os.sep in name:
+                raise ValueError(f"invalid name of root: '{name}'")
+            self.roots[name] = os.path.abspath(path)
+        # shared by the builders, a file found by several paths is one book
+        self._identities = IdentityIndex()
+        # paths of directories that lost empty subdirectories
+        self.__pruned: set[str] = set()
+        # builders for incremental updates of the tree, one per root
+        self._patcher: Optional[_FSTreeBuilder] = None
+        self.__patchers: dict[str, _FSTreeBuilder] = {}
+        if self.roots:
+            assert isinstance(root, str)
+            self.root_node, frontier = self._build_roots(
+                root, self._identities, snapshot_file, lazy_depth, listings
+            )
+            self._attach_patchers()
+        else:
+            tree_builder = _FSTreeBuilder(
+                root,
+                mime_cache=mime_cache,
+                identities=self._identities,
+                path_filter=self.path_filter,
+                listings=listings,
+                **self.builder_args,
+            )
+            self.root_node = tree_builder.build()
+            if self.root_node is None:
+                logger.exception("FSTree build error")
+                return
+            frontier = tree_builder.frontier
+            self.__pruned = tree_builder.pruned
+            self._patcher = self._builder(self.root_node, self._identities)
+        self._lock = threading.RLock()
         self.node_map: dict[str, FSNode] = {}
-        stack: list[FSNode] = [self.root_node]
+        # nid -> node, built on first lookup because nids are computed lazily
+        self.__nid_map: Optional[dict[str, FSNode]] = None
+        # PDFs of subtrees, a change drops only its ancestors' entries
+        self.__subtree_index = SubtreeIndex(skip=self._identities.aliases)
+        # columnar metadata for queries, rebuilt on request after any change
+        self.__columns: Optional[NodeColumns] = None
+        # depth of nested batches, columns are dropped once at the end
+        self.__batch = 0
+        self.__stale = False
+        # typed indexes: directories, PDFs and files by MIME type
+        self.__dirs: NodeSet[FSDir] = NodeSet()
+        self.__pdfs: NodeSet[PDFFile] = NodeSet()
+        self.__files: dict[str, NodeSet[FSFile]] = collections.defaultdict(NodeSet)
+        # directories that are not scanned yet (lazy mode), in BFS order
+        self.__unexpanded: dict[FSDir, None] = dict.fromkeys(frontier)
+        # called with every directory scanned by `expand`
+        self.__expand_listeners: list[Callable[[FSDir], None]] = []
+        self._register(self.root_node)
+        # aggregates of all directories in one post-order pass, afterwards
+        # they are updated by changes
+        self.stats(self.root_node)
+
+    def listings(self) -> dict[str, tuple[float, list[SnapshotRecord]]]:
+        """listings of scanned directories like in `FSTreeSnapshot`, with
+        the current metadata of their entries. Directories left unscanned
+        or with pruned subdirectories are left out"""
+        listings: dict[str, tuple[float, list[SnapshotRecord]]] = {}
+        with self._lock:
+            pruned = set(self.__pruned)
+            for patcher in [self._patcher, *self.__patchers.values()]:
+                if patcher is not None:
+                    pruned |= patcher.pruned
+            for fsdir in self.__dirs:
+                if (
+                    is_archive(fsdir)
+                    or fsdir in self.__unexpanded
+                    or fsdir._path in pruned
+                ):
+                    continue
+                patcher, _ = self._locate(fsdir.relpath)
+                if patcher is None:  # the namespace of several roots
+                    continue
+                records = [patcher._record(fsdir, n) for n in fsdir.children]
+                listings[fsdir._path] = (fsdir.mtime, records)
+        return listings
+
+    def rebuild(self) -> "FSTree":
+        """scan the filesystem into a new tree with the same options.
+
+        Directories with the same mtime are restored from `listings` of this
+        tree instead of being listed again, the new tree has its own nodes.
+        This tree is left intact and keeps serving requests while the new
+        one is built. Call `release` when it's not used anymore. Listeners
+        of expansions are moved to the new tree.
+        """
+        fstree = FSTree(
+            self.root_node._path,
+            max_depth=self.max_depth,
+            ignore_hidden=self.builder_args["ignore_hidden"],
+            follow_symlink=self.builder_args["follow_symlink"],
+            normalize=self.builder_args["normalize"],
+            workers=self.builder_args["workers"],
+            snapshot_file=self.builder_args["snapshot_file"],
+            mime_cache=self.mime_cache,
+            lazy_depth=self.builder_args["lazy_depth"],
+            path_filter=self.path_filter,
+            roots=self.roots or None,
+            listings=self.listings(),
+        )
+        fstree.__expand_listeners = list(self.__expand_listeners)
+        return fstree
+
+    def release(self) -> None:
+        """break cycles of nodes replaced by a newer tree"""
+        with self._lock:
+            stack: list[FSDir] = [self.root_node]
+            while stack:
+                fsdir = stack.pop()
+                stack.extend(n for n in fsdir.children if is_fsdir(n))
+                fsdir._clear()
+
+    def _builder(
+        self,
+        root: str | FSDir,
+        identities: IdentityIndex,
+        **kwargs,
+    ) -> _FSTreeBuilder:
+        """builder with the options of the tree"""
+        return _FSTreeBuilder(
+            root,
+            max_depth=self.max_depth,
+            ignore_hidden=self.builder_args["ignore_hidden"],
+            follow_symlink=self.builder_args["follow_symlink"],
+            normalize=self.builder_args["normalize"],
+            mime_cache=self.mime_cache,
+            identities=identities,
+            path_filter=self.path_filter,
+            **kwargs,
+        )
+
+    def _build_roots(
+        self,
+        path: str,
+        identities: IdentityIndex,
+        snapshot_file: Optional[str] = None,
+        lazy_depth: Optional[int] = None,
+        listings: Optional[dict[str, tuple[float, list[SnapshotRecord]]]] = None,
+    ) -> tuple[FSDir, list[FSDir]]:
+        """scan the named roots and merge them under the namespace directory.
+
+        Roots on different devices are scanned concurrently, roots of the
+        same device one by one, so every disk is read by a single thread.
+        A root that fails to scan is left out. Returns the namespace
+        directory and unscanned directories of lazy mode.
+        """
+        namespace = FSDir(os.path.abspath(path), None, size=0, mtime=0.0)
+        builders: dict[str, _FSTreeBuilder] = {}
+        devices: dict[int, list[str]] = collections.defaultdict(list)
+        for name, root in self.roots.items():
+            try:
+                devices[os.stat(root).st_dev].append(name)
+            except OSError as e:
+                logger.error(f"FSTree: root '{name}' is not available: {e}")
+                continue
+            snapshot = None
+            if snapshot_file:
+                base, ext = os.path.splitext(snapshot_file)
+                snapshot = f"{base}-{name}{ext}"
+            builders[name] = self._builder(
+                root,
+                identities,
+                workers=self.builder_args["workers"],
+                snapshot_file=snapshot,
+                lazy_depth=lazy_depth,
+                parent=namespace,
+                name=name,
+                listings=listings,
+            )
+
+        def scan(names: list[str]) -> list[FSDir]:
+            nodes: list[FSDir] = []
+            for name in names:
+                try:
+                    nodes.append(builders[name].build())
+                except Exception:
+                    logger.exception(f"FSTree: root '{name}' is not scanned")
+            return nodes
+
+        with ThreadPoolExecutor(max(1, len(devices)), "fstree-root") as pool:
+            for nodes in pool.map(scan, devices.values()):
+                namespace.add_children(nodes)
+        frontier = [fsdir for b in builders.values() for fsdir in b.frontier]
+        for builder in builders.values():
+            self.__pruned.update(builder.pruned)
+        return namespace, frontier
+
+    def _attach_patchers(self) -> None:
+        """create builders for updates of roots present in the tree"""
+        for node in self.root_node.children:
+            if is_fsdir(node) and node.name not in self.__patchers:
+                self.__patchers[node.name] = self._builder(node, self._identities)
+
+    def _locate(self, relpath: str) -> tuple[Optional[_FSTreeBuilder], int]:
+        """builder of the root containing `relpath` and the depth of
+        relpath in that root. The namespace of several roots has no builder
+        """
+        depth = self._depth(relpath)
+        if not self.roots:
+            return self._patcher, depth
+        name = relpath.split(os.sep, 1)[0]
+        return self.__patchers.get(name), depth - 1
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["FSTree"]:
+        """hold the lock for a batch of changes. Columns are dropped once at
+        the end of the batch instead of after every change"""
+        with self._lock:
+            self.__batch += 1
+            try:
+                yield self
+            finally:
+                self.__batch -= 1
+                if not self.__batch and self.__stale:
+                    self.__stale = False
+                    self.__columns = None
+
+    def _drop_columns(self) -> None:
+        """columns are rebuilt on the next query, after the current batch"""
+        if self.__batch:
+            self.__stale = True
+        else:
+            self.__columns = None
+
+    def _register(self, node: FSNode, columns: bool = True) -> None:
+        """add node and all its children to the indexes
+
+        Args:
+            columns (bool): drop columns, `False` when the caller patches them
+        """
+        self.__subtree_index.invalidate(node)
+        if columns:
+            self._drop_columns()
+        stack: list[FSNode] = [node]
         while stack:
             node = stack.pop()
             if node.isdir() and isinstance(node, FSDir):
                 stack.extend(node.iter_children())
 
             self.node_map[node.relpath] = node
+            if not self._identities.is_alias(node):
+                self._index(node)
+
+    def _index(self, node: FSNode) -> None:
+        """add node to the typed indexes, aliases are never indexed"""
+        if self.__nid_map is not None:
+            self.__nid_map[node.nid] = node
+        if isinstance(node, FSDir):
+            self.__dirs.add(node)
+        elif isinstance(node, FSFile):
+            self.__files[node.mime].add(node)
+            if isinstance(node, PDFFile):
+                self.__pdfs.add(node)
+            # nid of node is changed when it's moved
+            for alias in self._identities.aliases_of(node):
+                alias._alias(node)
+
+    def _unregister(self, node: FSNode, columns: bool = True) -> None:
+        """remove node and all its children from the indexes
+
+        Args:
+            columns (bool): drop columns, `False` when the caller patches them
+        """
+        self.__subtree_index.invalidate(node)
+        if columns:
+            self._drop_columns()
+        promoted: list[FSNode] = []
+        stack: list[FSNode] = [node]
+        while stack:
+            node = stack.pop()
+            if is_fsdir(node):
+                stack.extend(node.iter_children())
+            if self.node_map.get(node.relpath) is node:
+                del self.node_map[node.relpath]
+            if is_fsdir(node):
+                self.__unexpanded.pop(node, None)
+                self.__dirs.discard(node)
+                self.__subtree_index.discard(node)
+            elif isinstance(node, FSFile):
+                files = self.__files.get(node.mime)
+                if files is not None:
+                    files.discard(node)
+                    if not files:
+                        del self.__files[node.mime]
+                self.__pdfs.discard(node)  # type: ignore
+            if self.__nid_map is not None and self.__nid_map.get(node.nid) is node:
+                del self.__nid_map[node.nid]
+            alias = self._identities.forget(node)
+            if alias is not None:
+                promoted.append(alias)
+        # alias of removed file takes its place, unless it's removed as well
+        for alias in promoted:
+            if self.node_map.get(alias.relpath) is alias:
+                self._index(alias)
+                self.__subtree_index.invalidate(alias)
+
+    @property
+    def unexpanded(self) -> int:
+        """number of directories that are not scanned yet"""
+        return len(self.__unexpanded)
+
+    def next_unexpanded(self) -> FSDir | None:
+        """returns the shallowest directory that is not scanned yet"""
+        with self._lock:
+            return next(iter(self.__unexpanded), None)
+
+    def is_expanded(self, fsdir: FSDir) -> bool:
+        """children of directory are scanned"""
+        return fsdir not in self.__unexpanded
+
+    def on_expand(self, callback: Callable[[FSDir], None]) -> None:
+        """call `callback` with every directory scanned by `expand`. It's
+        called after the tree is unlocked, by the thread that expanded it"""
+        self.__expand_listeners.append(callback)
+
+    def off_expand(self, callback: Callable[[FSDir], None]) -> None:
+        """stop calling `callback` on expansions"""
+        if callback in self.__expand_listeners:
+            self.__expand_listeners.remove(callback)
+
+    def expand(self, fsdir: FSDir) -> None:
+        """scan children of directory left unscanned in lazy mode.
+
+        Its subdirectories are left unscanned, a directory without children
+        is removed from the tree as if it was pruned on build.
+        """
+        if fsdir not in self.__unexpanded:
+            return
+        with self.batch():
+            if fsdir not in self.__unexpanded:  # expanded by another thread
+                return
+            del self.__unexpanded[fsdir]
+            patcher, depth = self._locate(fsdir.relpath)
+            assert patcher is not None
+            children = patcher._scan_dir(fsdir, depth + 1)
+            fsdir.add_children(children)
+            for child in children:
+                self._register(child)
+                if is_fsdir(child):
+                    self.__unexpanded[child] = None
+            if not children:
+                self._prune_empty(fsdir)
+                return
+        for callback in list(self.__expand_listeners):
+            try:
+                callback(fsdir)
+            except Exception:
+                logger.exception(f"FSTree: expansion listener failed: {fsdir._path}")
+
+    def is_pending(self, path: str) -> bool:
+        """`path` can't be found in the tree yet, it's under a directory
+        left unscanned in lazy mode"""
+        if not self.__unexpanded:
+            return False
+        relpath = self.root_relative(path)
+        if relpath.startswith(os.pardir):
+            return False
+        with self._lock:
+            head = os.path.dirname(relpath)
+            while head:
+                node = self.node_map.get(head)
+                if node is not None:
+                    return is_fsdir(node) and node in self.__unexpanded
+                head = os.path.dirname(head)
+        return False
+
+    def _resolve(self, relpath: str) -> FSNode | None:
+        """find node by relpath scanning unexpanded directories on the way"""
+        node: FSNode | None = self.root_node
+        if relpath in ("", "."):
+            return node
+        for name in relpath.split(os.sep):
+            if not is_fsdir(node):
+                return None
+            self.expand(node)
+            node = self.node_map.get(os.path.join(node.relpath, name))
+            if node is None:
+                return None
+        return node
+
+    def _depth(self, relpath: str) -> int:
+        """depth of node by its relpath, root has depth 0"""
+        if relpath in ("", "."):
+            return 0
+        return relpath.count(os.sep) + 1
+
+    def _prune_empty(self, fsdir: FSDir | None) -> None:
+        """remove `fsdir` and its ancestors while they are empty"""
+        if not self.builder_args["normalize"]:
+            return
+        while fsdir is not None and fsdir is not self.root_node and not fsdir.children:
+            parent = fsdir.parent
+            if self.roots and parent is self.root_node:
+                return  # roots are kept even if they are empty
+            if is_fsdir(parent) and fsdir in parent.children:
+                parent.remove_child(fsdir)
+                self.__pruned.add(parent._path)
+            self._unregister(fsdir)
+            fsdir = parent if is_fsdir(parent) else None
+
+    def _ensure_dir(self, relpath: str) -> FSDir | None:
+        """returns directory node by relpath.
+
+        Directories missing in the tree (e.g. pruned because they were empty)
+        are created. Returns `None` if the directory can't be a part of tree.
+        """
+        fsdir = self.root_node
+        if relpath in ("", "."):
+            return fsdir
+        for name in relpath.split(os.sep):
+            node = self.node_map.get(os.path.join(fsdir.relpath, name))
+            if node is None:
+                patcher, depth = self._locate(os.path.join(fsdir.relpath, name))
+                if patcher is None or depth < 1:
+                    return None
+                path = os.path.join(fsdir._path, name)
+                node = patcher._node_from_path(path, fsdir, depth)
+                if not is_fsdir(node):
+                    self._prune_empty(fsdir)
+                    return None
+                fsdir.add_child(node)
+                self._register(node)
+            elif not is_fsdir(node):
+                return None
+            fsdir = node
+        return fsdir
+
+    def add_path(self, path: str) -> FSNode | None:
+        """add a new file or directory (with all its children) to the tree"""
+        relpath = self.root_relative(path)
+        if relpath.startswith(os.pardir):
+            return None
+        with self._lock:
+            if self.__unexpanded:
+                # scanning of unexpanded ancestor finds the new node itself
+                self._resolve(os.path.dirname(relpath))
+            if relpath in self.node_map:
+                return self.update_path(path)
+            parent = self._ensure_dir(os.path.dirname(relpath))
+            patcher, depth = self._locate(relpath)
+            if parent is None or patcher is None or depth < 1:
+                return None
+            node = patcher.build_subtree(
+                os.path.join(parent._path, os.path.basename(relpath)),
+                parent,
+                depth,
+            )
+            if node is None:
+                self._prune_empty(parent)
+                return None
+            parent.add_child(node)
+            self._register(node)
+            return node
+
+    def remove_path(self, path: str) -> None:
+        """remove node (with all its children) from the tree"""
+        with self._lock:
+            node = self.node_map.get(self.root_relative(path))
+            if node is None or node is self.root_node:
+                return
+            if self.roots and node.parent is self.root_node:
+                # root itself is removed, e.g. the disk is unmounted
+                self.__patchers.pop(node.name, None)
+            parent = node.parent
+            if is_fsdir(parent) and node in parent.children:
+                parent.remove_child(node)
+            self._unregister(node)
+            self._release(node)
+            self._prune_empty(parent if is_fsdir(parent) else None)
+
+    def _release(self, node: FSNode) -> None:
+        """break parent <-> children cycles of removed subtree.
+
+        The tree may be frozen by `gc.freeze()`, the cyclic GC never
+        collects such nodes, so they are freed by reference counting only.
+        """
+        stack: list[FSNode] = [node]
+        while stack:
+            node = stack.pop()
+            if is_fsdir(node):
+                stack.extend(node.children)
+                node._clear()
+
+    def update_path(self, path: str) -> FSNode | None:
+        """refresh modified file. Node is replaced if size or mtime changed"""
+        relpath = self.root_relative(path)
+        with self._lock:
+            node = self.node_map.get(relpath)
+            if node is None:
+                return self.add_path(path)
+            if is_fsdir(node) and not is_archive(node):
+                return node
+            try:
+                st = os.stat(node._path)
+            except OSError:
+                self.remove_path(path)
+                return None
+            if (st.st_size, st.st_mtime) == (node.size, node.mtime):
+                return node
+
+            parent = node.parent
+            assert is_fsdir(parent)
+            if is_archive(node):
+                # the rewritten archive claims the same identity
+                self._identities.forget(node)
+            patcher, depth = self._locate(relpath)
+            assert patcher is not None
+            new_node = patcher._node_from_path(path, parent, depth)
+            if new_node is None:
+                self.remove_path(path)
+                return None
+            parent.replace_child(node, new_node)
+            # a rewritten file keeps its row, there is no need to rebuild
+            columns = self.__columns
+            self._unregister(node, columns=False)
+            self._register(new_node, columns=False)
+            if (
+                columns is None
+                or self._identities.is_alias(new_node)
+                or not columns.replace(node, new_node)
+            ):
+                self._drop_columns()
+            return new_node
+
+    def move_path(self, src: str, dst: str) -> FSNode | None:
+        """move node from `src` to `dst` keeping the nodes of its subtree"""
+        src_relpath = self.root_relative(src)
+        dst_relpath = self.root_relative(dst)
+        with self._lock:
+            node = self.node_map.get(src_relpath)
+            if node is None:
+                return self.add_path(dst)
+            name = os.path.basename(dst)
+            hidden = self.builder_args["ignore_hidden"] and name.startswith(".")
+            if (
+                dst_relpath.startswith(os.pardir)
+                or hidden
+                or self.path_filter
+                or self._depth(src_relpath) != self._depth(dst_relpath)
+                or self._locate(src_relpath)[0] is not self._locate(dst_relpath)[0]
+            ):
+                # subtree has to be checked against the depth limit
+                # and the filter again
+                self.remove_path(src)
+                return self.add_path(dst)
+
+            old_parent = node.parent
+            assert is_fsdir(old_parent)
+            new_parent = self._ensure_dir(os.path.dirname(dst_relpath))
+            if new_parent is None:
+                self.remove_path(src)
+                return None
+            old_parent.remove_child(node)
+            self._unregister(node)
+
+            old_prefix = node._path
+            new_prefix = os.path.join(new_parent._path, name)
+            stack: list[tuple[FSNode, FSDir]] = [(node, new_parent)]
+            while stack:
+                n, parent = stack.pop()
+                path = n._path
+                if path == old_prefix or path.startswith(old_prefix + os.sep):
+                    path = new_prefix + path[len(old_prefix) :]
+                n._relocate(path, parent, name if n is node else n.name)
+                if is_fsdir(n):
+                    stack.extend((c, n) for c in n.iter_children())
+
+            new_parent.add_child(node)
+            self._register(node)
+            self._prune_empty(old_parent)
+            return node
 
     def get_root_node(self) -> FSDir:
         """returns root node"""
         return self.root_node
 
+    def accepts(self, path: str, isdir: bool) -> bool:
+        """filesystem path passes `path_filter`, patterns are matched
+        from the root containing it"""
+        relpath = self.root_relative(path)
+        patcher, _ = self._locate(relpath)
+        if patcher is None:
+            return True
+        return patcher._accepts(relpath, isdir)
+
     def root_relative(self, path: str) -> str:
+        """relpath of filesystem path in the tree, paths inside the named
+        roots are relative to their top-level directories"""
+        found = None
+        for name, root in self.roots.items():
+            relpath = os.path.relpath(path, root)
+            if relpath.startswith(os.pardir):
+                continue
+            # the innermost root if roots are nested
+            if found is None or len(root) > len(self.roots[found[0]]):
+                found = (name, relpath)
+        if found is not None:
+            name, relpath = found
+            return name if relpath == os.curdir else os.path.join(name, relpath)
         return os.path.relpath(path, self.root_node._path)
 
-    def get_node(self, path: str) -> FSNode | None:
-        """returns node by special relative path"""
+    def get_node(self, path: str, expand: bool = True) -> FSNode | None:
+        """returns node by special relative path.
+
+        In lazy mode unexpanded directories on the path are scanned, unless
+        `expand` is `False`. Returned directory has its children scanned.
+        """
         normalized_path = os.path.normpath(path)  # remove possible ".." in path
         full_path = os.path.join(self.root_node._path, normalized_path)
         if not full_path.startswith(self.root_node._path):
             return None
 
-        return self.node_map.get(path)
+        node = self.node_map.get(path)
+        if not expand or not self.__unexpanded:
+            return node
+        if node is None:
+            node = self._resolve(path)
+        if is_fsdir(node):
+            self.expand(node)
+            if self.node_map.get(node.relpath) is not node:  # empty, pruned
+                return None
+        return node
+
+    def get_node_by_nid(self, nid: str) -> FSNode | None:
+        """returns node by its nid"""
+        if self.__nid_map is None:
+            with self._lock:
+                if self.__nid_map is None:
+                    self.__nid_map = {
+                        n.nid: n
+                        for n in self.node_map.values()
+                        if not self._identities.is_alias(n)
+                    }
+        return self.__nid_map.get(nid)
+
+    def subtree_index(self) -> SubtreeIndex:
+        """returns index of subtrees of the current tree"""
+        return self.__subtree_index
+
+    def columns(self) -> NodeColumns:
+        """returns columnar metadata of the current tree"""
+        columns = self.__columns
+        if columns is None:
+            with self._lock:
+                if self.__columns is None:
+                    self.__columns = NodeColumns(
+                        self.root_node, skip=self._identities.aliases
+                    )
+                columns = self.__columns
+        return columns
+
+    def query(self, fsdir: FSDir, **filters) -> tuple[int, list[FSNode]]:
+        """nodes under directory matching filters, see `NodeColumns.query`"""
+        return self.columns().query(fsdir, **filters)
+
+    def subtree_pdfs(
+        self,
+        fsdir: FSDir,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> tuple[int, list[PDFFile]]:
+        """returns number of PDF files under directory and a page of them
+        in natural order of names"""
+        index = self.__subtree_index
+        with self._lock:
+            return index.count(fsdir), index.sorted_pdfs(fsdir, offset, limit)
+
+    def digest(self, fsdir: FSDir) -> str:
+        """Merkle digest of directory subtree in hex"""
+        with self._lock:
+            return f"{fsdir.digest:032x}"
+
+    def stats(self, fsdir: FSDir) -> DirStats:
+        """copy of aggregates of directory subtree"""
+        with self._lock:
+            s = fsdir.stats
+            return DirStats(s.size, s.files, s.pdfs, s.newest)
 
     def iter(
         self,
     ) -> Iterable[FSNode]:
         """Return FSTree Iterator[FSNode]"""
-        for node in filter(lambda x: x.relpath != "", self.node_map.values()):
+        # copy of nodes, the tree can be patched while iterating
+        with self._lock:
+            nodes = [node for relpath, node in self.node_map.items() if relpath]
+        for node in nodes:
             yield node
 
     def pdf_list(self) -> list[PDFFile]:
-        return [f for f in self.iter() if isinstance(f, PDFFile)]
+        """all PDF files in natural order of names"""
+        with self._lock:
+            return list(self.__pdfs.sorted())
+
+    def dir_list(self) -> list[FSDir]:
+        """all directories (root included) in natural order of names"""
+        with self._lock:
+            return list(self.__dirs.sorted())
+
+    def file_list(self, mime: str) -> list[FSFile]:
+        """files of MIME type in natural order of names"""
+        with self._lock:
+            files = self.__files.get(mime)
+            return list(files.sorted()) if files is not None else []
+
+    def mime_counts(self) -> dict[str, int]:
+        """number of files by MIME type"""
+        with self._lock:
+            return {mime: len(files) for mime, files in self.__files.items()}
 
     def debug(self) -> None:
         print("##################")
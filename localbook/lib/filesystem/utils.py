@@ -6,10 +6,25 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
+import os
+import threading
+
 import magic
 
+from .mime import default_classifier
 from .node import FSNode
 
+# `magic.from_buffer` shares one libmagic cookie guarded by a lock,
+# so every thread gets its own instance to sniff files in parallel.
+_local = threading.local()
+
+
+def _get_magic() -> magic.Magic:
+    m = getattr(_local, "magic", None)
+    if m is None:
+        m = _local.magic = magic.Magic(mime=True)
+    return m
+
 
 def _read_mime(arg: FSNode | str) -> str:
     try:
@@ -20,8 +35,13 @@ def _read_mime(arg: FSNode | str) -> str:
 
         with open(filepath, "rb") as f:
             KB = 1024
-            bfile = f.read(KB * 10)
-        mime = magic.from_buffer(bfile, mime=True)
+            # the cheap signatures first, libmagic only for ambiguous files
+            head = f.read(default_classifier.head_size)
+            mime = default_classifier.match(head, os.path.basename(filepath))
+            if mime is not None:
+                return mime
+            bfile = head + f.read(KB * 10 - len(head))
+        mime = _get_magic().from_buffer(bfile)
         return mime
     except (magic.MagicException, FileNotFoundError, IsADirectoryError) as e:
         print(f"Error MIME-identification: {e}")
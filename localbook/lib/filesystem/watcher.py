@@ -0,0 +1,186 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 12:30
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+
+from watchfiles import Change, watch
+
+from .archive import is_archive
+from .dir import is_fsdir
+from .node import FSNode
+from .tree import FSTree
+
+logger = logging.getLogger("localbook")
+
+
+class FSTreeWatcher:
+    """Keeps `FSTree` up to date with the filesystem.
+
+    Changes are collected by `watchfiles`, which debounces them and yields
+    them in batches. Every batch is applied to the tree as in-place patches,
+    so the cost of an update depends only on the size of the change.
+
+    A move is reported as a pair of deleted and added paths. Such pairs are
+    detected by the type, size and mtime of node (they are kept by rename)
+    and the node is moved together with its subtree instead of rescanning.
+
+    While the tree is rebuilt, batches are applied to the current tree and
+    kept by `record`, `replay` applies them to the new tree after the swap,
+    so changes made during the rebuild are not lost.
+    """
+
+    def __init__(
+        self,
+        fstree: FSTree,
+        debounce: int = 1600,
+        step: int = 50,
+        path: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            fstree (FSTree): tree to patch
+            debounce (int): max time in ms to group changes into one batch
+            step (int): time in ms to wait for new changes
+            path (str): directory to watch, e.g. one of named roots of tree.
+                The root of tree by default
+        """
+        self.fstree = fstree
+        self.debounce = debounce
+        self.step = step
+        self.path = path
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        # batches applied since `record`, `None` if they are not kept
+        self.__recorded: Optional[list[tuple[Change, str]]] = None
+        self.__record_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self._run,
+            name="fstree-watcher",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def record(self) -> None:
+        """keep changes applied from now on, until `replay`"""
+        with self.__record_lock:
+            if self.__recorded is None:
+                self.__recorded = []
+
+    def replay(self, fstree: FSTree) -> None:
+        """patch `fstree` from now on and apply to it the changes kept since
+        `record`. They are dropped if it's the same tree
+
+        Args:
+            fstree (FSTree): tree that replaced the patched one
+        """
+        with self.__record_lock:
+            recorded, self.__recorded = self.__recorded, None
+            previous, self.fstree = self.fstree, fstree
+        if recorded and fstree is not previous:
+            logger.debug(f"FSTreeWatcher: {len(recorded)} changes replayed")
+            # a path changed several times is checked once, against the disk
+            self.apply(dict.fromkeys(recorded))
+
+    def _run(self) -> None:
+        root = self.path or self.fstree.get_root_node()._path
+        try:
+            for changes in watch(
+                root,
+                watch_filter=None,
+                debounce=self.debounce,
+                step=self.step,
+                stop_event=self.__stop,
+                raise_interrupt=False,
+                ignore_permission_denied=True,
+            ):
+                try:
+                    self.apply(changes)
+                except Exception:
+                    logger.exception("FSTreeWatcher: failed to apply changes")
+        except Exception:
+            logger.exception("FSTreeWatcher stopped")
+
+    def _find_moves(
+        self,
+        deleted: list[tuple[str, FSNode]],
+        added: list[str],
+    ) -> list[tuple[str, str]]:
+        """pair deleted nodes with added paths of the same entries"""
+        moves: list[tuple[str, str]] = []
+        for path in added:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            for src, node in deleted:
+                isdir = is_fsdir(node) and not is_archive(node)
+                same_type = os.path.isdir(path) == isdir
+                same_stat = (st.st_size, st.st_mtime) == (node.size, node.mtime)
+                if same_type and same_stat:
+                    moves.append((src, path))
+                    deleted.remove((src, node))
+                    break
+        return moves
+
+    def apply(self, changes: Iterable[tuple[Change, str]]) -> None:
+        """apply a batch of changes to the tree"""
+        changes = list(changes)
+        with self.__record_lock:
+            if self.__recorded is not None:
+                self.__recorded.extend(changes)
+            fstree = self.fstree
+        added: list[str] = []
+        modified: list[str] = []
+        deleted: list[tuple[str, FSNode]] = []
+        for change, path in changes:
+            if change == Change.added:
+                added.append(path)
+            elif change == Change.modified:
+                modified.append(path)
+            elif change == Change.deleted and not os.path.lexists(path):
+                node = fstree.get_node(fstree.root_relative(path), expand=False)
+                if node is not None:
+                    deleted.append((path, node))
+
+        # parents first, children of moved or added directories are handled
+        # together with them
+        added.sort(key=len)
+        deleted.sort(key=lambda d: len(d[0]))
+        # columns of the tree are rebuilt once for the whole batch
+        with fstree.batch():
+            for src, dst in self._find_moves(deleted, added):
+                logger.debug(f"FSTreeWatcher: moved {src} -> {dst}")
+                fstree.move_path(src, dst)
+                added.remove(dst)
+            for path, _ in deleted:
+                logger.debug(f"FSTreeWatcher: deleted {path}")
+                fstree.remove_path(path)
+            for path in added:
+                logger.debug(f"FSTreeWatcher: added {path}")
+                fstree.add_path(path)
+            for path in modified:
+                if os.path.isfile(path):
+                    fstree.update_path(path)
@@ -16,6 +16,7 @@ from localbook.config import (
     UBooksConfigurator,
     UBookStaticComponent,
 )
+from localbook.controller.admin import router as admin_router
 from localbook.controller.library import router as library_router
 from localbook.dependencies import Deps, get_fs_settings, get_settings
 from localbook.exceptions.handlers import ExceptionRender
@@ -80,3 +81,4 @@ class LocalBook:
     def configure_routes(self):
         """ROUTING"""
         self.app.include_router(library_router)
+        self.app.include_router(admin_router)
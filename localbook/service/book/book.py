@@ -8,7 +8,9 @@
 
 
 import os
+import re
 import shutil
+import zipfile
 from abc import abstractmethod
 from io import BytesIO
 from logging import getLogger
@@ -19,6 +21,7 @@ from zipfile import ZipFile
 import requests
 from fastapi import FastAPI
 from fastapi.requests import Request
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.templating import _TemplateResponse
@@ -31,8 +34,10 @@ from localbook.config import (
 from localbook.dependencies import get_fstree, get_jinja2
 from localbook.exceptions.exceptions import (
     NotFoundException,
+    RangeNotSatisfiableException,
     UnsupportedMediaTypeException,
 )
+from localbook.lib.filesystem.archive import ArchiveMember, archive_of
 from localbook.lib.filesystem.pdf import PDFFile, is_pdf
 from localbook.lib.filesystem.tree import FSTree
 from localbook.lib.static import StaticComponent
@@ -143,7 +148,11 @@ class BookViewerMozilla(BookViewer):
         pdf_sandbox = request.url_for(
             "/build/packages/pdfjs", path="build/pdf.sandbox.mjs"
         )
-        pdf_file = request.url_for("/build/books", path=book.relpath)
+        if archive_of(book) is not None:
+            # members of archives are not in the static directory
+            pdf_file = request.url_for("serve_archive_file", path=book.relpath)
+        else:
+            pdf_file = request.url_for("/build/books", path=book.relpath)
 
         return self.jinja2.TemplateResponse(
             request=request,
@@ -160,6 +169,28 @@ class BookViewerNative(BookViewer):
     pass
 
 
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """[start, end) of a single byte range, `None` if the whole file is
+    requested (no header, several ranges or unsupported unit)"""
+    match = header and _RANGE_RE.fullmatch(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    elif last:  # suffix, the last N bytes
+        start, end = max(0, size - int(last)), size
+    else:
+        return None
+    if start >= end:
+        raise RangeNotSatisfiableException(size=size)
+    return start, end
+
+
 class BookService:
     def __init__(
         self,
@@ -172,6 +203,8 @@ class BookService:
         self.fstree = fstree or get_fstree()
         self.tmplmap = tmpl_map or TemplateMap()
         self.book_viewer = book_viewer or BookViewerMozilla()
+        # max age of cached pages served by nid (seconds)
+        self.id_max_age = 86400
         self.logger = getLogger("localbook")
 
     async def serve_book(self, request: Request, path: str):
@@ -185,6 +218,60 @@ class BookService:
         else:
             raise UnsupportedMediaTypeException()
 
+    async def serve_book_by_id(self, request: Request, nid: str):
+        """Render book by its nid"""
+        book_node = self.fstree.get_node_by_nid(nid)
+        if book_node is None:
+            # `/book/id/...` can be a path of book inside "id" directory
+            if self.fstree.get_node(f"id/{nid}") is None:
+                raise NotFoundException(f"Error: PDF file '{nid}' not found.")
+            return await self.serve_book(request, f"id/{nid}")
+
+        if is_pdf(book_node) and isinstance(book_node, PDFFile):
+            response = self.book_viewer.render(request, book_node)
+            # nid is derived from the path of book, so the page rendered for
+            # a nid never changes and can be cached by the browser
+            response.headers["Cache-Control"] = f"private, max-age={self.id_max_age}"
+            return response
+        else:
+            raise UnsupportedMediaTypeException()
+
+    async def serve_archive_file(self, request: Request, path: str):
+        """Stream file from zip archive without extraction. Ranges are
+        supported for files stored without compression"""
+        node = self.fstree.get_node(path)
+        found = node and archive_of(node)
+        if not found:
+            raise NotFoundException(f"Error: file '{path}' not found in archive.")
+        archive, name = found
+        try:
+            member = ArchiveMember(archive._path, name)
+        except (KeyError, OSError, zipfile.BadZipFile):
+            raise NotFoundException(f"Error: file '{path}' not found in archive.")
+
+        media_type = getattr(node, "mime", "unknown")
+        if media_type == "unknown":
+            media_type = "application/octet-stream"
+        headers = {"Accept-Ranges": "bytes" if member.seekable else "none"}
+        byte_range = None
+        if member.seekable:
+            byte_range = _parse_range(request.headers.get("range"), member.size)
+        if byte_range is None:
+            headers["Content-Length"] = str(member.size)
+            return StreamingResponse(
+                member.iter_bytes(), media_type=media_type, headers=headers
+            )
+
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{member.size}"
+        headers["Content-Length"] = str(end - start)
+        return StreamingResponse(
+            member.iter_bytes(start, end),
+            status_code=206,
+            media_type=media_type,
+            headers=headers,
+        )
+
 
 def get_book_service():
     return BookService()
@@ -9,7 +9,9 @@
 import json
 import logging
 import os
+import queue
 import shutil
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Callable, Optional, Self
@@ -20,7 +22,10 @@ from pdf2image import convert_from_path
 from PIL.Image import Image, Resampling
 
 from localbook.config import CACHE_BOOK_COVER_DIR, CACHE_COVER_METADATA_FILE
-from localbook.dependencies import get_fstree
+from localbook.dependencies import get_duplicates, get_fstree
+from localbook.lib.filesystem.archive import archive_of
+from localbook.lib.filesystem.dir import FSDir
+from localbook.lib.filesystem.duplicates import DuplicateDetector
 from localbook.lib.filesystem.node import NID
 from localbook.lib.filesystem.pdf import PDFFile
 from localbook.lib.filesystem.tree import FSTree
@@ -185,16 +190,31 @@ class BookCoverGenerator:
         self.converter: Callable[..., list[Image]] = kwargs.get(
             "converter", convert_from_path
         )
+        # byte-identical books share the rendered cover
+        self.duplicates: DuplicateDetector = (
+            kwargs.get("duplicates") or DuplicateDetector()
+        )
+        # directories expanded after the start (lazy mode), see `schedule`
+        self.__expanded: queue.Queue[FSDir] = queue.Queue()
+        self.__thread: Optional[threading.Thread] = None
+        self.__lock = threading.Lock()
 
     def _generate_unsafe(self, cache=True) -> None:
         if self._generated:
             return
+        with self.__lock:
+            self._generate_locked(cache)
+
+    def _generate_locked(self, cache=True) -> None:
 
         try:
             artefact = self.metadata.read()
         except Exception:
             artefact = None
-        pdf_files = self.fstree.pdf_list()
+        if cache and artefact:
+            self._migrate(artefact)
+        # files inside archives are not rendered, they would be extracted
+        pdf_files = [pf for pf in self.fstree.pdf_list() if archive_of(pf) is None]
 
         if cache and artefact:
             cached = {c.original: c for c in artefact.covers}
@@ -211,7 +231,13 @@ class BookCoverGenerator:
 
             old_paths = set(cached.keys())
             new_paths = {pf._path for pf in pdf_files}
-            orphaned = old_paths - new_paths
+            orphaned: set[str] = set()
+            for path in old_paths - new_paths:
+                if self._is_pending(path):
+                    # not scanned yet in lazy mode, the cover is kept
+                    valid.append(cached[path])
+                else:
+                    orphaned.add(path)
             # remaining covers that haven't been paired with existing pdf files
             for pf in orphaned:
                 shutil.rmtree(
@@ -219,52 +245,215 @@ class BookCoverGenerator:
                     ignore_errors=False,
                 )
 
-            extra_covers = [self._generate_cover(pf) for pf in to_gen]
+            extra_covers = self._generate_covers(to_gen)
             valid += extra_covers
             self.metadata.save(valid)
         else:
             os.makedirs(self.data_dir, exist_ok=True)
-            covers = [self._generate_cover(pf) for pf in pdf_files]
+            covers = self._generate_covers(pdf_files)
             self.metadata.save(covers)
 
         self._generated = True
         self.logger.info("BookCoverGenerator: Book covers generated successfully.")
 
+    def _is_pending(self, path: str) -> bool:
+        """file can still be found in the tree. It's under a directory that
+        is not scanned yet or it's scanned after the list of files was taken"""
+        fstree = self.fstree
+        if fstree.is_pending(path):
+            return True
+        relpath = fstree.root_relative(path)
+        return fstree.get_node(relpath, expand=False) is not None
+
+    def schedule(self, fsdir: FSDir) -> None:
+        """generate covers of PDF files of directory expanded after the
+        start, they are rendered by the thread started by `start`"""
+        self.__expanded.put(fsdir)
+
+    def start(self) -> None:
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__thread = threading.Thread(
+            target=self._run,
+            name="cover-generator",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def _run(self) -> None:
+        while True:
+            fsdir = self.__expanded.get()
+            try:
+                self.generate_dir(fsdir)
+            except Exception:
+                self.logger.exception(
+                    f"BookCoverGenerator: covers of {fsdir._path} are not generated"
+                )
+
+    def generate_dir(self, fsdir: FSDir) -> None:
+        """generate missing covers of PDF files of directory and add them
+        to the metadata"""
+        pdf_files = [
+            n
+            for n in list(fsdir.children)
+            if isinstance(n, PDFFile) and archive_of(n) is None
+        ]
+        if not pdf_files:
+            return
+        with self.__lock:
+            try:
+                artefact = self.metadata.read()
+            except Exception:
+                artefact = None
+            covers = {c.original: c for c in artefact.covers} if artefact else {}
+            to_gen = [
+                pf
+                for pf in pdf_files
+                if pf._path not in covers or covers[pf._path].mtime != pf.mtime
+            ]
+            if not to_gen:
+                return
+            for cover in self._generate_covers(to_gen):
+                covers[cover.original] = cover
+            self.metadata.save(list(covers.values()))
+        self.logger.info(
+            f"BookCoverGenerator: {len(to_gen)} covers of {fsdir._path} generated."
+        )
+
+    def _migrate(self, artefact: _BookCoverMetadataDigest) -> None:
+        """move covers stored by ids of another NID scheme to the current ids.
+
+        Cover directories are renamed and `covers.json` is rewritten, covers
+        without their directory are dropped to be generated again.
+        """
+        covers: list[_BookCoverInfo] = []
+        migrated = 0
+        for cover in artefact.covers:
+            nid = str(NID(cover.original))
+            if cover.pdf_nid == nid:
+                covers.append(cover)
+                continue
+            old_dir = os.path.join(self.data_dir, str(cover.pdf_nid))
+            new_dir = os.path.join(self.data_dir, nid)
+            if not os.path.isdir(old_dir):
+                continue
+            if os.path.exists(new_dir):
+                shutil.rmtree(new_dir)
+            os.rename(old_dir, new_dir)
+            cover.pdf_nid = nid
+            cover.thumbnails = {
+                device: os.path.join(new_dir, os.path.basename(file))
+                for device, file in cover.thumbnails.items()
+            }
+            covers.append(cover)
+            migrated += 1
+
+        if len(covers) != len(artefact.covers) or migrated:
+            artefact.covers = covers
+            artefact.count = len(covers)
+            self.metadata.save(covers)
+            self.logger.info(f"BookCoverGenerator: {migrated} covers migrated.")
+
+    def _generate_covers(self, pdf_files: list[PDFFile]) -> list[_BookCoverInfo]:
+        """covers of files, every group of duplicates is rendered once and
+        the images are linked to the other files of the group"""
+        sources: dict[PDFFile, PDFFile] = {}
+        for group in self.duplicates.find(pdf_files):
+            for pf in group[1:]:
+                sources[pf] = group[0]
+        rendered = {
+            pf: self._generate_cover(pf) for pf in pdf_files if pf not in sources
+        }
+        if sources:
+            self.logger.info(
+                f"BookCoverGenerator: {len(sources)} duplicates share covers."
+            )
+        covers: list[_BookCoverInfo] = []
+        for pf in pdf_files:
+            src = sources.get(pf)
+            if src is None:
+                covers.append(rendered[pf])
+            else:
+                covers.append(self._link_cover(pf, rendered[src]))
+        return covers
+
+    def _link_cover(self, pf: PDFFile, source: _BookCoverInfo) -> _BookCoverInfo:
+        """cover of file made of the images of identical file"""
+        info = _BookCoverInfo(
+            original=pf._path,
+            pdf_nid=pf.nid,
+            thumbnails={},
+            mtime=pf.mtime,
+        )
+        nid_dir = os.path.join(self.data_dir, str(pf.nid))
+        os.makedirs(nid_dir, exist_ok=True)
+        for device, src in source.thumbnails.items():
+            cfp = os.path.join(nid_dir, os.path.basename(src))
+            if os.path.exists(cfp):
+                os.remove(cfp)
+            try:
+                os.link(src, cfp)
+            except OSError:
+                shutil.copyfile(src, cfp)
+            info.thumbnails[device] = cfp
+        return info
+
     def _generate_cover(
         self,
         pf: PDFFile,
     ) -> _BookCoverInfo:
-        """Generate cover by the fist page of pdf file."""
+        """Generate cover by the fist page of pdf file.
+
+        The page is rasterized once, at the highest dpi of the settings.
+        Thumbnails are made largest first, each one is downscaled from the
+        previous thumbnail when it's not smaller than the next one.
+        """
         info = _BookCoverInfo(
             original=pf._path,
             pdf_nid=pf.nid,
             thumbnails={},
             mtime=pf.mtime,
         )
-        for s in self.image_settings:
-            ppm_image = self.converter(
-                pdf_path=pf._path,
-                dpi=s.dpi,
-                first_page=1,
-                last_page=1,
-            ).pop()
-
-            image = ppm_image.resize(
-                (s.page_x, s.page_y),
-                resample=Resampling.LANCZOS,
-            )
-
-            nid_dir = os.path.join(self.data_dir, str(pf.nid))
-            if not os.path.exists(nid_dir):
-                os.makedirs(nid_dir, exist_ok=True)
-            # cover file
-            cfp = os.path.join(nid_dir, f"{s.device}.{s.format.lower()}")
-            image.save(
-                fp=cfp,
-                format=s.format,
-                quality=s.quality,
+        nid_dir = os.path.join(self.data_dir, str(pf.nid))
+        if not os.path.exists(nid_dir):
+            os.makedirs(nid_dir, exist_ok=True)
+
+        page = self.converter(
+            pdf_path=pf._path,
+            dpi=max(s.dpi for s in self.image_settings),
+            first_page=1,
+            last_page=1,
+        ).pop()
+        try:
+            settings = sorted(
+                self.image_settings,
+                key=lambda s: s.page_x * s.page_y,
+                reverse=True,
             )
-            info.thumbnails[s.device] = cfp
+            image, size = page, None
+            for s in settings:
+                if size is None or size[0] < s.page_x or size[1] < s.page_y:
+                    # other aspect ratio, the previous thumbnail is too small
+                    image = page
+                image = image.resize(
+                    (s.page_x, s.page_y),
+                    resample=Resampling.LANCZOS,
+                    reducing_gap=3.0,
+                )
+                size = (s.page_x, s.page_y)
+                # cover file, it can be linked to covers of duplicates, so it's
+                # replaced by a new file instead of being rewritten in place
+                cfp = os.path.join(nid_dir, f"{s.device}.{s.format.lower()}")
+                tmp = f"{cfp}.tmp"
+                image.save(
+                    fp=tmp,
+                    format=s.format,
+                    quality=s.quality,
+                )
+                os.replace(tmp, cfp)
+                info.thumbnails[s.device] = cfp
+        finally:
+            page.close()
         return info
 
     def clear_data(self) -> None:
@@ -290,8 +479,14 @@ class BookCoverStaticComponent(StaticComponent):
         super().__init__(static_path)
 
     def mount(self, app: FastAPI) -> None:
-        generator = BookCoverGenerator()
+        generator = BookCoverGenerator(duplicates=get_duplicates())
+        lazy = generator.fstree.unexpanded > 0
+        if lazy:
+            # directories scanned in background get their covers later
+            generator.fstree.on_expand(generator.schedule)
         generator.generate(cache=True)
+        if lazy:
+            generator.start()
 
         app.mount(
             self.static_path,
@@ -307,15 +502,13 @@ class BookCoverService:
     ) -> None:
         m = m or BookCoverMetadata()
         self.metadata = m.read()
+        self.covers: dict[str, _BookCoverInfo] = {}
+        if self.metadata is not None:
+            self.covers = {str(c.pdf_nid): c for c in self.metadata.covers}
 
     def get_cover(self, pdf_file: PDFFile, device: str = "desktop") -> str:
         default_cover = ""
-        if self.metadata is None:
-            return default_cover
-        pdf_cover_data: None | _BookCoverInfo = None
-        for cover in self.metadata.covers:
-            if cover.pdf_nid == str(pdf_file.nid):
-                pdf_cover_data = cover
+        pdf_cover_data = self.covers.get(str(pdf_file.nid))
         if pdf_cover_data is None:
             return default_cover
 
@@ -7,21 +7,45 @@
 # ================================================================
 
 
+import time
 from logging import getLogger
-from typing import Optional
+from typing import Any, Optional
 
+from fastapi.concurrency import run_in_threadpool
 from fastapi.requests import Request
+from fastapi.responses import Response
 from fastapi.templating import Jinja2Templates
 
 from localbook.config import Settings
-from localbook.dependencies import get_fstree, get_jinja2, get_settings
+from localbook.dependencies import (
+    get_duplicates,
+    get_fstree,
+    get_jinja2,
+    get_settings,
+)
 from localbook.exceptions.exceptions import BadRequestExpection, NotFoundException
+from localbook.lib.filesystem.columns import QueryOrder
 from localbook.lib.filesystem.dir import FSDir, is_fsdir
+from localbook.lib.filesystem.duplicates import DuplicateDetector
 from localbook.lib.filesystem.pdf import PDFFile, is_pdf
+from localbook.lib.filesystem.sort import SortOrder
 from localbook.lib.filesystem.tree import FSTree
 from localbook.service.book.cover import BookCoverService
 from localbook.templates import TemplateMap
 
+# part of ETags, pages rendered by another run of the server (e.g. with
+# other templates) are not reused
+_ETAG_EPOCH = format(int(time.time()), "x")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """`If-None-Match` header contains `etag`"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
 
 class LibraryServiceContextBuilder:
     def __init__(
@@ -32,9 +56,14 @@ class LibraryServiceContextBuilder:
         self.fstree = fstree or get_fstree()
         self.pdf_cover_service = pdf_cover_service or BookCoverService()
 
-    def build_tree_view(self, request: Request, root: FSDir):
-        entries = sorted(root.iter_children(), key=lambda n: n.name)
-        toggle_view_url = request.url_for("serve_list_view")
+    def build_tree_view(
+        self,
+        request: Request,
+        root: FSDir,
+        order: SortOrder = "name",
+    ):
+        entries = root.sorted_children(order)
+        toggle_view_url = request.url_for("serve_list_view", path=root.relpath)
         breadcrumbs = root.relpath and "/" + root.relpath or "/"
         context = {
             "entries": entries,
@@ -46,24 +75,62 @@ class LibraryServiceContextBuilder:
         return context
 
     def normalize_cover_file(self, f: str, nid: str) -> str:
+        if nid not in f:  # cover is not generated yet
+            return ""
         relpath = f[f.index(nid) :]
         prefix = "/build/images/covers"
         return f"{prefix}/{relpath}"
 
-    def build_list_view(self, request: Request):
-        pdf_files = sorted(self.fstree.pdf_list(), key=lambda x: x.name)
+    def build_list_view(
+        self,
+        request: Request,
+        root: FSDir,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        order: QueryOrder = "name",
+        filters: Optional[dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            order (str): order of PDF files, see `NodeColumns.query`
+            filters (dict): filters of `NodeColumns.query`, e.g. `min_size`
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        if filters or order != "name":
+            total, pdf_files = self.fstree.query(
+                root, kind="pdf", order=order, offset=offset, limit=limit, **filters
+            )
+        else:
+            total, pdf_files = self.fstree.subtree_pdfs(root, offset, limit)
         covers: dict[str, str] = {}
         for pdf in pdf_files:
             if is_pdf(pdf) and isinstance(pdf, PDFFile):
                 cover_file = self.pdf_cover_service.get_cover(pdf)
                 cover_file = self.normalize_cover_file(cover_file, pdf.nid)
                 covers[pdf.nid] = cover_file
-        toggle_view_url = request.url_for("serve_tree_view", path="")
+        toggle_view_url = request.url_for("serve_tree_view", path=root.relpath)
+        prev_page_url = next_page_url = None
+        if limit is not None:
+            # keeps filters of the query
+            url = request.url
+            if offset > 0:
+                prev_offset = max(0, offset - limit)
+                prev_page_url = url.include_query_params(
+                    offset=prev_offset, limit=limit
+                )
+            if offset + limit < total:
+                next_page_url = url.include_query_params(
+                    offset=offset + limit, limit=limit
+                )
         context = {
             "pdf_files": pdf_files,
             "covers": covers,
             "view_type": "list",
+            "view_title": root.relpath and "/" + root.relpath or None,
             "toggle_view_url": toggle_view_url,
+            "total": total,
+            "prev_page_url": prev_page_url,
+            "next_page_url": next_page_url,
         }
         return context
 
@@ -77,6 +144,7 @@ class LibraryService:
         fstree: Optional[FSTree] = None,
         jinja2: Optional[Jinja2Templates] = None,
         tmplmap: Optional[TemplateMap] = None,
+        duplicates: Optional[DuplicateDetector] = None,
     ) -> None:
         self.logger = getLogger("localbook")
         self.fstree = fstree or get_fstree()
@@ -85,8 +153,14 @@ class LibraryService:
         self.tmplmap = tmplmap or TemplateMap()
         self.pdf_cover_service = pdf_cover_service or BookCoverService()
         self.ctx_builder = ctx_builder or LibraryServiceContextBuilder()
+        self.duplicates = duplicates or get_duplicates()
 
-    async def serve_tree_view(self, request: Request, path=""):
+    async def serve_tree_view(
+        self,
+        request: Request,
+        path="",
+        order: SortOrder = "name",
+    ):
         if path == "":  # default value
             dir = self.fstree.get_root_node()
         else:
@@ -96,15 +170,81 @@ class LibraryService:
         if not is_fsdir(dir):
             raise BadRequestExpection(f"Error: {path} is not a directory")
 
-        context = self.ctx_builder.build_tree_view(request, root=dir)
+        # the page changes only with the subtree, its digest is a strong ETag
+        etag = f'"{self.fstree.digest(dir)}-{order}-{_ETAG_EPOCH}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        context = self.ctx_builder.build_tree_view(request, root=dir, order=order)
         return self.tmpl.TemplateResponse(
             request=request,
             name=self.tmplmap.serve_tree_view,
             context=context,
+            headers=headers,
         )
 
-    async def serve_list_view(self, request: Request):
-        context = self.ctx_builder.build_list_view(request)
+    async def serve_stats(self, path=""):
+        """aggregates of directory subtree"""
+        if path == "":  # default value
+            dir = self.fstree.get_root_node()
+        else:
+            dir = self.fstree.get_node(path)
+        if dir is None:
+            raise NotFoundException(f"Error: directory '{path}' not found")
+        if not is_fsdir(dir):
+            raise BadRequestExpection(f"Error: {path} is not a directory")
+
+        return {"path": dir.relpath, **self.fstree.stats(dir).to_dict()}
+
+    async def serve_duplicates(self, path=""):
+        """groups of byte-identical PDF files under directory"""
+        if path == "":  # default value
+            dir = self.fstree.get_root_node()
+        else:
+            dir = self.fstree.get_node(path)
+        if dir is None:
+            raise NotFoundException(f"Error: directory '{path}' not found")
+        if not is_fsdir(dir):
+            raise BadRequestExpection(f"Error: {path} is not a directory")
+
+        _, pdf_files = self.fstree.subtree_pdfs(dir)
+        # files are hashed, it can take a while on the first request
+        groups = await run_in_threadpool(self.duplicates.find, pdf_files)
+        return {
+            "path": dir.relpath,
+            "groups": [
+                {
+                    "size": group[0].size,
+                    "files": [{"path": pf.relpath, "nid": pf.nid} for pf in group],
+                }
+                for group in groups
+            ],
+            # bytes taken by the extra copies
+            "wasted": sum(g[0].size * (len(g) - 1) for g in groups),
+        }
+
+    async def serve_list_view(
+        self,
+        request: Request,
+        path="",
+        offset: int = 0,
+        limit: Optional[int] = None,
+        order: QueryOrder = "name",
+        filters: Optional[dict[str, Any]] = None,
+    ):
+        if path == "":  # default value
+            dir = self.fstree.get_root_node()
+        else:
+            dir = self.fstree.get_node(path)
+        if dir is None:
+            raise NotFoundException(f"Error: directory '{path}' not found")
+        if not is_fsdir(dir):
+            raise BadRequestExpection(f"Error: {path} is not a directory")
+
+        context = self.ctx_builder.build_list_view(
+            request, dir, offset, limit, order, filters
+        )
         return self.tmpl.TemplateResponse(
             request=request,
             name=self.tmplmap.serve_list_view,
@@ -0,0 +1,116 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 19.10.2026 02:10
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+# /// script
+# requires-python = ">=3.13"
+# dependencies = ["pdf2image", "pillow"]
+# ///
+
+"""Compare cover generation with a rasterization per size and a single one.
+
+Usage:
+    uv run scripts/bench_cover.py [PATH] [--books N] [--repeat N]
+
+Without PATH simple PDF files are generated in a temporary directory.
+Requires poppler (pdfinfo, pdftoppm) in PATH.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import Mock
+
+from _config import git_root
+
+sys.path.insert(0, git_root())
+
+from pdf2image import convert_from_path  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+from PIL.Image import Resampling  # noqa: E402
+
+from localbook.lib.filesystem.pdf import PDFFile  # noqa: E402
+from localbook.lib.filesystem.tree import FSTree  # noqa: E402
+from localbook.service.book.cover import BookCoverGenerator  # noqa: E402
+
+
+def generate_corpus(root: str, books: int) -> None:
+    for i in range(books):
+        page = Image.new("RGB", (1240, 1754), "white")
+        draw = ImageDraw.Draw(page)
+        for y in range(0, 1754, 40):
+            draw.line((0, y, 1240, (y * 7 + i) % 1754), fill=(i % 255, 80, 160))
+        page.save(os.path.join(root, f"book-{i}.pdf"), format="PDF", resolution=150)
+
+
+class PerSizeGenerator(BookCoverGenerator):
+    """cover generation before the single rasterization"""
+
+    def _generate_cover(self, pf: PDFFile):
+        info = Mock(thumbnails={})
+        nid_dir = os.path.join(self.data_dir, str(pf.nid))
+        os.makedirs(nid_dir, exist_ok=True)
+        for s in self.image_settings:
+            page = self.converter(
+                pdf_path=pf._path, dpi=s.dpi, first_page=1, last_page=1
+            ).pop()
+            image = page.resize((s.page_x, s.page_y), resample=Resampling.LANCZOS)
+            cfp = os.path.join(nid_dir, f"{s.device}.{s.format.lower()}")
+            image.save(fp=cfp, format=s.format, quality=s.quality)
+            info.thumbnails[s.device] = cfp
+        return info
+
+
+def measure(cls, fstree: FSTree, repeat: int) -> tuple[float, int]:
+    """best time of cover generation for all books and calls of converter"""
+    converter = Mock(side_effect=convert_from_path)
+    best = float("inf")
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="localbook-covers") as cover_dir:
+            generator = cls(
+                cover_dir,
+                metadata=Mock(),
+                fstree=fstree,
+                converter=converter,
+            )
+            pdfs = fstree.pdf_list()
+            start = time.perf_counter()
+            for pf in pdfs:
+                generator._generate_cover(pf)
+            best = min(best, time.perf_counter() - start)
+    return best, converter.call_count // repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="localbook-bench") as tmp:
+        root = args.path
+        if root is None:
+            root = tmp
+            generate_corpus(root, args.books)
+        fstree = FSTree(root)
+        books = len(fstree.pdf_list())
+
+        old, old_calls = measure(PerSizeGenerator, fstree, args.repeat)
+        new, new_calls = measure(BookCoverGenerator, fstree, args.repeat)
+
+        print(f"corpus:     {root}")
+        print(f"books:      {books}")
+        print(f"per size:   {old / books * 1000:.1f} ms/book, {old_calls} renders")
+        print(f"single:     {new / books * 1000:.1f} ms/book, {new_calls} renders")
+        print(f"speedup:    {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
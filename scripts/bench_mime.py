@@ -0,0 +1,118 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 15:20
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+# /// script
+# requires-python = ">=3.13"
+# dependencies = []
+# ///
+
+"""Compare MIME classification throughput of libmagic and signatures.
+
+Usage:
+    uv run scripts/bench_mime.py [PATH] [--files N] [--repeat N]
+
+Without PATH a mixed corpus (pdf, images, djvu, epub, text and binary
+files) is generated in a temporary directory.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+from _config import git_root
+
+sys.path.insert(0, git_root())
+
+import magic  # noqa: E402
+
+from localbook.lib.filesystem.utils import _read_mime  # noqa: E402
+
+PNG_HEADER = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x01\x00\x00\x00\x01\x00\x08\x02"
+)
+
+CORPUS = {
+    "book-{}.pdf": lambda: b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n" + os.urandom(16384),
+    "scan-{}.pdf": lambda: b"\r\n\r\n%PDF-1.7\n" + os.urandom(16384),
+    "cover-{}.png": lambda: PNG_HEADER + os.urandom(8192),
+    "photo-{}.jpg": lambda: b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + os.urandom(8192),
+    "scan-{}.djvu": lambda: b"AT&TFORM\x00\x01\x00\x00DJVUINFO" + os.urandom(8192),
+    "notes-{}.txt": lambda: b"some notes about the book\n" * 400,
+    "data-{}.bin": lambda: os.urandom(16384),
+}
+
+
+def write_epub(path: str) -> None:
+    with zipfile.ZipFile(path, "w") as epub:
+        epub.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+        epub.writestr("content.opf", "<package/>" * 100)
+
+
+def generate_corpus(root: str, files: int) -> None:
+    for i in range(files):
+        for name, content in CORPUS.items():
+            with open(os.path.join(root, name.format(i)), "wb") as f:
+                f.write(content())
+        write_epub(os.path.join(root, f"book-{i}.epub"))
+
+
+def read_mime_magic(path: str) -> str:
+    """classification before signatures, always by libmagic"""
+    with open(path, "rb") as f:
+        return magic.from_buffer(f.read(1024 * 10), mime=True)
+
+
+def measure(func, paths: list[str], repeat: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    mimes: list[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        mimes = [func(path) for path in paths]
+        best = min(best, time.perf_counter() - start)
+    return best, mimes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="localbook-bench") as tmp:
+        root = args.path
+        if root is None:
+            root = tmp
+            generate_corpus(root, args.files)
+        paths = [
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(root)
+            for name in names
+        ]
+
+        old, old_mimes = measure(read_mime_magic, paths, args.repeat)
+        new, new_mimes = measure(_read_mime, paths, args.repeat)
+
+        diff = [
+            (path, a, b) for path, a, b in zip(paths, old_mimes, new_mimes) if a != b
+        ]
+        print(f"corpus:     {root}")
+        print(f"files:      {len(paths)}")
+        print(f"libmagic:   {len(paths) / old:.0f} files/s")
+        print(f"signatures: {len(paths) / new:.0f} files/s")
+        print(f"speedup:    {old / new:.2f}x")
+        print(f"differ:     {len(diff)}")
+        for path, a, b in diff[:10]:
+            print(f"  {os.path.basename(path)}: {a} -> {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 21:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+# /// script
+# requires-python = ">=3.13"
+# dependencies = ["numpy"]
+# ///
+
+"""Measure metadata queries over a synthetic tree of nodes.
+
+Usage:
+    uv run scripts/bench_query.py [--dirs N] [--files N] [--repeat N]
+
+The tree is built in memory, nodes are not backed by files.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from _config import git_root
+
+sys.path.insert(0, git_root())
+
+from localbook.lib.filesystem.columns import NodeColumns  # noqa: E402
+from localbook.lib.filesystem.dir import FSDir  # noqa: E402
+from localbook.lib.filesystem.file import FSFile  # noqa: E402
+from localbook.lib.filesystem.pdf import PDFFile  # noqa: E402
+
+MB = 1024 * 1024
+YEAR = 365 * 24 * 3600
+
+QUERIES = {
+    "pdf > 50 MB this year by size": dict(
+        kind="pdf",
+        min_size=50 * MB,
+        modified_after=time.time() - YEAR,
+        order="size",
+        limit=50,
+    ),
+    "pdf by mtime, 3rd page": dict(kind="pdf", order="mtime", offset=100, limit=50),
+    "pdf by name": dict(kind="pdf", order="name", limit=50),
+    "text files < 1 MB": dict(mime="text/plain", max_size=MB, limit=50),
+}
+
+
+def generate_tree(dirs: int, files: int) -> FSDir:
+    now = time.time()
+    root = FSDir("/library", None, size=4096, mtime=now)
+    for i in range(dirs):
+        path = f"/library/dir {i}"
+        fsdir = FSDir(path, root, size=4096, mtime=now, name=f"dir {i}")
+        children = []
+        for j in range(files):
+            pdf = j % 2 == 0
+            cls = PDFFile if pdf else FSFile
+            children.append(
+                cls(
+                    f"{path}/book {j}.pdf",
+                    fsdir,
+                    "application/pdf" if pdf else "text/plain",
+                    name=f"book {j}.pdf",
+                    size=random.randint(0, 200 * MB),
+                    mtime=now - random.uniform(0, 5 * YEAR),
+                )
+            )
+        fsdir.add_children(children)
+        root.add_child(fsdir)
+    return root
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dirs", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    root = generate_tree(args.dirs, args.files)
+    print(f"tree:    {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    columns = NodeColumns(root)
+    print(f"columns: {time.perf_counter() - start:.2f}s, {len(columns)} nodes")
+
+    start = time.perf_counter()
+    columns.name_rank
+    print(f"names:   {time.perf_counter() - start:.2f}s")
+
+    for title, filters in QUERIES.items():
+        best = float("inf")
+        total = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            total, _nodes = columns.query(root, **filters)
+            best = min(best, time.perf_counter() - start)
+        print(f"{title}: {best * 1000:.1f} ms, {total} matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 10:12
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+# /// script
+# requires-python = ">=3.13"
+# dependencies = []
+# ///
+
+"""Compare serial and parallel FSTree scans.
+
+Usage:
+    uv run scripts/bench_scan.py [PATH] [--workers N] [--repeat N]
+
+Without PATH a synthetic library is generated in a temporary directory.
+Point it to a real (network) library to see the effect of parallel I/O,
+or emulate a network mount with `--latency` (milliseconds per syscall).
+"""
+
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+
+from _config import git_root
+
+sys.path.insert(0, git_root())
+
+from localbook.lib.filesystem.dir import FSDir  # noqa: E402
+from localbook.lib.filesystem.file import FSFile  # noqa: E402
+from localbook.lib.filesystem.tree import FSTree  # noqa: E402
+
+PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+
+def generate_library(root: str, dirs: int, files: int) -> None:
+    for d in range(dirs):
+        sub = os.path.join(root, f"shelf-{d // 10}", f"series-{d}")
+        os.makedirs(sub, exist_ok=True)
+        for f in range(files):
+            if f % 2:
+                with open(os.path.join(sub, f"book-{f}.pdf"), "wb") as pdf:
+                    pdf.write(PDF_HEADER + os.urandom(2048))
+            else:
+                with open(os.path.join(sub, f"notes-{f}.txt"), "w") as txt:
+                    txt.write("notes " * 200)
+
+
+def emulate_latency(latency: float) -> None:
+    """add a delay to directory listing and stat syscalls"""
+
+    def slow(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            time.sleep(latency)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    os.scandir = slow(os.scandir)
+    os.stat = slow(os.stat)
+
+
+def layout(fstree: FSTree):
+    return [
+        (
+            path,
+            type(node).__name__,
+            node.mime if isinstance(node, FSFile) else None,
+            [c.name for c in node.children] if isinstance(node, FSDir) else None,
+        )
+        for path, node in sorted(fstree.node_map.items())
+    ]
+
+
+def measure(root: str, workers: int, repeat: int) -> tuple[float, FSTree]:
+    best = float("inf")
+    fstree = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fstree = FSTree(root, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    assert fstree is not None
+    return best, fstree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="localbook-bench") as tmp:
+        root = args.path
+        if root is None:
+            root = tmp
+            generate_library(root, args.dirs, args.files)
+        if args.latency:
+            emulate_latency(args.latency / 1000)
+
+        serial, serial_tree = measure(root, 1, args.repeat)
+        parallel, parallel_tree = measure(root, args.workers, args.repeat)
+
+        assert layout(serial_tree) == layout(parallel_tree), "trees differ"
+        print(f"library:  {root}")
+        print(f"nodes:    {len(serial_tree.node_map)}")
+        print(f"latency:  {args.latency}ms")
+        print(f"serial:   {serial:.3f}s")
+        print(f"parallel: {parallel:.3f}s ({args.workers} workers)")
+        print(f"speedup:  {serial / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
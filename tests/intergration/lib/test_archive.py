@@ -0,0 +1,153 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 19.10.2026 00:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import asyncio
+import os
+import tempfile
+import time
+import zipfile
+from unittest.mock import Mock
+
+from pytest import fixture, raises
+
+from localbook.exceptions.exceptions import RangeNotSatisfiableException
+from localbook.lib.filesystem.archive import ArchiveMember, ZipArchive, archive_of
+from localbook.lib.filesystem.file import FSFile
+from localbook.lib.filesystem.pdf import PDFFile
+from localbook.lib.filesystem.poller import FSTreePoller
+from localbook.lib.filesystem.tree import FSTree
+from localbook.service.book.book import BookService, _parse_range
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 64
+
+
+def create_archive(path: str) -> None:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("books/stored.pdf", PDF, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("books/deep/packed.pdf", PDF, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("notes.txt", b"notes", compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("empty/", b"")
+        zf.writestr(".hidden/book.pdf", PDF)
+        zf.writestr("__MACOSX/books/._stored.pdf", b"")
+        zf.writestr("../escape.pdf", PDF)
+
+
+class TestZipArchive:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "dir1"))
+            create_archive(os.path.join(tmp_dir, "dir1", "books.zip"))
+            with open(os.path.join(tmp_dir, "dir1", "file1.txt"), "w") as f:
+                f.write("file1")
+            yield tmp_dir
+
+    def test_members(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        assert sorted(fstree.node_map) == [
+            "",
+            "dir1",
+            "dir1/books.zip",
+            "dir1/books.zip/books",
+            "dir1/books.zip/books/deep",
+            "dir1/books.zip/books/deep/packed.pdf",
+            "dir1/books.zip/books/stored.pdf",
+            "dir1/books.zip/notes.txt",
+            "dir1/file1.txt",
+        ]
+        archive = fstree.get_node("dir1/books.zip")
+        assert isinstance(archive, ZipArchive)
+        book = fstree.get_node("dir1/books.zip/books/stored.pdf")
+        assert isinstance(book, PDFFile) and book.size == len(PDF)
+        assert archive_of(book) == (archive, "books/stored.pdf")
+        assert archive_of(archive) is None
+        notes = fstree.get_node("dir1/books.zip/notes.txt")
+        assert isinstance(notes, FSFile) and notes.mime == "text/plain"
+        assert fstree.subtree_pdfs(fstree.root_node)[0] == 2
+
+    def test_read(self, tree_dir: str):
+        path = os.path.join(tree_dir, "dir1", "books.zip")
+        stored = ArchiveMember(path, "books/stored.pdf")
+        assert stored.seekable
+        assert b"".join(stored.iter_bytes(chunk_size=1000)) == PDF
+        assert b"".join(stored.iter_bytes(100, 5000)) == PDF[100:5000]
+
+        packed = ArchiveMember(path, "books/deep/packed.pdf")
+        assert not packed.seekable
+        assert b"".join(packed.iter_bytes(chunk_size=1000)) == PDF
+        with raises(ValueError):
+            next(packed.iter_bytes(100))
+        with raises(KeyError):
+            ArchiveMember(path, "missing.pdf")
+
+    def test_update(self, tree_dir: str):
+        with tempfile.TemporaryDirectory(prefix="localbook") as cache_dir:
+            snapshot_file = os.path.join(cache_dir, "fstree.snapshot")
+            fstree = FSTree(tree_dir, snapshot_file=snapshot_file)
+            # members of restored archives are read again
+            warm = FSTree(tree_dir, snapshot_file=snapshot_file)
+            assert sorted(warm.node_map) == sorted(fstree.node_map)
+
+        path = os.path.join(tree_dir, "dir1", "books.zip")
+        with zipfile.ZipFile(path, "a") as zf:
+            zf.writestr("more/new.pdf", PDF)
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        fstree.update_path(path)
+        assert isinstance(fstree.get_node("dir1/books.zip"), ZipArchive)
+        assert fstree.get_node("dir1/books.zip/more/new.pdf") is not None
+        assert sorted(fstree.node_map) == sorted(FSTree(tree_dir).node_map)
+
+    def test_poll(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        poller = FSTreePoller(fstree, interval=10)
+        poller.poll(now=0)
+        # archive is checked as a file by the listing of its directory
+        assert poller.interval_of(os.path.join(tree_dir, "dir1", "books.zip")) is None
+        path = os.path.join(tree_dir, "dir1", "books.zip")
+        with zipfile.ZipFile(path, "a") as zf:
+            zf.writestr("more/new.pdf", PDF)
+        os.utime(os.path.join(tree_dir, "dir1"), (time.time() + 10,) * 2)
+        assert poller.poll(now=100) == 1
+        assert fstree.get_node("dir1/books.zip/more/new.pdf") is not None
+
+    def test_many_members(self, tree_dir: str):
+        path = os.path.join(tree_dir, "dir1", "many.zip")
+        with zipfile.ZipFile(path, "w") as zf:
+            for i in range(5000):
+                zf.writestr(f"dir {i % 50}/book {i}.pdf", b"")
+        start = time.perf_counter()
+        fstree = FSTree(tree_dir)
+        assert time.perf_counter() - start < 1
+        assert fstree.subtree_pdfs(fstree.get_node("dir1/many.zip"))[0] == 5000
+
+    def test_serve(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        service = BookService(jinja2=Mock(), fstree=fstree, book_viewer=Mock())
+
+        def get(path: str, range: str | None = None):
+            request = Mock()
+            request.headers = {"range": range} if range else {}
+            response = asyncio.run(service.serve_archive_file(request, path))
+
+            async def body() -> bytes:
+                return b"".join([c async for c in response.body_iterator])
+
+            return response, asyncio.run(body())
+
+        response, body = get("dir1/books.zip/books/stored.pdf", "bytes=10-19")
+        assert response.status_code == 206 and body == PDF[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{len(PDF)}"
+        # compressed files are sent whole
+        response, body = get("dir1/books.zip/books/deep/packed.pdf", "bytes=10-19")
+        assert response.status_code == 200 and body == PDF
+
+        assert _parse_range("bytes=-10", 100) == (90, 100)
+        assert _parse_range("bytes=90-", 100) == (90, 100)
+        assert _parse_range("bytes=0-1,5-6", 100) is None
+        with raises(RangeNotSatisfiableException):
+            _parse_range("bytes=100-", 100)
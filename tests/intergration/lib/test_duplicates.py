@@ -0,0 +1,80 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 19.10.2026 01:30
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import os
+import tempfile
+
+from pytest import MonkeyPatch
+
+import localbook.lib.filesystem.duplicates
+from localbook.lib.filesystem.duplicates import DuplicateDetector, HashCache
+from localbook.lib.filesystem.tree import FSTree
+
+EDGE = 1024
+
+
+def write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class TestDuplicateDetector:
+    def create_tree(self, tmp_dir: str) -> None:
+        large = b"%PDF-1.4\n" + os.urandom(4 * EDGE)
+        # the same ends, other middle
+        middle = bytearray(large)
+        middle[2 * EDGE] ^= 0xFF
+        write(os.path.join(tmp_dir, "a", "large.pdf"), large)
+        write(os.path.join(tmp_dir, "b", "large copy.pdf"), large)
+        write(os.path.join(tmp_dir, "b", "middle.pdf"), bytes(middle))
+        write(os.path.join(tmp_dir, "c", "small.pdf"), b"%PDF-1.4\nsmall")
+        write(os.path.join(tmp_dir, "d", "small.pdf"), b"%PDF-1.4\nsmall")
+        write(os.path.join(tmp_dir, "d", "other.pdf"), b"%PDF-1.4\nother")
+        write(os.path.join(tmp_dir, "unique.pdf"), b"%PDF-1.4\nunique file")
+
+    def test_find(self, monkeypatch: MonkeyPatch) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            self.create_tree(tmp_dir)
+            fstree = FSTree(tmp_dir)
+            cache_file = os.path.join(tmp_dir, ".cache", "hash.cache")
+            detector = DuplicateDetector(
+                workers=2, cache=HashCache(cache_file), edge=EDGE
+            )
+
+            hashed: list[str] = []
+            full_hash = localbook.lib.filesystem.duplicates.full_hash
+
+            def counting_hash(path: str, *args) -> bytes:
+                hashed.append(os.path.relpath(path, tmp_dir))
+                return full_hash(path, *args)
+
+            monkeypatch.setattr(
+                localbook.lib.filesystem.duplicates, "full_hash", counting_hash
+            )
+            groups = detector.find(fstree.pdf_list())
+            assert [[p.relpath for p in g] for g in groups] == [
+                ["a/large.pdf", "b/large copy.pdf"],
+                ["c/small.pdf", "d/small.pdf"],
+            ]
+            # only large files with the same ends are hashed as a whole
+            assert sorted(hashed) == ["a/large.pdf", "b/large copy.pdf", "b/middle.pdf"]
+
+            # hashes are cached by inode
+            cache = HashCache(cache_file)
+            assert cache.load() and len(cache) == 6
+            hashed.clear()
+            detector = DuplicateDetector(cache=cache, edge=EDGE)
+            assert len(detector.find(fstree.pdf_list())) == 2
+            assert hashed == []
+
+            # changed file is hashed again
+            path = os.path.join(tmp_dir, "d", "small.pdf")
+            write(path, b"%PDF-1.4\nsmalL")
+            fstree.update_path(path)
+            assert len(detector.find(fstree.pdf_list())) == 1
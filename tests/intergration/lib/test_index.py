@@ -0,0 +1,302 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 16:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import os
+import shutil
+import tempfile
+
+from pytest import fixture
+
+from localbook.lib.filesystem.dir import FSDir
+from localbook.lib.filesystem.tree import FSTree
+
+
+class TestSubtreeIndex:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            for relpath in [
+                "a/b/book3.pdf",
+                "a/b/book1.pdf",
+                "a/c/book2.pdf",
+                "a/book4.pdf",
+                "d/book0.pdf",
+            ]:
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"%PDF-1.4\n")
+            with open(os.path.join(tmp_dir, "a", "notes.txt"), "w") as f:
+                f.write("notes")
+            yield tmp_dir
+
+    def names(self, pdfs) -> list[str]:
+        return [pdf.name for pdf in pdfs]
+
+    def test_subtree_pdfs(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        a = fstree.get_node("a")
+        assert isinstance(a, FSDir)
+
+        total, pdfs = fstree.subtree_pdfs(a)
+        assert total == 4
+        assert self.names(pdfs) == ["book1.pdf", "book2.pdf", "book3.pdf", "book4.pdf"]
+
+        total, pdfs = fstree.subtree_pdfs(a, offset=1, limit=2)
+        assert total == 4
+        assert self.names(pdfs) == ["book2.pdf", "book3.pdf"]
+
+        total, pdfs = fstree.subtree_pdfs(fstree.get_root_node())
+        assert total == 5
+        assert self.names(pdfs)[0] == "book0.pdf"
+
+        index = fstree.subtree_index()
+        b = fstree.get_node("a/b")
+        assert isinstance(b, FSDir)
+        assert index.count(b) == 2
+        assert set(index.pdfs(a)) == set(fstree.subtree_pdfs(a)[1])
+
+    def test_invalidate_ancestors(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        a, b, d = (fstree.get_node(relpath) for relpath in ("a", "a/b", "d"))
+        assert isinstance(a, FSDir) and isinstance(b, FSDir) and isinstance(d, FSDir)
+        index = fstree.subtree_index()
+        for fsdir in (fstree.root_node, a, b, d):
+            fstree.subtree_pdfs(fsdir)
+        assert all(fsdir in index for fsdir in (fstree.root_node, a, b, d))
+
+        new_file = os.path.join(tree_dir, "a", "c", "book5.pdf")
+        with open(new_file, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        fstree.add_path(new_file)
+        # only the ancestors of the new file are dropped
+        assert fstree.subtree_index() is index
+        assert fstree.root_node not in index and a not in index
+        assert b in index and d in index
+        assert fstree.subtree_pdfs(a)[0] == 5
+        assert fstree.subtree_pdfs(fstree.root_node)[0] == 6
+
+        fstree.remove_path(os.path.join(tree_dir, "a", "b"))
+        total, pdfs = fstree.subtree_pdfs(a)
+        assert total == 3
+        assert self.names(pdfs) == ["book2.pdf", "book4.pdf", "book5.pdf"]
+        assert b not in index
+
+    def test_new_dir_object(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        d = fstree.get_node("d")
+        assert isinstance(d, FSDir)
+        assert fstree.subtree_pdfs(d)[0] == 1
+
+        # the directory is removed and added again as a new node
+        path = os.path.join(tree_dir, "d")
+        fstree.remove_path(path)
+        with open(os.path.join(path, "book6.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        fstree.add_path(path)
+        new_d = fstree.get_node("d")
+        assert isinstance(new_d, FSDir) and new_d is not d
+        assert d not in fstree.subtree_index()
+        assert self.names(fstree.subtree_pdfs(new_d)[1]) == ["book0.pdf", "book6.pdf"]
+
+
+class TestTypedIndexes:
+    def test_indexes(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            for relpath in ["a/vol 10.pdf", "a/vol 2.pdf", "b/notes.txt"]:
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"%PDF-1.4\n" if path.endswith(".pdf") else b"notes")
+            fstree = FSTree(tmp_dir)
+
+            assert [p.name for p in fstree.pdf_list()] == ["vol 2.pdf", "vol 10.pdf"]
+            assert {d.relpath for d in fstree.dir_list()} == {"", "a", "b"}
+            assert [f.name for f in fstree.file_list("text/plain")] == ["notes.txt"]
+            assert fstree.mime_counts() == {"application/pdf": 2, "text/plain": 1}
+
+            fstree.remove_path(os.path.join(tmp_dir, "b"))
+            new_pdf = os.path.join(tmp_dir, "a", "vol 1.pdf")
+            with open(new_pdf, "wb") as f:
+                f.write(b"%PDF-1.4\n")
+            fstree.add_path(new_pdf)
+
+            assert [p.name for p in fstree.pdf_list()] == [
+                "vol 1.pdf",
+                "vol 2.pdf",
+                "vol 10.pdf",
+            ]
+            assert fstree.file_list("text/plain") == []
+            assert fstree.mime_counts() == {"application/pdf": 3}
+            assert {d.relpath for d in fstree.dir_list()} == {"", "a"}
+
+
+class TestMerkleDigest:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            for relpath in ["a/b/book1.pdf", "a/c/book2.pdf", "d/book3.pdf"]:
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"%PDF-1.4\n")
+            yield tmp_dir
+
+    def digests(self, fstree: FSTree) -> dict[str, str]:
+        return {d.relpath: fstree.digest(d) for d in fstree.dir_list()}
+
+    def test_incremental(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        before = self.digests(fstree)
+        assert before == self.digests(FSTree(tree_dir))
+
+        c_dir = os.path.join(tree_dir, "a", "c")
+        c_mtime, root_mtime = os.stat(c_dir).st_mtime, os.stat(tree_dir).st_mtime
+        new_file = os.path.join(c_dir, "book4.pdf")
+        with open(new_file, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        fstree.add_path(new_file)
+        shutil.rmtree(os.path.join(tree_dir, "d"))
+        fstree.remove_path(os.path.join(tree_dir, "d"))
+        # the tree keeps mtimes of directories, restore them on disk
+        os.utime(c_dir, (c_mtime, c_mtime))
+        os.utime(tree_dir, (root_mtime, root_mtime))
+
+        # digests updated in place are the same as computed from scratch
+        after = self.digests(fstree)
+        assert after == self.digests(FSTree(tree_dir))
+        assert after["a/b"] == before["a/b"]
+        assert after["a/c"] != before["a/c"]
+        assert after[""] != before[""]
+
+
+class TestDirStats:
+    def stats(self, fstree: FSTree) -> dict[str, dict]:
+        return {d.relpath: fstree.stats(d).to_dict() for d in fstree.dir_list()}
+
+    def test_aggregates(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            for relpath in ["a/b/book1.pdf", "a/notes.txt", "c/book2.pdf"]:
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"%PDF-1.4\n" if path.endswith(".pdf") else b"notes")
+                os.utime(path, (1000, 1000 + len(relpath)))
+            fstree = FSTree(tmp_dir)
+
+            root = fstree.stats(fstree.get_root_node())
+            assert (root.size, root.files, root.pdfs) == (23, 3, 2)
+            assert root.newest == 1013
+            a = fstree.get_node("a")
+            assert isinstance(a, FSDir)
+            assert fstree.stats(a).to_dict() == {
+                "size": 14,
+                "files": 2,
+                "pdfs": 1,
+                "newest": 1013,
+            }
+
+            # the newest file is removed, another one is added
+            book1 = os.path.join(tmp_dir, "a", "b", "book1.pdf")
+            os.remove(book1)
+            fstree.remove_path(book1)
+            new_pdf = os.path.join(tmp_dir, "c", "book3.pdf")
+            with open(new_pdf, "wb") as f:
+                f.write(b"%PDF-1.4\n%%EOF\n")
+            os.utime(new_pdf, (1000, 1005))
+            fstree.add_path(new_pdf)
+
+            assert fstree.stats(a).to_dict() == {
+                "size": 5,
+                "files": 1,
+                "pdfs": 0,
+                "newest": 1011,
+            }
+            assert self.stats(fstree) == self.stats(FSTree(tmp_dir))
+
+
+class TestNodeColumns:
+    def test_query(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            books = {
+                "science/vol 10.pdf": (300, 3000),
+                "science/vol 2.pdf": (100, 1000),
+                "science/physics/vol 1.pdf": (200, 2000),
+                "novels/book.pdf": (500, 500),
+                "science/notes.txt": (50, 4000),
+            }
+            for relpath, (size, mtime) in books.items():
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    head = b"%PDF-1.4\n" if path.endswith(".pdf") else b"notes"
+                    f.write(head + b"0" * (size - len(head)))
+                os.utime(path, (mtime, mtime))
+            fstree = FSTree(tmp_dir)
+            science = fstree.get_node("science")
+            assert isinstance(science, FSDir)
+
+            def names(result) -> list[str]:
+                return [n.name for n in result[1]]
+
+            total, _ = fstree.query(science, kind="pdf")
+            assert total == 3
+            assert names(fstree.query(science, kind="pdf")) == [
+                "vol 1.pdf",
+                "vol 2.pdf",
+                "vol 10.pdf",
+            ]
+            assert names(
+                fstree.query(science, kind="pdf", min_size=150, order="size")
+            ) == ["vol 10.pdf", "vol 1.pdf"]
+            assert names(
+                fstree.query(
+                    science, kind="file", modified_after=1500, order="mtime", limit=2
+                )
+            ) == ["notes.txt", "vol 10.pdf"]
+            assert names(fstree.query(science, kind="file", recursive=False)) == [
+                "notes.txt",
+                "vol 2.pdf",
+                "vol 10.pdf",
+            ]
+            assert names(fstree.query(science, kind="dir")) == ["physics"]
+            assert fstree.query(science, mime="image/png") == (0, [])
+            total, pdfs = fstree.query(
+                fstree.get_root_node(), kind="pdf", order="size", offset=1, limit=2
+            )
+            assert total == 4
+            assert [p.name for p in pdfs] == ["vol 10.pdf", "vol 1.pdf"]
+
+            # columns are rebuilt after a change
+            columns = fstree.columns()
+            os.remove(os.path.join(tmp_dir, "novels", "book.pdf"))
+            fstree.remove_path(os.path.join(tmp_dir, "novels", "book.pdf"))
+            assert fstree.columns() is not columns
+            assert fstree.query(fstree.get_root_node(), kind="pdf")[0] == 3
+
+            # a rewritten file is patched in place
+            columns = fstree.columns()
+            path = os.path.join(tmp_dir, "science", "vol 2.pdf")
+            with open(path, "ab") as f:
+                f.write(b"0" * 900)
+            fstree.update_path(path)
+            assert fstree.columns() is columns
+            assert names(fstree.query(science, kind="pdf", min_size=900)) == [
+                "vol 2.pdf"
+            ]
+
+            # columns are dropped once, at the end of batch
+            with fstree.batch():
+                for name in ("a.pdf", "b.pdf"):
+                    path = os.path.join(tmp_dir, "novels", name)
+                    with open(path, "wb") as f:
+                        f.write(b"%PDF-1.4\n")
+                    fstree.add_path(path)
+                    assert fstree.columns() is columns
+            assert fstree.columns() is not columns
+            assert fstree.query(fstree.get_root_node(), kind="pdf")[0] == 5
@@ -0,0 +1,123 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 14:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import copy
+import os
+import tempfile
+
+from pytest import fixture
+from utils import create_tmp_tree, get_tmp_struct
+
+from localbook.lib.filesystem.mime import MimeCache, MimeClassifier, default_classifier
+from localbook.lib.filesystem.tree import FSTree
+from localbook.lib.filesystem.utils import _read_mime
+
+
+class TestMimeClassifier:
+    def test_pdf_header(self):
+        pdf = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+        assert default_classifier.match(pdf, "book") == "application/pdf"
+        # header after some junk is trusted only for `.pdf` files
+        junk = b"\x00" * 100 + pdf
+        assert default_classifier.match(junk, "book.PDF") == "application/pdf"
+        assert default_classifier.match(junk, "book.txt") is None
+        assert default_classifier.match(b"plain text", "book.pdf") is None
+
+    def test_register(self):
+        classifier = MimeClassifier()
+        classifier.register_magic("application/x-test", b"TEST", offset=2)
+        classifier.register("text/markdown", lambda _, name: name.endswith(".md"))
+        assert classifier.match(b"..TEST..", "file") == "application/x-test"
+        assert classifier.match(b"TEST", "file.md") == "text/markdown"
+        assert classifier.match(b"TEST", "file") is None
+
+    def test_read_mime(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            files = {
+                "book.pdf": b"\r\n" + b"%PDF-1.4\n" + b"0" * 2048,
+                "image.png": b"\x89PNG\r\n\x1a\n" + b"\x00" * 64,
+                "notes.txt": b"notes " * 100,
+            }
+            mimes = {}
+            for name, content in files.items():
+                path = os.path.join(tmp_dir, name)
+                with open(path, "wb") as f:
+                    f.write(content)
+                mimes[name] = _read_mime(path)
+        assert mimes["book.pdf"] == "application/pdf"
+        assert mimes["image.png"] == "image/png"
+        # ambiguous files are sniffed by libmagic
+        assert mimes["notes.txt"] == "text/plain"
+
+
+class TestMimeCache:
+    @fixture
+    def tmp_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            yield tmp_dir
+
+    def create_file(self, path: str, content: bytes = b"text") -> os.stat_result:
+        with open(path, "wb") as f:
+            f.write(content)
+        return os.stat(path)
+
+    def test_get_put(self, tmp_dir: str):
+        cache = MimeCache()
+        st = self.create_file(os.path.join(tmp_dir, "file.txt"))
+        assert cache.get(st) is None
+        cache.put(st, "text/plain")
+        assert cache.get(st) == "text/plain"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # modified file makes the entry stale
+        st = self.create_file(os.path.join(tmp_dir, "file.txt"), b"modified text")
+        assert cache.get(st) is None
+        assert len(cache) == 0
+
+    def test_eviction(self, tmp_dir: str):
+        cache = MimeCache(max_entries=2)
+        stats = [
+            self.create_file(os.path.join(tmp_dir, f"file{i}.txt")) for i in range(3)
+        ]
+        cache.put(stats[0], "text/plain")
+        cache.put(stats[1], "text/plain")
+        cache.get(stats[0])  # file1 is the least recently used now
+        cache.put(stats[2], "text/plain")
+        assert len(cache) == 2
+        assert cache.get(stats[1]) is None
+        assert cache.get(stats[0]) == "text/plain"
+
+    def test_persistence(self, tmp_dir: str):
+        cache_file = os.path.join(tmp_dir, "cache", "mime.cache")
+        st = self.create_file(os.path.join(tmp_dir, "file.txt"))
+        cache = MimeCache(cache_file)
+        cache.put(st, "text/plain")
+        cache.save()
+
+        cache = MimeCache(cache_file)
+        assert cache.load()
+        assert cache.get(st) == "text/plain"
+
+        with open(cache_file, "wb") as f:
+            f.write(b"garbage")
+        assert not MimeCache(cache_file).load()
+
+    def test_warm_scan(self, tmp_dir: str):
+        tree_dir = os.path.join(tmp_dir, "tree")
+        cache_file = os.path.join(tmp_dir, "mime.cache")
+        create_tmp_tree(tree_dir, copy.deepcopy(get_tmp_struct()))
+
+        cold = MimeCache(cache_file)
+        FSTree(tree_dir, mime_cache=cold)
+        assert (cold.hits, cold.misses) == (0, 4)
+
+        warm = MimeCache(cache_file)
+        warm.load()
+        fstree = FSTree(tree_dir, mime_cache=warm, workers=4)
+        assert (warm.hits, warm.misses) == (4, 0)
+        assert fstree.get_node("dir3/dir4/file3.txt").mime == "application/pdf"
@@ -0,0 +1,110 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 11:40
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import copy
+import os
+import tempfile
+
+from pytest import MonkeyPatch, fixture
+from utils import create_tmp_tree, get_all_nodes, get_tmp_struct
+
+import localbook.lib.filesystem.tree
+from localbook.lib.filesystem.file import FSFile
+from localbook.lib.filesystem.pdf import PDFFile
+from localbook.lib.filesystem.snapshot import FSTreeSnapshot
+from localbook.lib.filesystem.tree import FSTree, _FSTreeBuilder
+
+
+def layout(fstree: FSTree):
+    return [
+        (
+            path,
+            type(node),
+            node.nid,
+            node.size,
+            node.mtime,
+            node.mime if isinstance(node, FSFile) else None,
+        )
+        for path, node in sorted(fstree.node_map.items())
+    ]
+
+
+class TestFSTreeSnapshot:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(get_tmp_struct()))
+            yield tmp_dir
+
+    @fixture
+    def snapshot_file(self):
+        with tempfile.TemporaryDirectory(prefix="snapshot") as tmp_dir:
+            yield os.path.join(tmp_dir, "fstree.snapshot")
+
+    @fixture
+    def sniffed(self, monkeypatch: MonkeyPatch) -> list[str]:
+        paths: list[str] = []
+        read_mime = localbook.lib.filesystem.tree._read_mime
+
+        def f(path):
+            paths.append(path)
+            return read_mime(path)
+
+        monkeypatch.setattr(localbook.lib.filesystem.tree, "_read_mime", f)
+        return paths
+
+    def test_warm_build(self, tree_dir: str, snapshot_file: str, sniffed: list[str]):
+        cold = FSTree(tree_dir, snapshot_file=snapshot_file)
+        assert os.path.exists(snapshot_file)
+        assert len(sniffed) == 4
+
+        sniffed.clear()
+        warm = FSTree(tree_dir, snapshot_file=snapshot_file)
+        assert not sniffed
+        assert layout(cold) == layout(warm)
+        assert len(list(warm.iter())) == len(get_all_nodes())
+
+    def test_changed_dir(self, tree_dir: str, snapshot_file: str, sniffed: list[str]):
+        FSTree(tree_dir, snapshot_file=snapshot_file)
+        sniffed.clear()
+
+        new_file = os.path.join(tree_dir, "dir3", "dir4", "file5.pdf")
+        with open(new_file, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        os.remove(os.path.join(tree_dir, "dir1", "file1.txt"))
+
+        builder = _FSTreeBuilder(
+            tree_dir, follow_symlink=True, snapshot_file=snapshot_file
+        )
+        builder.build()
+        assert builder.snapshot is not None
+        # root and dir3 are restored, dir1 and dir4 are scanned again
+        assert builder.snapshot.scanned == 2
+        assert sniffed == [new_file]
+
+        fstree = FSTree(tree_dir, snapshot_file=snapshot_file)
+        assert isinstance(fstree.get_node("dir3/dir4/file5.pdf"), PDFFile)
+        assert fstree.get_node("dir1") is None
+
+    def test_invalid_snapshot(self, tree_dir: str, snapshot_file: str):
+        expected = layout(FSTree(tree_dir, snapshot_file=snapshot_file))
+
+        with open(snapshot_file, "r+b") as f:
+            f.seek(20)
+            f.write(b"garbage")
+        assert not FSTreeSnapshot(snapshot_file).load()
+        assert layout(FSTree(tree_dir, snapshot_file=snapshot_file)) == expected
+
+        with open(snapshot_file, "wb") as f:
+            f.write(b"LBFSTREE\xff\x00\x00\x00")
+        assert not FSTreeSnapshot(snapshot_file).load()
+        assert layout(FSTree(tree_dir, snapshot_file=snapshot_file)) == expected
+
+        # another options
+        fstree = FSTree(tree_dir, max_depth=2, snapshot_file=snapshot_file)
+        assert fstree.get_node("dir3") is None
@@ -6,17 +6,28 @@
 # @Repository: https://github.com/ardxel/localbook.git
 # ================================================================
 
+import collections
+import contextlib
 import copy
+import gc
+import os
+import shutil
 import sys
 import tempfile
+import time
+import tracemalloc
 
+from pytest import MonkeyPatch
 from utils import create_tmp_tree
 
+from localbook.lib.filesystem.deepener import FSTreeDeepener
 from localbook.lib.filesystem.dir import FSDir
 from localbook.lib.filesystem.file import FSFile
+from localbook.lib.filesystem.filter import PathFilter
 from localbook.lib.filesystem.node import FSNode
 from localbook.lib.filesystem.pdf import PDFFile
-from localbook.lib.filesystem.tree import FSTree, _FSTreeBuilder
+from localbook.lib.filesystem.rescanner import FSTreeRescanner
+from localbook.lib.filesystem.tree import FSTree, _FSTreeBuilder, _FSTreeNormalizer
 
 tmp_struct = {
     "dir1": {"file1.txt": None},
@@ -161,3 +172,568 @@ class TestFSTree:
             fstree = FSTree(tmp_dir)
             tree_nodes = list(fstree.iter())
             assert len(tree_nodes) == len(copy.deepcopy(all_nodes))
+
+    def test_parallel_scan(self) -> None:
+        def layout(fstree: FSTree):
+            return [
+                (
+                    path,
+                    type(node),
+                    node.mime if isinstance(node, FSFile) else None,
+                    [c.name for c in node.children] if isinstance(node, FSDir) else [],
+                )
+                for path, node in sorted(fstree.node_map.items())
+            ]
+
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            for depth in [2, sys.maxsize]:
+                serial = FSTree(tmp_dir, max_depth=depth, workers=1)
+                parallel = FSTree(tmp_dir, max_depth=depth, workers=4)
+                assert layout(serial) == layout(parallel)
+
+
+class TestFSTreeSinglePass:
+    struct = {
+        "a": {"b": {"c": {}, "d": {"file1.txt": None}}, "e": {"f": {}}},
+        "g": {"h": {"i": {"j": {"file2.txt": None}}}},
+        "k": {},
+        "file3.txt": None,
+    }
+
+    def layout(self, root: FSDir) -> list[tuple[str, list[str]]]:
+        result = []
+        stack: list[FSNode] = [root]
+        while stack:
+            node = stack.pop()
+            children = node.children if isinstance(node, FSDir) else []
+            result.append((node.relpath, [c.name for c in children]))
+            stack.extend(children)
+        return sorted(result)
+
+    def test_same_as_normalizer(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(self.struct))
+            for depth in [1, 2, 3, 4, 5, sys.maxsize]:
+                for workers in [1, 4]:
+                    reference = _FSTreeBuilder(
+                        tmp_dir, max_depth=depth, workers=workers, normalize=False
+                    )._build_tree()
+                    _FSTreeNormalizer(reference).exec()
+
+                    builder = _FSTreeBuilder(tmp_dir, max_depth=depth, workers=workers)
+                    fsdir = builder.build()
+                    assert self.layout(fsdir) == self.layout(reference)
+
+    def test_deep_tree(self) -> None:
+        depth = sys.getrecursionlimit() + 100
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            # os.makedirs is recursive itself
+            path = tmp_dir
+            for _ in range(depth):
+                path = os.path.join(path, "d")
+                os.mkdir(path)
+            open(os.path.join(path, "file.txt"), "w").close()
+            os.makedirs(os.path.join(tmp_dir, *["d"] * 10, "empty"))
+
+            fstree = FSTree(tmp_dir)
+            node = fstree.get_node(os.path.join(*["d"] * depth, "file.txt"))
+            assert isinstance(node, FSFile)
+            assert node._path == os.path.join(path, "file.txt")
+            assert fstree.get_node(os.path.join(*["d"] * 10, "empty")) is None
+
+
+class TestFSTreePathFilter:
+    struct = {
+        "books": {"a.pdf": None, "b.txt": None, "big.pdf": None},
+        "node_modules": {"pkg": {"index.js": None}},
+        "dumps": {"scan.pdf": None},
+        "notes": {"dumps": {"c.pdf": None}},
+    }
+
+    def test_filter(self, monkeypatch: MonkeyPatch) -> None:
+        listed: list[str] = []
+        scandir = os.scandir
+
+        def counting_scandir(path):
+            listed.append(path)
+            return scandir(path)
+
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(self.struct))
+            with open(os.path.join(tmp_dir, "books", "big.pdf"), "w") as f:
+                f.write("0" * 1000)
+            path_filter = PathFilter(
+                exclude=["node_modules/", "/dumps/"],
+                include=["*.pdf"],
+                max_file_size=100,
+            )
+            monkeypatch.setattr(os, "scandir", counting_scandir)
+            fstree = FSTree(tmp_dir, path_filter=path_filter)
+
+            assert sorted(fstree.node_map) == [
+                "",
+                "books",
+                "books/a.pdf",
+                "notes",
+                "notes/dumps",
+                "notes/dumps/c.pdf",
+            ]
+            # excluded subtrees are never listed
+            assert not [p for p in listed if "node_modules" in p]
+            assert os.path.join(tmp_dir, "dumps") not in listed
+
+            # the same rules are applied to added paths
+            os.makedirs(os.path.join(tmp_dir, "books", "node_modules"))
+            open(os.path.join(tmp_dir, "books", "node_modules", "d.pdf"), "w").close()
+            assert (
+                fstree.add_path(os.path.join(tmp_dir, "books", "node_modules")) is None
+            )
+            open(os.path.join(tmp_dir, "books", "e.txt"), "w").close()
+            assert fstree.add_path(os.path.join(tmp_dir, "books", "e.txt")) is None
+
+
+class TestFSTreeSyscalls:
+    class CountingEntry:
+        def __init__(self, entry, counter: collections.Counter) -> None:
+            self._entry = entry
+            self._counter = counter
+            self.name = entry.name
+            self.path = entry.path
+
+        def is_file(self, **kwargs):
+            return self._entry.is_file(**kwargs)
+
+        def is_dir(self, **kwargs):
+            return self._entry.is_dir(**kwargs)
+
+        def is_symlink(self):
+            return self._entry.is_symlink()
+
+        def stat(self, **kwargs):
+            self._counter[self.path] += 1
+            return self._entry.stat(**kwargs)
+
+    def test_one_stat_per_entry(self, monkeypatch: MonkeyPatch) -> None:
+        entry_stats: collections.Counter = collections.Counter()
+        os_stats: collections.Counter = collections.Counter()
+        scandir, stat = os.scandir, os.stat
+
+        @contextlib.contextmanager
+        def counting_scandir(path):
+            with scandir(path) as it:
+                yield [self.CountingEntry(e, entry_stats) for e in it]
+
+        def counting_stat(path, *args, **kwargs):
+            os_stats[path] += 1
+            return stat(path, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            monkeypatch.setattr(os, "scandir", counting_scandir)
+            monkeypatch.setattr(os, "stat", counting_stat)
+            for workers in [1, 4]:
+                entry_stats.clear()
+                os_stats.clear()
+                fstree = FSTree(tmp_dir, workers=workers)
+
+                assert len(fstree.node_map) == len(all_nodes) + 1
+                assert all(count <= 1 for count in entry_stats.values())
+                # only the root is stated by path
+                assert dict(os_stats) == {tmp_dir: 1}
+
+
+class TestFSNodeMemory:
+    class LegacyNode:
+        """node layout before `__slots__`: every path is stored"""
+
+        def __init__(self, node: FSNode) -> None:
+            self._path = node._path
+            self.parent = node.parent
+            self.name = os.path.basename(self._path)
+            self.relpath = node.relpath
+            self.nid = str(node.nid)
+            self.size = node.size
+            self.mtime = float(node.mtime)
+            if isinstance(node, FSFile):
+                self.mime = node.mime
+
+    def create_library(self, root: str) -> None:
+        for d in range(20):
+            shelf = os.path.join(root, f"shelf-{d // 5}", f"series-{d}")
+            os.makedirs(shelf)
+            for f in range(25):
+                with open(os.path.join(shelf, f"book-{f}.pdf"), "wb") as pdf:
+                    pdf.write(b"%PDF-1.4\n")
+
+    def measure(self, factory) -> tuple[int, object]:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            result = factory()
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0] - start, result
+        finally:
+            tracemalloc.stop()
+
+    def test_bytes_per_node(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            self.create_library(tmp_dir)
+            FSTree(tmp_dir)  # warm up imports and caches
+
+            compact, fstree = self.measure(lambda: FSTree(tmp_dir))
+            assert isinstance(fstree, FSTree)
+            nodes = list(fstree.node_map.values())
+            legacy, _ = self.measure(
+                lambda: {(x := self.LegacyNode(n)).relpath: x for n in nodes}
+            )
+
+        assert all(not hasattr(node, "__dict__") for node in nodes)
+        compact_per_node = compact / len(nodes)
+        legacy_per_node = legacy / len(nodes)
+        assert compact_per_node < legacy_per_node, (
+            f"bytes per node: {legacy_per_node:.0f} before, "
+            f"{compact_per_node:.0f} after ({len(nodes)} nodes)"
+        )
+
+
+class TestFSTreeNidIndex:
+    def test_get_node_by_nid(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            fstree = FSTree(tmp_dir)
+            for node in fstree.iter():
+                assert fstree.get_node_by_nid(node.nid) is node
+            assert fstree.get_node_by_nid("unknown") is None
+
+            # the index follows patches of the tree
+            file1 = fstree.get_node("dir1/file1.txt")
+            assert file1 is not None
+            old_nid = file1.nid
+            src, dst = os.path.join(tmp_dir, "dir1"), os.path.join(tmp_dir, "dir5")
+            os.rename(src, dst)
+            fstree.move_path(src, dst)
+            assert fstree.get_node_by_nid(old_nid) is None
+            assert fstree.get_node_by_nid(file1.nid) is file1
+
+            new_file = os.path.join(tmp_dir, "file5.txt")
+            with open(new_file, "w") as f:
+                f.write("file5")
+            node = fstree.add_path(new_file)
+            assert node is not None
+            assert fstree.get_node_by_nid(node.nid) is node
+
+            fstree.remove_path(new_file)
+            assert fstree.get_node_by_nid(node.nid) is None
+
+
+class TestFSTreeLazy:
+    def test_expand_on_access(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            os.makedirs(os.path.join(tmp_dir, "dir5", "empty"))
+            fstree = FSTree(tmp_dir, lazy_depth=1)
+            assert fstree.unexpanded == 4
+            assert "dir1/file1.txt" not in fstree.node_map
+
+            # directory is scanned by `get_node`, its subdirectories are not
+            dir1 = fstree.get_node("dir1")
+            assert isinstance(dir1, FSDir)
+            assert [n.name for n in dir1.children] == ["file1.txt"]
+            file3 = fstree.get_node("dir3/dir4/file3.txt")
+            assert isinstance(file3, PDFFile)
+            assert fstree.unexpanded == 2
+
+            # empty directories are pruned once they are scanned
+            assert fstree.get_node("dir5/empty") is None
+            assert fstree.get_node("dir5") is None
+            assert fstree.get_node("dir2", expand=False) is not None
+            assert "dir2/file2.txt" not in fstree.node_map
+
+    def test_deepener(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            fstree = FSTree(tmp_dir, lazy_depth=1)
+            deepener = FSTreeDeepener(fstree, pause=0)
+            deepener.start()
+            deadline = time.monotonic() + 10
+            while fstree.unexpanded:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            deepener.stop()
+            assert sorted(fstree.node_map) == sorted(FSTree(tmp_dir).node_map)
+
+
+class TestFSTreeLinks:
+    def create_tree(self, tmp_dir: str) -> str:
+        """library with a symlink loop, a hardlink and symlinks to the same
+        files, returns directory outside of the library"""
+        root = os.path.join(tmp_dir, "root")
+        outside = os.path.join(tmp_dir, "outside")
+        os.makedirs(os.path.join(root, "a"))
+        os.makedirs(os.path.join(root, "b"))
+        os.makedirs(outside)
+        for path in [
+            os.path.join(root, "a", "book.pdf"),
+            os.path.join(outside, "ext.pdf"),
+        ]:
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4\n" + os.urandom(64))
+
+        os.link(
+            os.path.join(root, "a", "book.pdf"), os.path.join(root, "b", "copy.pdf")
+        )
+        os.symlink(
+            os.path.join(root, "a", "book.pdf"), os.path.join(root, "b", "link.pdf")
+        )
+        os.symlink(root, os.path.join(root, "a", "loop"))
+        os.symlink(outside, os.path.join(root, "b", "ext1"))
+        os.symlink(outside, os.path.join(root, "b", "ext2"))
+        os.symlink(outside, os.path.join(outside, "self"))
+        return root
+
+    def test_aliases(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            root = self.create_tree(tmp_dir)
+            for workers in [1, 4]:
+                fstree = FSTree(root, workers=workers)
+                # every physical directory is scanned once
+                assert sorted(fstree.node_map) == [
+                    "",
+                    "a",
+                    "a/book.pdf",
+                    "b",
+                    "b/copy.pdf",
+                    "b/ext1",
+                    "b/ext1/ext.pdf",
+                    "b/link.pdf",
+                ]
+                book = fstree.get_node("a/book.pdf")
+                assert isinstance(book, PDFFile)
+                for relpath in ["b/copy.pdf", "b/link.pdf"]:
+                    node = fstree.get_node(relpath)
+                    assert node is not None and node.nid == book.nid
+                assert fstree.get_node_by_nid(book.nid) is book
+                assert [p.relpath for p in fstree.pdf_list()] == [
+                    "a/book.pdf",
+                    "b/ext1/ext.pdf",
+                ]
+                assert fstree.subtree_pdfs(fstree.root_node)[0] == 2
+
+    def test_canonical_parallel(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            first = os.path.join(tmp_dir, "d00", "book.pdf")
+            os.makedirs(os.path.dirname(first))
+            with open(first, "wb") as f:
+                f.write(b"%PDF-1.4\n" + os.urandom(64))
+            for i in range(1, 40):
+                path = os.path.join(tmp_dir, f"d{i:02}", "book.pdf")
+                os.makedirs(os.path.dirname(path))
+                os.link(first, path)
+
+            def canonical(workers: int) -> list[str]:
+                fstree = FSTree(tmp_dir, workers=workers)
+                return [p.relpath for p in fstree.pdf_list()]
+
+            # the first path of the serial scan wins whatever thread is faster
+            assert canonical(1) == ["d00/book.pdf"]
+            for _ in range(10):
+                assert canonical(8) == ["d00/book.pdf"]
+
+    def test_remove_canonical(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            root = self.create_tree(tmp_dir)
+            os.remove(os.path.join(root, "b", "link.pdf"))
+            fstree = FSTree(root)
+            book = fstree.get_node("a/book.pdf")
+            assert book is not None
+            nid = book.nid
+
+            os.remove(book._path)
+            fstree.remove_path(book._path)
+            copy_pdf = fstree.get_node("b/copy.pdf")
+            assert copy_pdf is not None and copy_pdf.nid == nid
+            assert fstree.get_node_by_nid(nid) is copy_pdf
+            assert copy_pdf in fstree.pdf_list()
+
+    def test_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            root = self.create_tree(tmp_dir)
+            snapshot_file = os.path.join(tmp_dir, "fstree.snapshot")
+            cold = FSTree(root, snapshot_file=snapshot_file)
+            warm = FSTree(root, snapshot_file=snapshot_file)
+            assert sorted(warm.node_map) == sorted(cold.node_map)
+            assert [p.nid for p in warm.pdf_list()] == [p.nid for p in cold.pdf_list()]
+            copy_pdf = warm.get_node("b/copy.pdf")
+            assert copy_pdf is not None and copy_pdf not in warm.pdf_list()
+
+
+class TestFSTreeRoots:
+    def create_roots(self, tmp_dir: str) -> dict[str, str]:
+        roots = {}
+        for name in ["books", "papers"]:
+            roots[name] = os.path.join(tmp_dir, name)
+            create_tmp_tree(roots[name], copy.deepcopy(tmp_struct))
+        return roots
+
+    def test_namespace(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            roots = self.create_roots(tmp_dir)
+            namespace = os.path.join(tmp_dir, "namespace")
+            fstree = FSTree(namespace, roots=roots)
+            assert sorted(fstree.node_map) == sorted(
+                [""]
+                + list(roots)
+                + [os.path.join(name, n) for name in roots for n in all_nodes]
+            )
+            book = fstree.get_node("papers/dir3/dir4/file3.txt")
+            assert isinstance(book, PDFFile)
+            assert book._path == os.path.join(roots["papers"], "dir3/dir4/file3.txt")
+            assert len(fstree.pdf_list()) == 2
+
+            # paths of files are relative to their roots
+            path = os.path.join(roots["books"], "dir1", "new.txt")
+            assert fstree.root_relative(path) == "books/dir1/new.txt"
+            open(path, "w").close()
+            node = fstree.add_path(path)
+            assert node is not None and node.relpath == "books/dir1/new.txt"
+
+            # a move between roots is a removal and an addition
+            dst = os.path.join(roots["papers"], "new.txt")
+            os.rename(path, dst)
+            fstree.move_path(path, dst)
+            assert fstree.get_node("books/dir1/new.txt", expand=False) is None
+            assert fstree.get_node("papers/new.txt") is not None
+
+            # empty roots are kept
+            shutil.rmtree(os.path.join(roots["books"]))
+            os.makedirs(roots["books"])
+            for name in ["dir1", "dir2", "dir3", "file4.txt"]:
+                fstree.remove_path(os.path.join(roots["books"], name))
+            assert fstree.get_node("books") is not None
+
+    def test_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            roots = self.create_roots(tmp_dir)
+            snapshot_file = os.path.join(tmp_dir, "fstree.snapshot")
+            cold = FSTree(tmp_dir, roots=roots, snapshot_file=snapshot_file)
+            assert sorted(os.listdir(tmp_dir)) == [
+                "books",
+                "fstree-books.snapshot",
+                "fstree-papers.snapshot",
+                "papers",
+            ]
+            warm = FSTree(tmp_dir, roots=roots, snapshot_file=snapshot_file)
+            assert sorted(warm.node_map) == sorted(cold.node_map)
+            assert warm.get_node("books").parent is warm.root_node
+
+    def test_filter(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            roots = self.create_roots(tmp_dir)
+            path_filter = PathFilter(exclude=["/dir3", "dir2/"])
+            fstree = FSTree(tmp_dir, roots=roots, path_filter=path_filter)
+            # patterns are anchored to every root, not to the namespace
+            for name in roots:
+                assert fstree.get_node(f"{name}/dir1") is not None
+                assert fstree.get_node(f"{name}/dir2", expand=False) is None
+                assert fstree.get_node(f"{name}/dir3", expand=False) is None
+            assert not fstree.accepts(os.path.join(roots["books"], "dir3"), True)
+            assert fstree.accepts(os.path.join(roots["books"], "dir1"), True)
+            assert fstree.add_path(os.path.join(roots["papers"], "dir3")) is None
+
+    def test_unavailable_root(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            roots = self.create_roots(tmp_dir)
+            roots["missing"] = os.path.join(tmp_dir, "missing")
+            fstree = FSTree(tmp_dir, roots=roots)
+            assert [n.name for n in fstree.root_node.children] == ["books", "papers"]
+
+
+class TestFSTreeRebuild:
+    def test_rebuild(self, monkeypatch) -> None:
+        listed: list[str] = []
+        scandir = os.scandir
+
+        def counting_scandir(path):
+            listed.append(path)
+            return scandir(path)
+
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            fstree = FSTree(tmp_dir)
+            dir1 = fstree.get_node("dir1")
+            with open(os.path.join(tmp_dir, "dir2", "file5.txt"), "w") as f:
+                f.write("file5")
+            # rewritten in place, the watcher patched the tree
+            file4 = os.path.join(tmp_dir, "file4.txt")
+            with open(file4, "w") as f:
+                f.write("file4")
+            fstree.update_path(file4)
+
+            monkeypatch.setattr(os, "scandir", counting_scandir)
+            fresh = fstree.rebuild()
+            monkeypatch.undo()
+            # only the modified directory is listed again
+            assert listed == [os.path.join(tmp_dir, "dir2")]
+            assert sorted(fresh.node_map) == sorted(all_nodes + ["", "dir2/file5.txt"])
+            assert fresh.get_node("file4.txt").size == 5
+            # the new tree has its own nodes, the old tree is left intact
+            assert fresh.get_node("dir1") is not dir1
+            assert dir1.parent is fstree.root_node
+            assert "dir2/file5.txt" not in fstree.node_map
+            scanned = FSTree(tmp_dir)
+            assert fresh.digest(fresh.root_node) == scanned.digest(scanned.root_node)
+            pdf = fresh.get_node("dir3/dir4/file3.txt")
+            assert fresh.get_node_by_nid(pdf.nid) is pdf
+
+            fstree.release()
+            assert fstree.root_node.children == []
+            assert dir1.children == []
+            assert sorted(fresh.node_map) == sorted(FSTree(tmp_dir).node_map)
+
+    def test_options(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            root = os.path.join(tmp_dir, "root")
+            create_tmp_tree(root, copy.deepcopy(tmp_struct))
+            snapshot_file = os.path.join(tmp_dir, "fstree.snapshot")
+            fstree = FSTree(root, lazy_depth=1, snapshot_file=snapshot_file)
+            os.remove(snapshot_file)
+            fresh = fstree.rebuild()
+            # lazy mode is kept and the snapshot is written
+            assert fresh.unexpanded == fstree.unexpanded > 0
+            assert os.path.exists(snapshot_file)
+
+            # empty directories pruned on build are found again
+            os.makedirs(os.path.join(root, "dir1", "empty"))
+            fstree = FSTree(root)
+            open(os.path.join(root, "dir1", "empty", "new.txt"), "w").close()
+            fresh = fstree.rebuild()
+            assert fresh.get_node("dir1/empty/new.txt") is not None
+
+    def test_rescanner(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(tmp_struct))
+            published: list[FSTree] = []
+            rescanner = FSTreeRescanner(FSTree(tmp_dir), published.append)
+            os.makedirs(os.path.join(tmp_dir, "dir5"))
+            with open(os.path.join(tmp_dir, "dir5", "file6.txt"), "w") as f:
+                f.write("file6")
+
+            fstree = rescanner.rescan()
+            assert published == [fstree]
+            assert fstree.get_node("dir5/file6.txt") is not None
+            assert rescanner.generation == 1
+            # the root and the new directory
+            assert rescanner.last_changed == 2
+            assert rescanner.last_duration is not None
+
+            rescanner.start()
+            assert rescanner.request()
+            deadline = time.monotonic() + 10
+            while rescanner.generation < 2:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            rescanner.stop()
+            assert rescanner.last_changed == 0
+            assert published[-1] is rescanner.fstree
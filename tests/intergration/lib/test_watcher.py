@@ -0,0 +1,264 @@
+# ================================================================
+# @Project: LocalBook
+# @Author: Vasily Bobnev (@ardxel)
+# @License: MIT License
+# @Date: 18.10.2026 13:10
+# @Repository: https://github.com/ardxel/localbook.git
+# ================================================================
+
+import copy
+import os
+import shutil
+import tempfile
+import time
+
+from pytest import fixture
+from utils import create_tmp_tree, get_tmp_struct
+from watchfiles import Change
+
+from localbook.lib.filesystem.dir import FSDir
+from localbook.lib.filesystem.file import FSFile
+from localbook.lib.filesystem.pdf import PDFFile
+from localbook.lib.filesystem.poller import FSTreePoller, fs_type, watch_backend
+from localbook.lib.filesystem.sort import natural_key
+from localbook.lib.filesystem.tree import FSTree
+from localbook.lib.filesystem.watcher import FSTreeWatcher
+
+
+def assert_consistent(fstree: FSTree) -> None:
+    """tree and node_map must describe the same nodes"""
+    fresh = FSTree(fstree.root_node._path)
+    assert sorted(fstree.node_map) == sorted(fresh.node_map)
+    for relpath, node in fstree.node_map.items():
+        assert node.relpath == relpath
+        assert type(node) is type(fresh.node_map[relpath])
+        if node.parent is not None:
+            assert node in node.parent.children
+        if isinstance(node, FSDir):
+            names = [n.name for n in node.children]
+            assert names == sorted(names, key=natural_key)
+
+
+class TestFSTreeWatcher:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(get_tmp_struct()))
+            yield tmp_dir
+
+    def test_add(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree)
+
+        empty_dir = os.path.join(tree_dir, "dir5", "dir6")
+        os.makedirs(empty_dir)
+        watcher.apply({(Change.added, os.path.join(tree_dir, "dir5"))})
+        assert fstree.get_node("dir5") is None
+
+        new_file = os.path.join(empty_dir, "file5.pdf")
+        shutil.copy(os.path.join(tree_dir, "dir3/dir4/file3.txt"), new_file)
+        watcher.apply({(Change.added, new_file)})
+        assert isinstance(fstree.get_node("dir5"), FSDir)
+        assert isinstance(fstree.get_node("dir5/dir6/file5.pdf"), PDFFile)
+
+        hidden = os.path.join(tree_dir, "dir1", ".hidden")
+        open(hidden, "w").close()
+        watcher.apply({(Change.added, hidden)})
+        assert fstree.get_node("dir1/.hidden") is None
+        assert_consistent(fstree)
+
+    def test_delete(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree)
+
+        file3 = os.path.join(tree_dir, "dir3", "dir4", "file3.txt")
+        os.remove(file3)
+        watcher.apply({(Change.deleted, file3)})
+        # empty directories are pruned
+        assert fstree.get_node("dir3/dir4") is None
+        assert fstree.get_node("dir3") is None
+
+        shutil.rmtree(os.path.join(tree_dir, "dir1"))
+        watcher.apply(
+            {
+                (Change.deleted, os.path.join(tree_dir, "dir1")),
+                (Change.deleted, os.path.join(tree_dir, "dir1", "file1.txt")),
+            }
+        )
+        assert fstree.get_node("dir1/file1.txt") is None
+        assert_consistent(fstree)
+
+    def test_modify(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree)
+
+        file4 = os.path.join(tree_dir, "file4.txt")
+        with open(file4, "wb") as f:
+            f.write(b"%PDF-1.4\n" + b"0" * 100)
+        watcher.apply({(Change.modified, file4)})
+        node = fstree.get_node("file4.txt")
+        assert isinstance(node, PDFFile)
+        assert node.size == os.stat(file4).st_size
+        assert node in fstree.root_node.children
+        assert_consistent(fstree)
+
+    def test_move(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree)
+        pdf = fstree.get_node("dir3/dir4/file3.txt")
+
+        src = os.path.join(tree_dir, "dir3", "dir4")
+        dst = os.path.join(tree_dir, "dir2", "renamed")
+        os.rename(src, dst)
+        watcher.apply({(Change.deleted, src), (Change.added, dst)})
+
+        # the same node is moved without rescanning
+        moved = fstree.get_node("dir2/renamed/file3.txt")
+        assert moved is pdf
+        assert isinstance(moved, FSFile)
+        assert moved._path == os.path.join(dst, "file3.txt")
+        assert fstree.get_node("dir3") is None
+        assert_consistent(fstree)
+
+    def test_replay(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree)
+        watcher.record()
+        fresh = fstree.rebuild()
+
+        # changes made during the rebuild are applied to both trees
+        new_file = os.path.join(tree_dir, "dir2", "file5.txt")
+        open(new_file, "w").close()
+        watcher.apply({(Change.added, new_file)})
+        assert fstree.get_node("dir2/file5.txt") is not None
+        assert fresh.get_node("dir2/file5.txt") is None
+        watcher.replay(fresh)
+        assert watcher.fstree is fresh
+        assert fresh.get_node("dir2/file5.txt") is not None
+        assert_consistent(fresh)
+
+        # nothing is kept after the replay
+        os.remove(new_file)
+        watcher.apply({(Change.deleted, new_file)})
+        watcher.replay(fstree)
+        assert fstree.get_node("dir2/file5.txt") is not None
+
+    def test_watch(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        watcher = FSTreeWatcher(fstree, debounce=100, step=10)
+        watcher.start()
+        try:
+            time.sleep(0.2)
+            with open(os.path.join(tree_dir, "dir2", "file5.txt"), "w") as f:
+                f.write("file5")
+
+            deadline = time.monotonic() + 10
+            while fstree.get_node("dir2/file5.txt") is None:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+        assert not watcher.running
+
+
+class TestFSTreePoller:
+    @fixture
+    def tree_dir(self):
+        with tempfile.TemporaryDirectory(prefix="localbook") as tmp_dir:
+            create_tmp_tree(tmp_dir, copy.deepcopy(get_tmp_struct()))
+            yield tmp_dir
+
+    def test_poll(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        poller = FSTreePoller(fstree, interval=10)
+        assert poller.poll(now=0) == 0
+        assert poller.poll(now=100) == 0
+        dir2 = os.path.join(tree_dir, "dir2")
+        # unchanged directories are checked less often
+        assert poller.interval_of(dir2) == 15
+
+        with open(os.path.join(dir2, "file5.txt"), "w") as f:
+            f.write("file5")
+        os.remove(os.path.join(tree_dir, "dir3", "dir4", "file3.txt"))
+        os.rename(
+            os.path.join(tree_dir, "dir1", "file1.txt"),
+            os.path.join(dir2, "file1.txt"),
+        )
+        assert poller.poll(now=200) == 3
+        assert poller.interval_of(dir2) == 7.5
+        assert fstree.get_node("dir2/file5.txt") is not None
+        assert fstree.get_node("dir2/file1.txt") is not None
+        assert fstree.get_node("dir1/file1.txt") is None
+        assert fstree.get_node("dir3") is None
+        assert_consistent(fstree)
+
+        # files of a new directory, empty at first
+        new_dir = os.path.join(tree_dir, "dir5")
+        os.mkdir(new_dir)
+        assert poller.poll(now=300) == 1
+        with open(os.path.join(new_dir, "file6.txt"), "w") as f:
+            f.write("file6")
+        poller.poll(now=400)
+        assert fstree.get_node("dir5/file6.txt") is not None
+        assert_consistent(fstree)
+
+    def test_root(self, tree_dir: str):
+        roots = {"books": tree_dir}
+        fstree = FSTree(os.path.join(tree_dir, os.pardir), roots=roots)
+        poller = FSTreePoller(fstree, interval=10, path=tree_dir)
+        assert poller.poll(now=0) == 0
+        assert poller.interval_of(os.path.join(tree_dir, "dir2")) == 10
+        with open(os.path.join(tree_dir, "dir2", "file5.txt"), "w") as f:
+            f.write("file5")
+        poller.poll(now=100)
+        assert fstree.get_node("books/dir2/file5.txt") is not None
+        fresh = FSTree(fstree.root_node._path, roots=roots)
+        assert sorted(fstree.node_map) == sorted(fresh.node_map)
+
+    def test_lazy(self, tree_dir: str):
+        deep = os.path.join(tree_dir, "d1", "d2", "d3")
+        os.makedirs(deep)
+        with open(os.path.join(deep, "book.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        fstree = FSTree(tree_dir, lazy_depth=1)
+        poller = FSTreePoller(fstree, interval=10)
+        poller.poll(now=0)
+        assert poller.interval_of(deep) is None
+
+        # directories scanned later are polled as well
+        while (fsdir := fstree.next_unexpanded()) is not None:
+            fstree.expand(fsdir)
+        poller.poll(now=1)
+        assert poller.interval_of(deep) == 10
+        with open(os.path.join(deep, "new.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        os.utime(deep, (time.time() + 10,) * 2)
+        poller.poll(now=100)
+        assert fstree.get_node("d1/d2/d3/new.pdf") is not None
+        assert_consistent(fstree)
+
+    def test_io_budget(self, tree_dir: str):
+        fstree = FSTree(tree_dir)
+        poller = FSTreePoller(fstree, interval=10, io_budget=1)
+        poller.poll(now=0)
+        for name in ["dir1", "dir2"]:
+            with open(os.path.join(tree_dir, name, "new.txt"), "w") as f:
+                f.write("new")
+
+        # one filesystem call per second, listings are paid off later
+        assert poller.poll(now=100) <= 1
+        assert poller.poll(now=100) == 0
+        changed = [poller.poll(now=101 + i) for i in range(30)]
+        assert max(changed) == 1
+        assert fstree.get_node("dir1/new.txt") is not None
+        assert fstree.get_node("dir2/new.txt") is not None
+
+    def test_backend(self, tmp_path):
+        mounts = tmp_path / "mounts"
+        mounts.write_text(
+            "/dev/sda1 / ext4 rw 0 0\nserver:/books /mnt/my\\040books nfs4 rw 0 0\n"
+        )
+        assert fs_type("/mnt/my books/a", str(mounts)) == "nfs4"
+        assert watch_backend("/mnt/my books/a", str(mounts)) == "poll"
+        assert watch_backend("/mnt/other", str(mounts)) == "events"
+        assert watch_backend("/", str(tmp_path / "missing")) == "events"
@@ -11,9 +11,12 @@ import os
 import shutil
 import tempfile
 from copy import deepcopy
+from unittest.mock import Mock
 
+from PIL import Image
 from utils import create_tmp_tree
 
+from localbook.lib.filesystem.node import NID
 from localbook.lib.filesystem.tree import FSTree
 from localbook.service.book.cover import (
     DEFAULT_IMAGE_SETTINGS,
@@ -146,3 +149,216 @@ class TestBookCoverGenerator:
 
         for path, mtime in updated_cover_mtimes.items():
             assert old_cover_mtimes[path] == mtime
+
+    def test_migrate(self):
+        with (
+            tempfile.TemporaryDirectory(prefix="tree") as tree_dir,
+            tempfile.TemporaryDirectory(prefix="cover") as tmp_root,
+        ):
+            with open(os.path.join(tree_dir, "book.pdf"), "wb") as f:
+                f.write(b"%PDF-1.4\n")
+            fstree = FSTree(tree_dir)
+            pdf = fstree.get_node("book.pdf")
+            assert pdf is not None
+
+            # covers generated with legacy sha256 ids
+            covers_dir = os.path.join(tmp_root, "covers")
+            old_nid = NID(pdf._path, scheme="sha256")
+            old_dir = os.path.join(covers_dir, old_nid)
+            os.makedirs(old_dir)
+            open(os.path.join(old_dir, "desktop.jpeg"), "w").close()
+            metadata = BookCoverMetadata(os.path.join(tmp_root, "metadata.json"))
+            metadata.save(
+                [
+                    _BookCoverInfo(
+                        pdf._path,
+                        pdf_nid=old_nid,
+                        thumbnails={"desktop": os.path.join(old_dir, "desktop.jpeg")},
+                        mtime=pdf.mtime,
+                    ),
+                    # cover without directory is dropped
+                    _BookCoverInfo(
+                        os.path.join(tree_dir, "removed.pdf"),
+                        pdf_nid="legacy",
+                        thumbnails={},
+                        mtime=0.1,
+                    ),
+                ]
+            )
+
+            converter = Mock()
+            generator = BookCoverGenerator(
+                covers_dir,
+                image_settings=copy.deepcopy(self.image_settings),
+                fstree=fstree,
+                metadata=metadata,
+                converter=converter,
+            )
+            generator.generate(cache=True)
+
+            converter.assert_not_called()
+            assert len(pdf.nid) == 16
+            new_cover = os.path.join(covers_dir, pdf.nid, "desktop.jpeg")
+            assert os.path.exists(new_cover)
+            assert not os.path.exists(old_dir)
+            (cover,) = metadata.read().covers
+            assert cover.pdf_nid == pdf.nid
+            assert cover.thumbnails == {"desktop": new_cover}
+
+    def test_linked_from_outside(self):
+        with (
+            tempfile.TemporaryDirectory(prefix="tree") as tmp_dir,
+            tempfile.TemporaryDirectory(prefix="cover") as tmp_root,
+        ):
+            tree_dir = os.path.join(tmp_dir, "tree")
+            outside = os.path.join(tmp_dir, "outside", "book.pdf")
+            os.makedirs(os.path.join(tree_dir, "a"))
+            os.makedirs(os.path.dirname(outside))
+            with open(outside, "wb") as f:
+                f.write(b"%PDF-1.4\n")
+            os.symlink(outside, os.path.join(tree_dir, "a", "link.pdf"))
+            fstree = FSTree(tree_dir)
+            metadata = BookCoverMetadata(os.path.join(tmp_root, "metadata.json"))
+            (pdf,) = fstree.pdf_list()
+            assert pdf._path == outside
+            cover = _BookCoverInfo(
+                pdf._path, pdf_nid=pdf.nid, thumbnails={}, mtime=pdf.mtime
+            )
+            metadata.save([cover])
+
+            # the target is changed, no directory of the tree is
+            os.utime(outside, (pdf.mtime + 10, pdf.mtime + 10))
+            converter = Mock(side_effect=lambda **_: [Image.new("RGB", (10, 10))])
+            generator = BookCoverGenerator(
+                os.path.join(tmp_root, "covers"),
+                image_settings=copy.deepcopy(self.image_settings),
+                fstree=FSTree(tree_dir),
+                metadata=metadata,
+                converter=converter,
+            )
+            generator.generate(cache=True)
+
+            paths = {c.kwargs["pdf_path"] for c in converter.call_args_list}
+            assert paths == {outside}
+
+    def test_duplicates(self):
+        with (
+            tempfile.TemporaryDirectory(prefix="tree") as tree_dir,
+            tempfile.TemporaryDirectory(prefix="cover") as tmp_root,
+        ):
+            for name in ["a", "b", "c"]:
+                os.makedirs(os.path.join(tree_dir, name))
+                with open(os.path.join(tree_dir, name, "book.pdf"), "wb") as f:
+                    f.write(b"%PDF-1.4\n" + (b"other" if name == "c" else b"same!"))
+            fstree = FSTree(tree_dir)
+            metadata = BookCoverMetadata(os.path.join(tmp_root, "metadata.json"))
+            converter = Mock(side_effect=lambda **_: [Image.new("RGB", (10, 10))])
+            generator = BookCoverGenerator(
+                os.path.join(tmp_root, "covers"),
+                image_settings=copy.deepcopy(self.image_settings),
+                fstree=fstree,
+                metadata=metadata,
+                converter=converter,
+            )
+            generator.generate(cache=False)
+
+            # identical files are rendered once
+            paths = {c.kwargs["pdf_path"] for c in converter.call_args_list}
+            assert {os.path.relpath(p, tree_dir) for p in paths} == {
+                "a/book.pdf",
+                "c/book.pdf",
+            }
+            covers = {c.original: c for c in metadata.read().covers}
+            assert len(covers) == 3
+            for pdf in fstree.pdf_list():
+                for file in covers[pdf._path].thumbnails.values():
+                    assert os.path.dirname(file).endswith(pdf.nid)
+                    assert os.path.exists(file)
+
+    def test_duplicate_rerendered(self):
+        with (
+            tempfile.TemporaryDirectory(prefix="tree") as tree_dir,
+            tempfile.TemporaryDirectory(prefix="cover") as tmp_root,
+        ):
+            for name in ["a", "b"]:
+                os.makedirs(os.path.join(tree_dir, name))
+                with open(os.path.join(tree_dir, name, "book.pdf"), "wb") as f:
+                    f.write(b"%PDF-1.4\nsame!")
+            metadata = BookCoverMetadata(os.path.join(tmp_root, "metadata.json"))
+
+            def generate(color: str) -> dict[str, _BookCoverInfo]:
+                generator = BookCoverGenerator(
+                    os.path.join(tmp_root, "covers"),
+                    image_settings=copy.deepcopy(self.image_settings),
+                    fstree=FSTree(tree_dir),
+                    metadata=metadata,
+                    converter=lambda **_: [Image.new("RGB", (10, 10), color)],
+                )
+                generator.generate(cache=True)
+                covers = metadata.read().covers
+                return {os.path.relpath(c.original, tree_dir): c for c in covers}
+
+            def read(path: str) -> bytes:
+                with open(path, "rb") as f:
+                    return f.read()
+
+            covers = generate("red")
+            linked = covers["b/book.pdf"].thumbnails
+            images = {d: read(f) for d, f in linked.items()}
+
+            # the source is changed and rendered again, its duplicate is not
+            with open(os.path.join(tree_dir, "a", "book.pdf"), "ab") as f:
+                f.write(b"changed")
+            covers = generate("blue")
+            assert covers["b/book.pdf"].thumbnails == linked
+            for device, file in linked.items():
+                assert read(file) == images[device]
+                assert read(covers["a/book.pdf"].thumbnails[device]) != images[device]
+
+    def test_lazy_tree(self):
+        with (
+            tempfile.TemporaryDirectory(prefix="tree") as tree_dir,
+            tempfile.TemporaryDirectory(prefix="cover") as tmp_root,
+        ):
+            books = ["a.pdf", "d1/b.pdf", "d1/d2/c.pdf", "d1/d2/d3/e.pdf"]
+            for book in books:
+                path = os.path.join(tree_dir, book)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"%PDF-1.4\n" + book.encode())
+            metadata = BookCoverMetadata(os.path.join(tmp_root, "metadata.json"))
+            converter = Mock(side_effect=lambda **_: [Image.new("RGB", (10, 10))])
+
+            def generator(fstree: FSTree) -> BookCoverGenerator:
+                return BookCoverGenerator(
+                    os.path.join(tmp_root, "covers"),
+                    image_settings=copy.deepcopy(self.image_settings),
+                    fstree=fstree,
+                    metadata=metadata,
+                    converter=converter,
+                )
+
+            generator(FSTree(tree_dir)).generate(cache=False)
+            assert converter.call_count == 4
+
+            with open(os.path.join(tree_dir, "d1/d2/d3/f.pdf"), "wb") as f:
+                f.write(b"%PDF-1.4\nnew")
+            converter.reset_mock()
+            fstree = FSTree(tree_dir, lazy_depth=2)
+            lazy = generator(fstree)
+            fstree.on_expand(lazy.generate_dir)
+            lazy.generate(cache=True)
+
+            # covers of books below the lazy depth are kept
+            converter.assert_not_called()
+            covers = {c.original: c for c in metadata.read().covers}
+            assert len(covers) == 4
+            for cover in covers.values():
+                assert os.path.isdir(os.path.join(tmp_root, "covers", cover.pdf_nid))
+
+            # covers of new books are generated when their directory is scanned
+            while (fsdir := fstree.next_unexpanded()) is not None:
+                fstree.expand(fsdir)
+            paths = {c.kwargs["pdf_path"] for c in converter.call_args_list}
+            assert paths == {os.path.join(tree_dir, "d1/d2/d3/f.pdf")}
+            assert len(metadata.read().covers) == 5
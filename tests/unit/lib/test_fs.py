@@ -12,12 +12,14 @@ from pytest import fixture
 from utils import create_stub_tree, get_tmp_struct, mock_fsdir, mock_fsfile
 
 from localbook.lib.filesystem.dir import FSDir
-from localbook.lib.filesystem.node import FSNode
+from localbook.lib.filesystem.file import FSFile
+from localbook.lib.filesystem.filter import PathFilter
+from localbook.lib.filesystem.node import NID, FSNode
+from localbook.lib.filesystem.sort import natural_key
 from localbook.lib.filesystem.tree import _FSTreeNormalizer
 
 
 class TestFSDir:
-
     @fixture
     def fsdir_tree(self):
         parent = mock_fsdir("/parent", None)
@@ -42,6 +44,99 @@ class TestFSDir:
         assert file in children
 
 
+class TestSortedChildren:
+    def test_natural_key(self):
+        names = ["vol 10.pdf", "Vol 2.pdf", "vol 1.pdf", "Appendix.pdf", "10.pdf"]
+        assert sorted(names, key=natural_key) == [
+            "10.pdf",
+            "Appendix.pdf",
+            "vol 1.pdf",
+            "Vol 2.pdf",
+            "vol 10.pdf",
+        ]
+
+    def test_common_prefix(self):
+        # names differing only by trailing digits have keys of other lengths
+        for names in (["a1", "a"], ["Python3", "Python"], ["x.1", "x"]):
+            assert sorted(names, key=natural_key) == names[::-1]
+        root = mock_fsdir("/root", None)
+        dirs = [mock_fsdir(f"/root/{name}", root) for name in ("Python3", "Python")]
+        root.add_children(dirs)
+        assert [n.name for n in root.children] == ["Python", "Python3"]
+
+    def test_orders(self):
+        root = mock_fsdir("/root", None)
+        file10 = mock_fsfile("/root/Vol 10.pdf", root)
+        file2 = mock_fsfile("/root/vol 2.pdf", root)
+        subdir = mock_fsdir("/root/x", root)
+        file10.size, file10.mtime = 10, 1.0
+        file2.size, file2.mtime = 2, 2.0
+        root.add_children([file10, subdir])
+        root.add_child(file2)
+
+        def names(order) -> list[str]:
+            return [n.name for n in root.sorted_children(order)]
+
+        assert names("name") == ["vol 2.pdf", "Vol 10.pdf", "x"]
+        assert names("dirs") == ["x", "vol 2.pdf", "Vol 10.pdf"]
+        assert names("size") == ["Vol 10.pdf", "vol 2.pdf", "x"]
+        assert names("mtime") == ["x", "vol 2.pdf", "Vol 10.pdf"]
+
+        # cached orders are dropped on change
+        root.remove_child(subdir)
+        assert names("dirs") == ["vol 2.pdf", "Vol 10.pdf"]
+        file1 = mock_fsfile("/root/vol 1.pdf", root)
+        root.replace_child(file2, file1)
+        assert names("name") == ["vol 1.pdf", "Vol 10.pdf"]
+
+
+class TestNID:
+    def test_schemes(self):
+        path = "/books/a/b/file.pdf"
+        nid = NID(path)
+        assert nid == NID(path)
+        assert len(nid) == 16
+        assert nid.isalnum() and nid.islower()
+        assert len(NID(path, scheme="sha256")) == 64
+        assert NID(path, hash=False) == path
+
+    def test_lazy(self, mock_read_mime):
+        parent = mock_fsdir("/parent", None)
+        file = FSFile("/parent/file.pdf", parent, size=1, mtime=3.14)
+        assert file._FSNode__nid is None  # type: ignore
+        assert file.nid == NID("/parent/file.pdf")
+        assert file._FSNode__nid is not None  # type: ignore
+
+
+class TestPathFilter:
+    def test_exclude(self):
+        path_filter = PathFilter(
+            exclude=["node_modules/", "*.log", "/dumps", "docs/**/*.tmp", "!keep.log"]
+        )
+        assert not path_filter.accepts("node_modules", isdir=True)
+        assert not path_filter.accepts("a/b/node_modules", isdir=True)
+        assert path_filter.accepts("a/node_modules", isdir=False)
+        assert not path_filter.accepts("a/scan.log", isdir=False)
+        assert path_filter.accepts("a/keep.log", isdir=False)
+        assert not path_filter.accepts("dumps", isdir=True)
+        assert path_filter.accepts("a/dumps", isdir=True)
+        assert not path_filter.accepts("docs/x.tmp", isdir=False)
+        assert not path_filter.accepts("docs/a/b/x.tmp", isdir=False)
+        assert path_filter.accepts("a/docs/x.tmp", isdir=False)
+        assert path_filter.accepts("book.pdf", isdir=False)
+
+    def test_include(self):
+        path_filter = PathFilter(include=["*.pdf", "*.djvu"], max_file_size=100)
+        assert path_filter.accepts("images", isdir=True)
+        assert path_filter.accepts("a/book.PDF.pdf", isdir=False)
+        assert path_filter.accepts("a/b/book.djvu", isdir=False)
+        assert not path_filter.accepts("a/cover.png", isdir=False)
+        assert path_filter.accepts_size(100)
+        assert not path_filter.accepts_size(101)
+        assert not PathFilter()
+        assert PathFilter().accepts_size(1 << 40)
+
+
 class TestFSTreeNormalizer:
     def test_get_depth(self) -> None:
         structs = {
@@ -114,6 +114,10 @@ class TestBookCoverGenerator:
     def mock_makedirs(self, monkeypatch: MonkeyPatch):
         monkeypatch.setattr("os.makedirs", lambda path, exist_ok: None)
 
+    @fixture
+    def mock_replace(self, monkeypatch: MonkeyPatch):
+        monkeypatch.setattr("os.replace", lambda src, dst: None)
+
     def test_generate(
         self,
         mock_fstree: FSTree,
@@ -121,6 +125,7 @@ class TestBookCoverGenerator:
         image_settings: list[Any],
         mock_rmtree: None,
         mock_makedirs: None,
+        mock_replace: None,
     ):
         mock_metadata = MagicMock()
         mock_metadata.save = MagicMock()
@@ -140,10 +145,37 @@ class TestBookCoverGenerator:
         generator.generate(cache=False)
         mock_metadata.save.assert_called_once()
 
-        assert converter.call_count == 2
+        # the page is rasterized once for all sizes
+        assert converter.call_count == 1
         assert resizer.resize.call_count == 1
         assert saver.save.call_count == 1
 
+    def test_progressive_downscale(
+        self,
+        mock_fstree: FSTree,
+        image_settings: list[Any],
+        mock_rmtree: None,
+        mock_makedirs: None,
+        mock_replace: None,
+    ):
+        page = MagicMock()
+        converter = Mock(return_value=[page])
+        generator = BookCoverGenerator(
+            "/test",
+            # smaller thumbnail first, the larger one is made before it
+            image_settings=image_settings[::-1],
+            metadata=MagicMock(),
+            fstree=mock_fstree,
+            converter=converter,
+        )
+
+        generator.generate(cache=False)
+        converter.assert_called_once()
+        assert page.resize.call_args.args[0] == (170, 240)
+        desktop = page.resize.return_value
+        assert desktop.resize.call_args.args[0] == (150, 212)
+        page.close.assert_called_once()
+
 
 class TestBookCoverMetadata:
     @fixture